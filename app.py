@@ -1,18 +1,48 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, Response, g, render_template, request, jsonify, redirect, url_for, flash, session, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from datetime import datetime, timedelta
-from sqlalchemy import inspect, text
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, inspect, text
+from sqlalchemy.dialects.mysql import LONGTEXT, insert as mysql_insert
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.middleware.proxy_fix import ProxyFix
+from functools import cached_property, wraps
+import base64
+import csv
+import hashlib
+import io
+import ipaddress
 import json
+import logging
+import math
 import os
+import click
+import queue
+import re
+import threading
+import time
+import traceback
+import uuid
 from urllib.parse import quote_plus
 from dotenv import load_dotenv
+from cache import create_cache
+from events import DATA_KINDS, create_broker
+from intents import IntentRouter
+from logs import setup_logging
+from passwords import HASHERS, PasswordService, calibrate, parse_params
+from ratelimit import create_limiter
+from sessions import ServerSideSessionInterface, create_session_store
+from snapshots import ReportSnapshotStore, define_snapshot_table
 
 load_dotenv()
+setup_logging('flask')
+log = logging.getLogger('finanmaster.app')
+# Eventos por requisição (alta frequência): DEBUG, amostráveis via LOG_SAMPLE
+transactions_log = logging.getLogger('finanmaster.app.transactions')
 app = Flask(__name__)
 CORS(app)  # Permite requisições cross-origin
-app.config['SECRET_KEY'] = 'sua_chave_secreta_aqui'
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'sua_chave_secreta_aqui')
 
 # Configuração do MySQL via variáveis de ambiente
 DB_USER = os.getenv('DB_USER', 'root')
@@ -24,7 +54,8 @@ DB_NAME = os.getenv('DB_NAME', 'finanmaster')
 mysql_uri = (
     f"mysql+pymysql://{quote_plus(DB_USER)}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
 )
-app.config['SQLALCHEMY_DATABASE_URI'] = mysql_uri
+# DATABASE_URL substitui o MySQL (ex.: sqlite:///... nos testes em tests/)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or mysql_uri
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_pre_ping': True,
@@ -32,8 +63,98 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_size': 10,
     'max_overflow': 20,
 }
+# Leituras agregadas a partir de monthly_rollups (rode `flask --app app rebuild-rollups` antes de ativar)
+app.config['USE_MONTHLY_ROLLUPS'] = os.getenv('USE_MONTHLY_ROLLUPS', 'false').lower() in ('1', 'true', 'yes')
+# Cache de respostas por usuário: memory:// (padrão) ou redis://host:porta/db
+app.config['RESPONSE_CACHE_URL'] = os.getenv('RESPONSE_CACHE_URL', 'memory://')
+app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2048'))
+# Feed de alterações (/api/events): memory:// (um processo) ou redis://host:porta/db (vários workers)
+app.config['EVENTS_BROKER_URL'] = os.getenv('EVENTS_BROKER_URL', 'memory://')
+app.config['EVENTS_HEARTBEAT_SECONDS'] = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', '25'))
+# Streams /api/events abertos por processo (cada um ocupa uma thread); acima disso 503 e o cliente faz polling.
+# Vazio = sem limite (servidor de desenvolvimento), 0 = só polling; `python -m finanmaster serve` deriva de FLASK_THREADS
+app.config['EVENTS_MAX_STREAMS'] = int(os.getenv('EVENTS_MAX_STREAMS')) if os.getenv('EVENTS_MAX_STREAMS') else None
+# Relatórios em segundo plano (POST /api/reports/generate com "async": true)
+app.config['REPORT_WORKERS'] = int(os.getenv('REPORT_WORKERS', '2'))
+app.config['REPORT_JOB_TIMEOUT'] = int(os.getenv('REPORT_JOB_TIMEOUT', '600'))  # segundos até um job parado ser refeito
+# Horas que os jobs ficam em report_jobs (o relatório continua nos snapshots)
+app.config['REPORT_JOB_RETENTION_HOURS'] = int(os.getenv('REPORT_JOB_RETENTION_HOURS', '24'))
+# Snapshots de relatórios por versão dos dados (tabela report_snapshots, compartilhada com o MCP)
+app.config['REPORT_SNAPSHOT_MAX_AGE'] = int(os.getenv('REPORT_SNAPSHOT_MAX_AGE', str(7 * 24 * 3600)))
+app.config['REPORT_SNAPSHOT_MAX_BYTES'] = int(os.getenv('REPORT_SNAPSHOT_MAX_BYTES', str(256 * 1024 * 1024)))
+# Hash de senhas: scrypt (padrão), argon2 (requer argon2-cffi) ou pbkdf2. Sem PASSWORD_HASH_PARAMS
+# (ex.: n=32768,r=8,p=1) os parâmetros são calibrados para ~PASSWORD_HASH_TARGET_MS por hash.
+app.config['PASSWORD_HASHER'] = os.getenv('PASSWORD_HASHER', 'scrypt')
+app.config['PASSWORD_HASH_PARAMS'] = parse_params(os.getenv('PASSWORD_HASH_PARAMS'))
+app.config['PASSWORD_HASH_TARGET_MS'] = float(os.getenv('PASSWORD_HASH_TARGET_MS', '150'))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '0'))  # 0 = na thread da requisição
+# Limite de tentativas de login/dica de senha: memory:// (por processo) ou redis://host:porta/db (compartilhado)
+app.config['LOGIN_LIMIT_URL'] = os.getenv('LOGIN_LIMIT_URL', 'memory://')
+app.config['LOGIN_MAX_ATTEMPTS_IP'] = int(os.getenv('LOGIN_MAX_ATTEMPTS_IP', '20'))
+app.config['LOGIN_MAX_ATTEMPTS_EMAIL'] = int(os.getenv('LOGIN_MAX_ATTEMPTS_EMAIL', '5'))
+app.config['LOGIN_WINDOW_SECONDS'] = int(os.getenv('LOGIN_WINDOW_SECONDS', '900'))
+app.config['LOGIN_LOCKOUT_SECONDS'] = int(os.getenv('LOGIN_LOCKOUT_SECONDS', '900'))
+# Cache de e-mails inexistentes (0 = desativado; o launcher desativa com memory:// e vários workers)
+app.config['LOGIN_UNKNOWN_EMAIL_TTL'] = int(os.getenv('LOGIN_UNKNOWN_EMAIL_TTL', '60'))
+# Sessões no servidor, compartilhadas entre workers e com o MCP:
+# sqlite:///caminho.db (padrão instance/sessions.db) ou redis://host:porta/db
+app.config['SESSION_STORE_URL'] = os.getenv('SESSION_STORE_URL', '')
+app.config['SESSION_COOKIE_NAME'] = os.getenv('SESSION_COOKIE_NAME', 'session')
+app.config['SESSION_LIFETIME_SECONDS'] = int(os.getenv('SESSION_LIFETIME_SECONDS', str(7 * 24 * 3600)))
+app.config['SESSION_LOOKUP_TTL'] = int(os.getenv('SESSION_LOOKUP_TTL', '30'))  # cache local sessão -> usuário
+app.config['SESSION_SWEEP_INTERVAL'] = int(os.getenv('SESSION_SWEEP_INTERVAL', '300'))  # 0 = sem varredura
+# Proxies reversos à frente do app (nginx = 1): o IP do limite vem de X-Forwarded-For
+app.config['PROXY_FIX_X_FOR'] = int(os.getenv('PROXY_FIX_X_FOR', '0'))
+if app.config['PROXY_FIX_X_FOR']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'], x_proto=app.config['PROXY_FIX_X_FOR'])
 
 db = SQLAlchemy(app)
+response_cache = create_cache(
+    app.config['RESPONSE_CACHE_URL'],
+    max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+    default_ttl=app.config['RESPONSE_CACHE_TTL'],
+)
+event_broker = create_broker(app.config['EVENTS_BROKER_URL'])
+_event_streams = {'open': 0, 'rejected': 0}
+_event_streams_lock = threading.Lock()
+password_service = PasswordService(
+    app.config['PASSWORD_HASHER'],
+    params=app.config['PASSWORD_HASH_PARAMS'],
+    target_ms=app.config['PASSWORD_HASH_TARGET_MS'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+)
+login_limiter = create_limiter(
+    app.config['LOGIN_LIMIT_URL'],
+    {'ip': app.config['LOGIN_MAX_ATTEMPTS_IP'], 'email': app.config['LOGIN_MAX_ATTEMPTS_EMAIL']},
+    window_seconds=app.config['LOGIN_WINDOW_SECONDS'],
+    lockout_seconds=app.config['LOGIN_LOCKOUT_SECONDS'],
+)
+# E-mails sem cadastro: tentativas repetidas são recusadas sem consultar o banco
+unknown_emails = create_cache(
+    app.config['LOGIN_LIMIT_URL'],
+    max_entries=10000,
+    default_ttl=app.config['LOGIN_UNKNOWN_EMAIL_TTL'],
+) if app.config['LOGIN_UNKNOWN_EMAIL_TTL'] > 0 else None
+session_store = create_session_store(
+    app.config['SESSION_STORE_URL'],
+    lifetime_seconds=app.config['SESSION_LIFETIME_SECONDS'],
+    lookup_ttl=app.config['SESSION_LOOKUP_TTL'],
+)
+app.session_interface = ServerSideSessionInterface(session_store)
+session_store.start_sweeper(app.config['SESSION_SWEEP_INTERVAL'])
+
+
+def login_required(view):
+    """401 sem usuário autenticado (rotas de estatísticas operacionais)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not get_current_user_id():
+            return jsonify({'error': 'Usuário não autenticado'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
 # Identidade do usuário atual
 @app.route('/api/me')
 def whoami():
@@ -41,12 +162,25 @@ def whoami():
         return jsonify({'authenticated': False})
     return jsonify({'authenticated': True, 'user_id': session['user_id'], 'username': session.get('username', '')})
 
+# Estatísticas das sessões (cache local de consultas e varredura deste processo)
+@app.route('/api/sessions/stats')
+@login_required
+def session_stats():
+    return jsonify(session_store.stats())
+
+# Estatísticas do cache de respostas (acertos/falhas deste processo)
+@app.route('/api/cache/stats')
+@login_required
+def cache_stats():
+    return jsonify(response_cache.stats())
+
 # Configuração CORS adicional
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,If-None-Match')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Expose-Headers', 'X-Next-Cursor,ETag')
     return response
 
 # Modelos do banco de dados
@@ -65,10 +199,10 @@ class User(db.Model):
     budgets = db.relationship('Budget', backref='user', lazy='dynamic')
 
     def set_password(self, password: str) -> None:
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_service.hash(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return password_service.verify(self.password_hash, password)
 class Transaction(db.Model):
     __tablename__ = 'transactions'
     __table_args__ = {
@@ -84,6 +218,10 @@ class Transaction(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
 
+# Índice composto para filtros por usuário + intervalo de datas e para a paginação por cursor
+# (ordem date DESC, id DESC da listagem de transações)
+db.Index('ix_transactions_user_date_id', Transaction.user_id, Transaction.date.desc(), Transaction.id.desc())
+
 class Goal(db.Model):
     __tablename__ = 'goals'
     __table_args__ = {
@@ -114,11 +252,600 @@ class Budget(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
 
+class MonthlyRollup(db.Model):
+    """Soma e contagem de transações por (usuário, ano, mês, tipo, categoria), mantidas na escrita."""
+    __tablename__ = 'monthly_rollups'
+    __table_args__ = {
+        'mysql_engine': 'InnoDB',
+        'mysql_charset': 'utf8mb4',
+    }
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    month = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    type = db.Column(db.String(20), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Float(precision=53), nullable=False, default=0)  # DOUBLE no MySQL: acumula sem perder centavos
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class DataVersion(db.Model):
+    """Contador de alterações dos dados de cada usuário (transações, metas e orçamentos)."""
+    __tablename__ = 'data_versions'
+    __table_args__ = {
+        'mysql_engine': 'InnoDB',
+        'mysql_charset': 'utf8mb4',
+    }
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ReportJob(db.Model):
+    """Relatório gerado em segundo plano e seu resultado (JSON).
+
+    A chave única (usuário, período, tipo, versão dos dados, dia) faz pedidos
+    idênticos reaproveitarem o mesmo job, inclusive entre processos. Jobs
+    criados há mais de REPORT_JOB_RETENTION_HOURS são removidos por
+    sweep_report_jobs.
+    """
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'report_type', 'data_version', 'report_date',
+                            name='uq_report_jobs_key'),
+        db.Index('ix_report_jobs_created', 'created_at'),
+        {
+            'mysql_engine': 'InnoDB',
+            'mysql_charset': 'utf8mb4',
+        },
+    )
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    period = db.Column(db.String(30), nullable=False)
+    report_type = db.Column(db.String(30), nullable=False)
+    data_version = db.Column(db.BigInteger, nullable=False)
+    report_date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, running, done, error
+    result = db.Column(db.Text().with_variant(LONGTEXT(), 'mysql'))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+report_snapshots_table = define_snapshot_table(db.metadata)
+report_snapshots = ReportSnapshotStore(
+    lambda: db.engine,
+    report_snapshots_table,
+    source='flask',
+    max_age_seconds=app.config['REPORT_SNAPSHOT_MAX_AGE'],
+    max_bytes=app.config['REPORT_SNAPSHOT_MAX_BYTES'],
+)
+
 
 def get_current_user_id() -> int | None:
     return session.get('user_id')
 
 
+# Índices que deixaram de existir nos modelos: tabela -> nomes (ex.: (user_id, date), coberto
+# por ix_transactions_user_date_id e que só atrasaria as inserções)
+REPLACED_INDEXES = {
+    'transactions': ('ix_transactions_user_date',),
+}
+
+
+def ensure_indexes() -> None:
+    """Cria índices declarados nos modelos que ainda não existem em tabelas já criadas.
+
+    db.create_all() não altera tabelas existentes, então bancos antigos não
+    recebem índices novos (ex.: ix_transactions_user_date_id) sem este passo.
+    Índices substituídos (REPLACED_INDEXES) ainda presentes são removidos.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    quote = db.engine.dialect.identifier_preparer.quote
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for name in REPLACED_INDEXES.get(table.name, ()):
+            if name in existing:
+                on_table = f" ON {quote(table.name)}" if db.engine.dialect.name == 'mysql' else ''
+                with db.engine.begin() as conn:
+                    conn.execute(text(f"DROP INDEX {quote(name)}{on_table}"))
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+
+
+def month_range(year: int, month: int) -> tuple[datetime, datetime]:
+    """Retorna o intervalo semiaberto [início do mês, início do mês seguinte)."""
+    start = datetime(year, month, 1)
+    if month == 12:
+        next_start = datetime(year + 1, 1, 1)
+    else:
+        next_start = datetime(year, month + 1, 1)
+    return start, next_start
+
+
+def add_months(year: int, month: int, delta: int) -> tuple[int, int]:
+    """Soma (ou subtrai) meses do calendário a (ano, mês)."""
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def load_monthly_totals(user_id: int, start: datetime, end: datetime) -> dict:
+    """Totais por (ano, mês, tipo) no intervalo [start, end) com uma única consulta agrupada.
+
+    `start` e `end` devem ser inícios de mês; com USE_MONTHLY_ROLLUPS a leitura vem de monthly_rollups.
+    """
+    if app.config['USE_MONTHLY_ROLLUPS']:
+        month_index = MonthlyRollup.year * 12 + MonthlyRollup.month
+        rows = db.session.query(
+            MonthlyRollup.year,
+            MonthlyRollup.month,
+            MonthlyRollup.type,
+            db.func.sum(MonthlyRollup.total)
+        ).filter(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.count > 0,
+            month_index >= start.year * 12 + start.month,
+            month_index < end.year * 12 + end.month
+        ).group_by(MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.type).all()
+    else:
+        year_col = db.func.extract('year', Transaction.date)
+        month_col = db.func.extract('month', Transaction.date)
+        rows = db.session.query(
+            year_col,
+            month_col,
+            Transaction.type,
+            db.func.sum(Transaction.value)
+        ).filter(
+            Transaction.user_id == user_id,
+            Transaction.date >= start,
+            Transaction.date < end
+        ).group_by(year_col, month_col, Transaction.type).all()
+    return {(int(year), int(month), tipo): total or 0 for year, month, tipo, total in rows}
+
+
+PERIOD_TYPES = ('daily', 'weekly', 'monthly', 'semester', 'yearly', 'total')
+
+
+def period_range(period: str, now: datetime | None = None) -> tuple[datetime | None, datetime | None]:
+    """Intervalo semiaberto [início, fim) de um período relativo a `now`; None = sem limite.
+
+    - daily: hoje; weekly: últimos 7 dias (com hoje); monthly: mês atual;
+    - semester: últimos 6 meses do calendário (com o atual); yearly: ano atual; total: tudo.
+    """
+    now = now or datetime.now()
+    today = datetime(now.year, now.month, now.day)
+    if period == 'daily':
+        return today, today + timedelta(days=1)
+    if period == 'weekly':
+        return today - timedelta(days=6), today + timedelta(days=1)
+    if period == 'monthly':
+        return month_range(now.year, now.month)
+    if period in ('semester', 'semiannual'):
+        return datetime(*add_months(now.year, now.month, -5), 1), month_range(now.year, now.month)[1]
+    if period == 'yearly':
+        return datetime(now.year, 1, 1), datetime(now.year + 1, 1, 1)
+    if period == 'total':
+        return None, None
+    raise ValueError(f"Período inválido: {period}")
+
+
+def _is_month_start(value: datetime | None) -> bool:
+    return value is None or (value.day == 1 and value.time() == datetime.min.time())
+
+
+def _period_filters(user_id: int, start: datetime | None, end: datetime | None, use_rollups: bool) -> list:
+    if use_rollups:
+        month_index = MonthlyRollup.year * 12 + MonthlyRollup.month
+        filters = [MonthlyRollup.user_id == user_id, MonthlyRollup.count > 0]
+        if start is not None:
+            filters.append(month_index >= start.year * 12 + start.month)
+        if end is not None:
+            filters.append(month_index < end.year * 12 + end.month)
+        return filters
+    filters = [Transaction.user_id == user_id]
+    if start is not None:
+        filters.append(Transaction.date >= start)
+    if end is not None:
+        filters.append(Transaction.date < end)
+    return filters
+
+
+def sum_by_category(user_id: int, start: datetime | None = None, end: datetime | None = None,
+                    tipo: str | None = None) -> list:
+    """[(tipo, categoria, soma, quantidade)] das transações em [start, end).
+
+    Uma consulta agrupada no índice (user_id, date); com USE_MONTHLY_ROLLUPS e
+    limites em inícios de mês, lê monthly_rollups em vez de transactions.
+    """
+    use_rollups = app.config['USE_MONTHLY_ROLLUPS'] and _is_month_start(start) and _is_month_start(end)
+    model = MonthlyRollup if use_rollups else Transaction
+    total_col = db.func.sum(MonthlyRollup.total) if use_rollups else db.func.sum(Transaction.value)
+    count_col = db.func.sum(MonthlyRollup.count) if use_rollups else db.func.count(Transaction.id)
+    query = db.session.query(model.type, model.category, total_col, count_col).filter(
+        *_period_filters(user_id, start, end, use_rollups)
+    )
+    if tipo is not None:
+        query = query.filter(model.type == tipo)
+    rows = query.group_by(model.type, model.category).all()
+    return [(row_tipo, category, float(total or 0), int(count or 0)) for row_tipo, category, total, count in rows]
+
+
+def sum_by_type(user_id: int, start: datetime | None = None, end: datetime | None = None) -> dict:
+    """{tipo: (soma, quantidade)} das transações em [start, end), em uma consulta agrupada."""
+    use_rollups = app.config['USE_MONTHLY_ROLLUPS'] and _is_month_start(start) and _is_month_start(end)
+    if use_rollups:
+        query = db.session.query(MonthlyRollup.type, db.func.sum(MonthlyRollup.total), db.func.sum(MonthlyRollup.count))
+        group_col = MonthlyRollup.type
+    else:
+        query = db.session.query(Transaction.type, db.func.sum(Transaction.value), db.func.count(Transaction.id))
+        group_col = Transaction.type
+    rows = query.filter(*_period_filters(user_id, start, end, use_rollups)).group_by(group_col).all()
+    return {tipo: (float(total or 0), int(count or 0)) for tipo, total, count in rows}
+
+
+def encode_cursor(date: datetime | None, transaction_id: int) -> str:
+    """Gera o cursor opaco (date, id) da última transação de uma página (date vazia se NULL)."""
+    raw = f"{date.isoformat() if date else ''}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | None, int]:
+    """Decodifica um cursor gerado por encode_cursor. Lança ValueError se inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date_str, transaction_id = raw.split('|')
+        return (datetime.fromisoformat(date_str) if date_str else None), int(transaction_id)
+    except Exception as e:
+        raise ValueError('Cursor inválido') from e
+
+
+def in_month(column, year: int, month: int):
+    """Filtro de mês do calendário usável pelo índice (date >= início AND date < próximo início).
+
+    Substitui EXTRACT(month/year) FROM date, que impede o MySQL de usar o índice em `date`.
+    """
+    start, next_start = month_range(year, month)
+    return db.and_(column >= start, column < next_start)
+
+
+def monthly_expenses_query(user_id: int, year: int, month: int):
+    """Despesas do mês por categoria (SUM agrupado); conferida por `flask check-indexes`."""
+    return db.session.query(
+        Transaction.category,
+        db.func.sum(Transaction.value).label('total')
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.type == 'Despesa',
+        in_month(Transaction.date, year, month)
+    ).group_by(Transaction.category)
+
+
+def apply_rollup_delta(user_id: int | None, date: datetime | None, tipo: str, category: str,
+                       value: float, count: int) -> None:
+    """Soma `value`/`count` à linha de monthly_rollups da transação, na mesma transação do banco.
+
+    Chamado por toda escrita em transactions; o commit de quem chamou grava os dois juntos.
+    """
+    if user_id is None or date is None:
+        return
+    key = {
+        'user_id': user_id,
+        'year': date.year,
+        'month': date.month,
+        'type': tipo,
+        'category': category,
+    }
+    if db.engine.dialect.name == 'mysql':
+        stmt = mysql_insert(MonthlyRollup.__table__).values(**key, total=value, count=count)
+        stmt = stmt.on_duplicate_key_update(
+            total=MonthlyRollup.__table__.c.total + stmt.inserted.total,
+            count=MonthlyRollup.__table__.c.count + stmt.inserted.count,
+        )
+        db.session.execute(stmt)
+        return
+    # Demais bancos (ex.: SQLite local): leitura + escrita pelo ORM
+    rollup = db.session.get(MonthlyRollup, tuple(key.values()))
+    if rollup is None:
+        rollup = MonthlyRollup(**key, total=0, count=0)
+        db.session.add(rollup)
+    rollup.total += value
+    rollup.count += count
+
+
+def rebuild_monthly_rollups(user_id: int | None = None) -> int:
+    """Recalcula monthly_rollups a partir de transactions (backfill). Retorna o número de linhas gravadas."""
+    rollups = MonthlyRollup.query
+    if user_id is not None:
+        rollups = rollups.filter(MonthlyRollup.user_id == user_id)
+    rollups.delete(synchronize_session=False)
+
+    year_col = db.func.extract('year', Transaction.date)
+    month_col = db.func.extract('month', Transaction.date)
+    query = db.session.query(
+        Transaction.user_id,
+        year_col,
+        month_col,
+        Transaction.type,
+        Transaction.category,
+        db.func.sum(Transaction.value),
+        db.func.count(Transaction.id)
+    ).filter(
+        Transaction.user_id.isnot(None),
+        Transaction.date.isnot(None)
+    )
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+    rows = query.group_by(Transaction.user_id, year_col, month_col, Transaction.type, Transaction.category).all()
+
+    if rows:
+        db.session.execute(MonthlyRollup.__table__.insert(), [{
+            'user_id': uid,
+            'year': int(year),
+            'month': int(month),
+            'type': tipo,
+            'category': category,
+            'total': total or 0,
+            'count': count,
+        } for uid, year, month, tipo, category, total, count in rows])
+    db.session.commit()
+    return len(rows)
+
+
+@app.cli.command('rebuild-rollups')
+@click.option('--user-id', type=int, default=None, help='Recalcula apenas este usuário.')
+def rebuild_rollups_command(user_id):
+    """Recalcula a tabela monthly_rollups a partir das transações."""
+    db.create_all()
+    count = rebuild_monthly_rollups(user_id)
+    click.echo(f"✅ monthly_rollups recalculada: {count} linha(s)")
+
+
+@app.cli.command('calibrate-password-hash')
+@click.option('--hasher', type=click.Choice(sorted(HASHERS)), default=None, help='Padrão: PASSWORD_HASHER.')
+@click.option('--target-ms', type=float, default=None, help='Padrão: PASSWORD_HASH_TARGET_MS.')
+def calibrate_password_hash_command(hasher, target_ms):
+    """Mede o custo do hash de senha e sugere PASSWORD_HASH_PARAMS."""
+    hasher = hasher or app.config['PASSWORD_HASHER']
+    target_ms = target_ms or app.config['PASSWORD_HASH_TARGET_MS']
+    chosen, timings = calibrate(hasher, target_ms)
+    for params, elapsed_ms in timings:
+        mark = '→' if params == chosen else ' '
+        click.echo(f"{mark} {hasher} {params}: {elapsed_ms} ms")
+    click.echo(f"✅ PASSWORD_HASHER={hasher}")
+    click.echo("✅ PASSWORD_HASH_PARAMS=" + ','.join(f"{k}={v}" for k, v in chosen.items()))
+
+
+@app.cli.command('sweep-sessions')
+def sweep_sessions_command():
+    """Remove as sessões expiradas do armazenamento de sessões."""
+    click.echo(f"✅ Sessões expiradas removidas: {session_store.sweep()}")
+
+
+@app.cli.command('check-indexes')
+@click.option('--user-id', type=int, default=None, help='Padrão: o primeiro usuário.')
+def check_indexes_command(user_id):
+    """Roda EXPLAIN na soma mensal de despesas e confere que o banco usa um índice em `date`."""
+    db.create_all()
+    ensure_indexes()
+    if user_id is None:
+        user_id = db.session.query(db.func.min(User.id)).scalar() or 0
+    now = datetime.now()
+    compiled = monthly_expenses_query(user_id, now.year, now.month).statement.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup) if compiled.positional else compiled.params
+    dialect = db.engine.dialect.name
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    rows = db.session.connection().exec_driver_sql(prefix + str(compiled), params).mappings().all()
+    db.session.rollback()
+
+    if dialect == 'sqlite':
+        details = [row['detail'] for row in rows]
+        chosen = [m.group(1) for m in (re.search(r'USING (?:COVERING )?INDEX (\w+)', d) for d in details) if m]
+    else:
+        details = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}" for row in rows]
+        chosen = [row['key'] for row in rows if row['table'] == 'transactions' and row['key']]
+    for detail in details:
+        click.echo(f"   {detail}")
+
+    # Índices com `date` logo após user_id (ou sozinho) permitem o intervalo do mês
+    date_indexes = {index.name for index in Transaction.__table__.indexes
+                    if 'date' in [c.name for c in index.columns][:2]}
+    if not set(chosen) & date_indexes:
+        click.echo(f"❌ Soma mensal sem índice em date (usado: {', '.join(chosen) or 'nenhum'}; "
+                   f"esperado: {', '.join(sorted(date_indexes))})")
+        raise SystemExit(1)
+    click.echo(f"✅ Soma mensal usa o índice {', '.join(sorted(set(chosen) & date_indexes))}")
+
+
+@app.cli.command('sweep-report-jobs')
+def sweep_report_jobs_command():
+    """Remove jobs de relatório criados há mais de REPORT_JOB_RETENTION_HOURS."""
+    click.echo(f"✅ Jobs de relatório removidos: {sweep_report_jobs()}")
+
+
+def bump_data_version(user_id: int | None, kind: str | None = None) -> None:
+    """Incrementa a versão dos dados do usuário na mesma transação do banco da alteração.
+
+    Toda rota que altera transações, metas ou orçamentos chama esta função antes do
+    commit; respostas em cache de versões anteriores deixam de ser encontradas.
+    `kind` (um de DATA_KINDS; None = todos) é publicado em /api/events após o commit.
+    """
+    if user_id is None:
+        return
+    changed = db.session.info.setdefault('changed_data', {})
+    changed.setdefault(user_id, set()).update([kind] if kind else DATA_KINDS)
+    if db.engine.dialect.name == 'mysql':
+        stmt = mysql_insert(DataVersion.__table__).values(user_id=user_id, version=1, updated_at=datetime.utcnow())
+        stmt = stmt.on_duplicate_key_update(
+            version=DataVersion.__table__.c.version + 1,
+            updated_at=stmt.inserted.updated_at,
+        )
+        db.session.execute(stmt)
+        return
+    data_version = db.session.get(DataVersion, user_id)
+    if data_version is None:
+        db.session.add(DataVersion(user_id=user_id, version=1))
+    else:
+        data_version.version += 1
+
+
+@event.listens_for(db.session, 'after_commit')
+def publish_data_changes(session):
+    """Avisa os assinantes de /api/events somente depois que a alteração foi gravada."""
+    for user_id, kinds in session.info.pop('changed_data', {}).items():
+        event_broker.publish(user_id, {'kinds': sorted(kinds)})
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_data_changes(session):
+    session.info.pop('changed_data', None)
+
+
+def current_data_version(user_id: int) -> int:
+    """Versão dos dados do usuário (0 se nunca alterados) lida agora, na transação corrente."""
+    version = db.session.query(DataVersion.version).filter(DataVersion.user_id == user_id).scalar()
+    return version or 0
+
+
+def get_data_version(user_id: int) -> int:
+    """Versão atual dos dados do usuário (0 se nunca alterados), lida uma vez por requisição."""
+    versions = g.setdefault('data_versions', {})
+    if user_id not in versions:
+        versions[user_id] = current_data_version(user_id)
+    return versions[user_id]
+
+
+def request_params_hash(params=None) -> str:
+    """Hash curto dos parâmetros que distinguem a resposta (padrão: a query string)."""
+    request_params = params() if params else request.args.to_dict()
+    return hashlib.sha1(json.dumps(request_params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def cached_response(endpoint: str, params=None):
+    """Guarda respostas JSON 200 da rota no cache, por (usuário, rota, parâmetros, versão dos dados, dia).
+
+    `params` é uma função que devolve os parâmetros que distinguem a resposta
+    (padrão: a query string). Como a chave inclui a versão dos dados, qualquer
+    alteração do usuário invalida na hora as entradas antigas, em todos os workers;
+    o dia entra porque as rotas agregam pelo mês/data correntes, como no ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = get_current_user_id()
+            if not user_id:
+                return view(*args, **kwargs)
+
+            key = (f"resp:{user_id}:{endpoint}:{get_data_version(user_id)}:{request_params_hash(params)}:"
+                   f"{datetime.now().date().isoformat()}")
+
+            cached = response_cache.get(key)
+            if cached is not None:
+                return Response(cached, mimetype='application/json')
+
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.mimetype == 'application/json':
+                response_cache.set(key, response.get_data())
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_response(endpoint: str):
+    """Responde 304 quando o If-None-Match do cliente bate com o ETag atual.
+
+    O ETag forte deriva de (usuário, rota, query string, versão dos dados, dia):
+    é calculado com uma leitura por chave primária, sem executar a rota. O dia
+    entra no ETag porque as rotas agregam pelo mês/data correntes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = get_current_user_id()
+            if not user_id:
+                return view(*args, **kwargs)
+
+            raw = f"{user_id}:{endpoint}:{get_data_version(user_id)}:{request_params_hash()}:{datetime.now().date().isoformat()}"
+            etag = hashlib.sha1(raw.encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # O navegador sempre revalida; o script guarda o corpo e reenvia o ETag
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def report_request_params() -> dict:
+    """Parâmetros do corpo JSON que definem um relatório gerado."""
+    data = request.get_json(force=True, silent=True) or {}
+    return {
+        'period': data.get('period', 'current_month'),
+        'report_type': data.get('report_type', 'financial'),
+        'async': bool(data.get('async')),
+    }
+
+
+def load_transaction_aggregates(user_id: int) -> dict:
+    """Agrega as transações do usuário em uma única consulta agrupada.
+
+    Agrupa por (ano, mês, tipo, categoria) e deriva em Python os totais mensais,
+    os totais gerais e a divisão por categoria usados pelo dashboard. Com
+    USE_MONTHLY_ROLLUPS ativo, lê monthly_rollups em vez de somar transactions.
+    """
+    if app.config['USE_MONTHLY_ROLLUPS']:
+        rows = db.session.query(
+            MonthlyRollup.year,
+            MonthlyRollup.month,
+            MonthlyRollup.type,
+            MonthlyRollup.category,
+            MonthlyRollup.total
+        ).filter(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.count > 0
+        ).all()
+    else:
+        year_col = db.func.extract('year', Transaction.date)
+        month_col = db.func.extract('month', Transaction.date)
+        rows = db.session.query(
+            year_col,
+            month_col,
+            Transaction.type,
+            Transaction.category,
+            db.func.sum(Transaction.value)
+        ).filter(
+            Transaction.user_id == user_id
+        ).group_by(year_col, month_col, Transaction.type, Transaction.category).all()
+
+    monthly = {}             # (ano, mês, tipo) -> total
+    totals = {}              # tipo -> total geral
+    categories = {}          # (ano, mês, tipo) -> {categoria: total}
+    totals_by_category = {}  # tipo -> {categoria: total geral}
+    for year, month, tipo, category, total in rows:
+        total = total or 0
+        totals[tipo] = totals.get(tipo, 0) + total
+        type_categories = totals_by_category.setdefault(tipo, {})
+        type_categories[category] = type_categories.get(category, 0) + total
+        if year is None:
+            # Transações sem data só entram nos totais gerais
+            continue
+        key = (int(year), int(month), tipo)
+        monthly[key] = monthly.get(key, 0) + total
+        month_categories = categories.setdefault(key, {})
+        month_categories[category] = month_categories.get(category, 0) + total
+
+    return {
+        'monthly': monthly,
+        'totals': totals,
+        'categories': categories,
+        'totals_by_category': totals_by_category,
+    }
+
 
 # Rotas principais
 @app.route('/')
@@ -160,6 +887,7 @@ def register():
         user.set_password(password)
         db.session.add(user)
         db.session.commit()
+        forget_unknown_email(email)
 
         # Autologin após cadastro
         session['user_id'] = user.id
@@ -169,6 +897,78 @@ def register():
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
+def is_unknown_email(email: str) -> bool:
+    return unknown_emails is not None and bool(unknown_emails.get(f"unknown-email:{email}"))
+
+
+def remember_unknown_email(email: str) -> None:
+    if unknown_emails is not None:
+        unknown_emails.set(f"unknown-email:{email}", b'1')
+
+
+def forget_unknown_email(email: str) -> None:
+    if unknown_emails is not None:
+        unknown_emails.delete(f"unknown-email:{email}")
+
+
+def login_client_ip() -> str | None:
+    """IP do cliente para o limite de login; None (só o limite por e-mail) quando não é confiável.
+
+    Sem PROXY_FIX_X_FOR, atrás do nginx todo cliente chega como 127.0.0.1: contar
+    esse endereço bloquearia todos os usuários juntos.
+    """
+    address = request.remote_addr
+    if not address:
+        return None
+    if not app.config['PROXY_FIX_X_FOR']:
+        try:
+            if ipaddress.ip_address(address).is_loopback:
+                return None
+        except ValueError:
+            return None
+    return address
+
+
+def login_throttled(email: str):
+    """Resposta 429 se o IP ou o e-mail estiverem bloqueados; None se a tentativa pode seguir."""
+    wait = login_limiter.retry_after(ip=login_client_ip(), email=email)
+    if not wait:
+        return None
+    response = jsonify({
+        'success': False,
+        'message': f'Muitas tentativas. Tente novamente em {math.ceil(wait / 60)} minuto(s).',
+    })
+    response.headers['Retry-After'] = str(wait)
+    return response, 429
+
+
+# Estatísticas do limite de login e do cache de e-mails inexistentes (deste processo)
+@app.route('/api/login/stats')
+@login_required
+def login_stats():
+    return jsonify({'limiter': login_limiter.stats(), 'unknown_emails': unknown_emails.stats() if unknown_emails else None})
+
+
+password_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='password-rehash')
+
+
+def rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """Regrava a senha com o hasher atual, fora da requisição de login.
+
+    Só atualiza se o hash gravado ainda for `old_hash`: uma troca de senha
+    concorrente não é sobrescrita.
+    """
+    try:
+        new_hash = password_service.hash(password)
+        with app.app_context():
+            User.query.filter_by(id=user_id, password_hash=old_hash).update(
+                {'password_hash': new_hash}, synchronize_session=False
+            )
+            db.session.commit()
+    except Exception as e:
+        log.warning("Erro ao atualizar hash da senha", extra={'user_id': user_id, 'error': str(e)})
+
+
 @app.route('/api/login', methods=['POST'])
 def api_login():
     try:
@@ -179,9 +979,22 @@ def api_login():
         if not email or not password:
             return jsonify({'success': False, 'message': 'Informe e-mail e senha.'}), 400
 
+        throttled = login_throttled(email)
+        if throttled:
+            return throttled
+        if is_unknown_email(email):
+            login_limiter.hit(ip=login_client_ip(), email=email)
+            return jsonify({'success': False, 'message': 'Credenciais inválidas.'}), 401
+
         user = User.query.filter_by(email=email).first()
+        if not user:
+            remember_unknown_email(email)
         if not user or not user.check_password(password):
+            login_limiter.hit(ip=login_client_ip(), email=email)
             return jsonify({'success': False, 'message': 'Credenciais inválidas.'}), 401
+        login_limiter.reset(email=email)
+        if password_service.needs_rehash(user.password_hash):
+            password_rehash_executor.submit(rehash_password, user.id, user.password_hash, password)
 
         session['user_id'] = user.id
         session['username'] = user.username
@@ -204,14 +1017,27 @@ def get_password_hint():
         email = (data.get('email') or '').strip().lower()
         if not email:
             return jsonify({'success': False, 'message': 'Informe o e-mail.'}), 400
+        throttled = login_throttled(email)
+        if throttled:
+            return throttled
+        # Toda consulta de dica conta para o IP; as sem dica também para o e-mail
+        login_limiter.hit(ip=login_client_ip())
+        if is_unknown_email(email):
+            login_limiter.hit(email=email)
+            return jsonify({'success': False, 'message': 'Nenhuma dica cadastrada.'}), 404
         user = User.query.filter_by(email=email).first()
+        if not user:
+            remember_unknown_email(email)
         if not user or not user.password_hint:
+            login_limiter.hit(email=email)
             return jsonify({'success': False, 'message': 'Nenhuma dica cadastrada.'}), 404
         return jsonify({'success': True, 'hint': user.password_hint})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 @app.route('/api/dashboard-data')
+@conditional_response('dashboard')
+@cached_response('dashboard')
 def get_dashboard_data():
     """Retorna dados para o dashboard com tendências reais."""
     now = datetime.now()
@@ -225,13 +1051,11 @@ def get_dashboard_data():
     if not user_id:
         return jsonify({'saldo': 0, 'receitas': 0, 'despesas': 0, 'economia': 0, 'months_data': [], 'categorias_despesas': [], 'trends': {}})
 
+    # Uma única consulta agrupada alimenta todos os números do dashboard
+    aggregates = load_transaction_aggregates(user_id)
+
     def sum_by(month: int, year: int, tipo: str) -> float:
-        return db.session.query(db.func.sum(Transaction.value)).filter(
-            Transaction.type == tipo,
-            db.func.extract('month', Transaction.date) == month,
-            db.func.extract('year', Transaction.date) == year,
-            Transaction.user_id == user_id
-        ).scalar() or 0
+        return aggregates['monthly'].get((year, month, tipo), 0)
 
     # Calcular totais do mês atual
     receitas = sum_by(current_month, current_year, 'Receita')
@@ -239,15 +1063,8 @@ def get_dashboard_data():
     
     # Se não há dados no mês atual, calcular totais de TODOS os dados
     # Isso garante que os cards sempre mostrem dados se existirem
-    all_receitas = db.session.query(db.func.sum(Transaction.value)).filter(
-        Transaction.type == 'Receita',
-        Transaction.user_id == user_id
-    ).scalar() or 0
-    
-    all_despesas = db.session.query(db.func.sum(Transaction.value)).filter(
-        Transaction.type == 'Despesa',
-        Transaction.user_id == user_id
-    ).scalar() or 0
+    all_receitas = aggregates['totals'].get('Receita', 0)
+    all_despesas = aggregates['totals'].get('Despesa', 0)
     
     # Usar dados do mês atual, ou se vazio, usar todos os dados
     if receitas == 0 and despesas == 0 and (all_receitas > 0 or all_despesas > 0):
@@ -297,25 +1114,11 @@ def get_dashboard_data():
     months_data = list(reversed(months_data))
 
     # Categorias de despesas - tentar mês atual primeiro
-    categorias_despesas = db.session.query(
-        Transaction.category,
-        db.func.sum(Transaction.value).label('total')
-    ).filter(
-        Transaction.type == 'Despesa',
-        db.func.extract('month', Transaction.date) == current_month,
-        db.func.extract('year', Transaction.date) == current_year,
-        Transaction.user_id == user_id
-    ).group_by(Transaction.category).all()
+    categorias_despesas = list(aggregates['categories'].get((current_year, current_month, 'Despesa'), {}).items())
     
     # Se não há categorias no mês atual, buscar todas as categorias
     if not categorias_despesas:
-        categorias_despesas = db.session.query(
-            Transaction.category,
-            db.func.sum(Transaction.value).label('total')
-        ).filter(
-            Transaction.type == 'Despesa',
-            Transaction.user_id == user_id
-        ).group_by(Transaction.category).all()
+        categorias_despesas = list(aggregates['totals_by_category'].get('Despesa', {}).items())
 
     return jsonify({
         'saldo': saldo,
@@ -333,42 +1136,67 @@ def get_dashboard_data():
     })
 
 @app.route('/api/transactions')
+@conditional_response('transactions')
 def get_transactions():
-    """Retorna lista de transações com paginação opcional"""
+    """Retorna lista de transações com paginação por cursor ou por página.
+
+    - Sem parâmetros: primeira página (200) em ordem date DESC, id DESC; o cursor da
+      próxima página vem no cabeçalho X-Next-Cursor.
+    - `after=<cursor>` (vazio para a primeira página): paginação por cursor, sem COUNT;
+      responde {'transactions': [...], 'next_cursor': ...}.
+    - `page`/`per_page`: paginação por OFFSET, mantida por compatibilidade.
+    """
     user_id = get_current_user_id()
     
-    # Debug: verificar autenticação
     if not user_id:
-        print(f"⚠️  GET /api/transactions: Usuário não autenticado. Sessão: {session}")
+        transactions_log.info("GET /api/transactions sem usuário autenticado")
         return jsonify({'error': 'Usuário não autenticado', 'transactions': []}), 401
     
     # Parâmetros de paginação opcionais
+    after = request.args.get('after')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 100, type=int)  # Padrão: 100 por página
-    per_page = min(per_page, 500)  # Máximo 500 por página para evitar sobrecarga
+    per_page = max(1, min(per_page, 500))  # Entre 1 e 500 por página para evitar sobrecarga
     
-    # Query otimizada com paginação e índice
-    # Usar índices: user_id (já indexado) e date (agora indexado)
-    query = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.date.desc())
+    # Ordem estável (date, id) coberta pelo índice ix_transactions_user_date_id
+    query = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.date.desc(), Transaction.id.desc())
+    cursor_mode = after is not None
+    next_cursor = None
     
-    # Se não especificou paginação, retornar todas (mas com limite de segurança)
-    if page == 1 and per_page == 100:
-        # Para melhor performance, limitar primeiro e só contar se necessário
-        # Isso evita o COUNT completo quando há muitos registros
-        transactions = query.limit(201).all()  # Pegar 201 para saber se há mais
-        
-        # Se retornou 201, significa que há mais registros
-        if len(transactions) > 200:
-            transactions = transactions[:200]  # Manter só 200
-            print(f"✅ GET /api/transactions: Usuário {user_id} - {len(transactions)} transações retornadas (há mais disponíveis)")
-        else:
-            print(f"✅ GET /api/transactions: Usuário {user_id} - {len(transactions)} transações encontradas")
+    if cursor_mode or ('page' not in request.args and 'per_page' not in request.args):
+        # Paginação por cursor: busca per_page + 1 linhas para saber se há mais, sem COUNT
+        if not cursor_mode:
+            per_page = 200
+        if after:
+            try:
+                after_date, after_id = decode_cursor(after)
+            except ValueError as e:
+                return jsonify({'error': str(e), 'transactions': []}), 400
+            # Datas NULL vêm por último em date DESC (MySQL e SQLite)
+            if after_date is None:
+                query = query.filter(Transaction.date.is_(None), Transaction.id < after_id)
+            else:
+                query = query.filter(db.or_(
+                    Transaction.date < after_date,
+                    db.and_(Transaction.date == after_date, Transaction.id < after_id),
+                    Transaction.date.is_(None)
+                ))
+        transactions = query.limit(per_page + 1).all()
+        if len(transactions) > per_page:
+            transactions = transactions[:per_page]
+            last = transactions[-1]
+            next_cursor = encode_cursor(last.date, last.id)
+        transactions_log.debug("GET /api/transactions", extra={
+            'user_id': user_id, 'count': len(transactions), 'mode': 'cursor', 'has_more': next_cursor is not None,
+        })
     else:
         # Paginação explícita
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         transactions = pagination.items
         total_count = pagination.total
-        print(f"✅ GET /api/transactions: Usuário {user_id} - Página {page}: {len(transactions)} transações (de {total_count} total)")
+        transactions_log.debug("GET /api/transactions", extra={
+            'user_id': user_id, 'count': len(transactions), 'mode': 'page', 'page': page, 'total': total_count,
+        })
     
     # Converter para JSON de forma otimizada
     result = [{
@@ -377,10 +1205,15 @@ def get_transactions():
         'value': float(t.value),
         'category': t.category,
         'type': t.type,
-        'date': t.date.strftime('%Y-%m-%d')
+        'date': t.date.strftime('%Y-%m-%d') if t.date else None
     } for t in transactions]
     
-    return jsonify(result)
+    if cursor_mode:
+        return jsonify({'transactions': result, 'next_cursor': next_cursor})
+    response = jsonify(result)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/transactions', methods=['POST'])
 def add_transaction():
@@ -396,6 +1229,9 @@ def add_transaction():
             user_id=get_current_user_id()
         )
         db.session.add(transaction)
+        apply_rollup_delta(transaction.user_id, transaction.date, transaction.type,
+                           transaction.category, transaction.value, 1)
+        bump_data_version(transaction.user_id, 'transactions')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Transação adicionada com sucesso!'})
     except Exception as e:
@@ -407,6 +1243,7 @@ def update_transaction(transaction_id):
     try:
         data = request.get_json(force=True)
         transaction = Transaction.query.filter_by(id=transaction_id, user_id=get_current_user_id()).first_or_404()
+        previous = (transaction.date, transaction.type, transaction.category, transaction.value)
 
         if 'description' in data:
             transaction.description = str(data['description'])
@@ -422,6 +1259,14 @@ def update_transaction(transaction_id):
             except ValueError:
                 return jsonify({'success': False, 'message': 'Data inválida. Use o formato YYYY-MM-DD.'}), 400
 
+        # Move o valor entre linhas do rollup se data, tipo, categoria ou valor mudaram
+        current = (transaction.date, transaction.type, transaction.category, transaction.value)
+        if current != previous:
+            old_date, old_type, old_category, old_value = previous
+            apply_rollup_delta(transaction.user_id, old_date, old_type, old_category, -old_value, -1)
+            apply_rollup_delta(transaction.user_id, transaction.date, transaction.type,
+                               transaction.category, transaction.value, 1)
+        bump_data_version(transaction.user_id, 'transactions')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Transação atualizada com sucesso!'})
     except Exception as e:
@@ -432,13 +1277,257 @@ def delete_transaction(transaction_id):
     """Remove transação"""
     try:
         transaction = Transaction.query.filter_by(id=transaction_id, user_id=get_current_user_id()).first_or_404()
+        apply_rollup_delta(transaction.user_id, transaction.date, transaction.type,
+                           transaction.category, -transaction.value, -1)
+        bump_data_version(transaction.user_id, 'transactions')
         db.session.delete(transaction)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Transação removida com sucesso!'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
+BULK_MAX_ROWS = 50000
+BULK_CHUNK_SIZE = 1000
+
+def parse_transaction_row(row: dict) -> dict:
+    """Valida uma linha de importação e devolve os valores prontos para inserção.
+
+    Lança ValueError com a mensagem de erro da linha.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('Linha deve ser um objeto com description, value, category, type e date.')
+    missing = [field for field in ('description', 'value', 'category', 'type', 'date')
+               if row.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Campos obrigatórios ausentes: {', '.join(missing)}.")
+    value = row['value']
+    if isinstance(value, str):
+        value = value.strip()
+        if ',' in value and '.' not in value:
+            value = value.replace(',', '.')  # aceita decimal com vírgula (ex.: 1234,56)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('Valor inválido.')
+    tipo = str(row['type']).strip()
+    if tipo not in ('Receita', 'Despesa'):
+        raise ValueError('Tipo inválido. Use Receita ou Despesa.')
+    try:
+        date = datetime.strptime(str(row['date']).strip(), '%Y-%m-%d')
+    except ValueError:
+        raise ValueError('Data inválida. Use o formato YYYY-MM-DD.')
+    return {
+        'description': str(row['description']).strip()[:200],
+        'value': value,
+        'category': str(row['category']).strip()[:100],
+        'type': tipo,
+        'date': date,
+    }
+
+@app.route('/api/transactions/bulk', methods=['POST'])
+def bulk_add_transactions():
+    """Importa transações em lote a partir de um array JSON ou de um CSV.
+
+    O CSV pode vir como upload (campo `file`) ou no corpo com Content-Type text/csv,
+    com cabeçalho description,value,category,type,date. Todas as linhas são
+    validadas antes de inserir; havendo erro, nada é gravado e a resposta lista
+    os erros por linha. As inserções são feitas em blocos (executemany) numa
+    única transação do banco, junto com a atualização de monthly_rollups.
+    """
+    try:
+        user_id = get_current_user_id()
+        if not user_id:
+            return jsonify({'success': False, 'message': 'Usuário não autenticado'}), 401
+
+        if 'file' in request.files:
+            text_data = request.files['file'].read().decode('utf-8-sig')
+            rows = list(csv.DictReader(io.StringIO(text_data)))
+        elif request.mimetype == 'text/csv':
+            rows = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+        else:
+            rows = request.get_json(force=True)
+            if not isinstance(rows, list):
+                return jsonify({'success': False, 'message': 'Envie um array JSON de transações ou um arquivo CSV.'}), 400
+
+        if not rows:
+            return jsonify({'success': False, 'message': 'Nenhuma transação para importar.'}), 400
+        if len(rows) > BULK_MAX_ROWS:
+            return jsonify({'success': False, 'message': f'Máximo de {BULK_MAX_ROWS} transações por importação.'}), 413
+
+        # Validar tudo antes de gravar qualquer linha
+        values = []
+        errors = []
+        for index, row in enumerate(rows, 1):
+            try:
+                values.append({**parse_transaction_row(row), 'user_id': user_id})
+            except ValueError as e:
+                errors.append({'row': index, 'message': str(e)})
+        if errors:
+            return jsonify({
+                'success': False,
+                'message': f'{len(errors)} linha(s) com erro. Nenhuma transação foi importada.',
+                'errors': errors
+            }), 400
+
+        for start in range(0, len(values), BULK_CHUNK_SIZE):
+            db.session.execute(Transaction.__table__.insert(), values[start:start + BULK_CHUNK_SIZE])
+
+        # Um ajuste de rollup por (ano, mês, tipo, categoria), não por linha
+        deltas = {}
+        for v in values:
+            key = (v['date'].year, v['date'].month, v['type'], v['category'])
+            total, count = deltas.get(key, (0, 0))
+            deltas[key] = (total + v['value'], count + 1)
+        for (year, month, tipo, category), (total, count) in deltas.items():
+            apply_rollup_delta(user_id, datetime(year, month, 1), tipo, category, total, count)
+        bump_data_version(user_id, 'transactions')
+
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'message': f'{len(values)} transações importadas com sucesso!',
+            'imported': len(values)
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+EXPORT_COLUMNS = ('id', 'description', 'value', 'category', 'type', 'date')
+EXPORT_CHUNK_SIZE = 1000
+
+@app.route('/api/transactions/export')
+def export_transactions():
+    """Exporta todo o histórico de transações do usuário em NDJSON (padrão) ou CSV.
+
+    As linhas são lidas com cursor no servidor (stream_results) em blocos de
+    EXPORT_CHUNK_SIZE e escritas na resposta conforme chegam, sem montar objetos
+    ORM nem a lista completa em memória.
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Usuário não autenticado'}), 401
+
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Formato inválido. Use ndjson ou csv.'}), 400
+
+    stmt = db.select(
+        Transaction.id,
+        Transaction.description,
+        Transaction.value,
+        Transaction.category,
+        Transaction.type,
+        Transaction.date
+    ).where(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.date.desc(), Transaction.id.desc())
+
+    def generate():
+        with db.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE).execute(stmt)
+            if export_format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(EXPORT_COLUMNS)
+                for rows in result.partitions():
+                    for t in rows:
+                        writer.writerow([t.id, t.description, float(t.value), t.category, t.type,
+                                         t.date.strftime('%Y-%m-%d') if t.date else ''])
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                yield buffer.getvalue()
+            else:
+                for rows in result.partitions():
+                    yield ''.join(json.dumps({
+                        'id': t.id,
+                        'description': t.description,
+                        'value': float(t.value),
+                        'category': t.category,
+                        'type': t.type,
+                        'date': t.date.strftime('%Y-%m-%d') if t.date else None
+                    }, ensure_ascii=False) + '\n' for t in rows)
+
+    if export_format == 'csv':
+        mimetype = 'text/csv'
+    else:
+        mimetype = 'application/x-ndjson'
+    filename = f"transacoes.{export_format}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/events')
+def data_events():
+    """Stream SSE com as alterações de transações, metas e orçamentos do usuário.
+
+    Envia `ready` ao conectar, `change` com os tipos alterados após cada commit e
+    um comentário de heartbeat a cada EVENTS_HEARTBEAT_SECONDS. A conexão aberta
+    não segura conexão com o banco: o cliente só consulta a API quando algo muda.
+    Atrás do nginx o feed é servido pelo MCP (uvicorn), sem ocupar threads daqui.
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Usuário não autenticado'}), 401
+
+    max_streams = app.config['EVENTS_MAX_STREAMS']
+    with _event_streams_lock:
+        if max_streams is not None and _event_streams['open'] >= max_streams:
+            _event_streams['rejected'] += 1
+            # EventSource não reconecta após status diferente de 200: o cliente passa ao polling
+            return jsonify({'error': 'Limite de conexões de eventos atingido'}), 503, {'Retry-After': '30'}
+        _event_streams['open'] += 1
+
+    def release_stream():
+        with _event_streams_lock:
+            _event_streams['open'] -= 1
+
+    try:
+        version = get_data_version(user_id)
+    except Exception:
+        release_stream()
+        raise
+    heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+    subscriber = event_broker.subscribe(user_id)
+
+    def generate():
+        try:
+            yield f"retry: 5000\nevent: ready\ndata: {json.dumps({'version': version})}\n\n"
+            while True:
+                try:
+                    message = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                # Junta as alterações acumuladas em um único evento
+                kinds = set(message['kinds'])
+                while not subscriber.empty():
+                    kinds.update(subscriber.get_nowait()['kinds'])
+                yield f"event: change\ndata: {json.dumps({'kinds': sorted(kinds)})}\n\n"
+        finally:
+            event_broker.unsubscribe(user_id, subscriber)
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx: não bufferizar o stream
+    })
+    # Chamado pelo servidor ao fechar a resposta, mesmo se o stream nunca começou
+    response.call_on_close(release_stream)
+    return response
+
+# Conexões do feed de alterações deste processo
+@app.route('/api/events/stats')
+@login_required
+def event_stats():
+    with _event_streams_lock:
+        streams = dict(_event_streams, max=app.config['EVENTS_MAX_STREAMS'])
+    return jsonify({'broker': event_broker.stats(), 'streams': streams})
+
 @app.route('/api/goals')
+@conditional_response('goals')
+@cached_response('goals')
 def get_goals():
     """Retorna lista de metas"""
     goals = Goal.query.filter_by(user_id=get_current_user_id()).all()
@@ -466,6 +1555,7 @@ def add_goal():
             user_id=get_current_user_id()
         )
         db.session.add(goal)
+        bump_data_version(goal.user_id, 'goals')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Meta adicionada com sucesso!'})
     except Exception as e:
@@ -478,12 +1568,15 @@ def update_goal_progress(goal_id):
         data = request.json
         goal = Goal.query.filter_by(id=goal_id, user_id=get_current_user_id()).first_or_404()
         goal.current = float(data['current'])
+        bump_data_version(goal.user_id, 'goals')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Progresso atualizado com sucesso!'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 @app.route('/api/budget')
+@conditional_response('budget')
+@cached_response('budget')
 def get_budget():
     """Retorna dados do orçamento"""
     current_month = datetime.now().month
@@ -516,15 +1609,7 @@ def get_budget():
         return jsonify([])
     
     # Calcular gastos reais por categoria - tentar mês atual primeiro
-    categorias_gastos = db.session.query(
-        Transaction.category,
-        db.func.sum(Transaction.value).label('total')
-    ).filter(
-        Transaction.type == 'Despesa',
-        db.func.extract('month', Transaction.date) == current_month,
-        db.func.extract('year', Transaction.date) == current_year,
-        Transaction.user_id == user_id
-    ).group_by(Transaction.category).all()
+    categorias_gastos = monthly_expenses_query(user_id, current_year, current_month).all()
     
     gastos_dict = {c[0]: c[1] for c in categorias_gastos}
     
@@ -560,6 +1645,7 @@ def add_budget():
             user_id=get_current_user_id()
         )
         db.session.add(budget)
+        bump_data_version(budget.user_id, 'budgets')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Orçamento adicionado com sucesso!'})
     except Exception as e:
@@ -592,46 +1678,343 @@ def edit_budget():
             return jsonify({'success': False, 'message': 'Orçamento não encontrado para esta categoria.'}), 404
 
         budget.budget_amount = new_amount
+        bump_data_version(user_id, 'budgets')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Orçamento atualizado.'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
+MONTHLY_REPORT_MAX_MONTHS = 120
+
 @app.route('/api/reports/monthly')
+@cached_response('reports_monthly')
 def get_monthly_report():
-    """Retorna relatório mensal"""
-    current_year = datetime.now().year
+    """Retorna relatório mensal.
+
+    Sem parâmetros cobre janeiro a dezembro do ano atual; `year=AAAA` escolhe outro
+    ano e `from=AAAA-MM&to=AAAA-MM` um intervalo de meses (inclusivo). Qualquer que
+    seja o intervalo, os totais vêm de uma única consulta agrupada por mês e tipo.
+    """
     user_id = get_current_user_id()
+    try:
+        if request.args.get('from') or request.args.get('to'):
+            first = datetime.strptime(request.args.get('from', ''), '%Y-%m')
+            last = datetime.strptime(request.args.get('to', ''), '%Y-%m')
+        else:
+            year = request.args.get('year', datetime.now().year, type=int)
+            first, last = datetime(year, 1, 1), datetime(year, 12, 1)
+    except ValueError:
+        return jsonify({'error': 'Parâmetros inválidos. Use year=AAAA ou from=AAAA-MM&to=AAAA-MM.'}), 400
+
+    num_months = (last.year - first.year) * 12 + (last.month - first.month) + 1
+    if num_months < 1 or num_months > MONTHLY_REPORT_MAX_MONTHS:
+        return jsonify({'error': f'Intervalo deve ter entre 1 e {MONTHLY_REPORT_MAX_MONTHS} meses.'}), 400
+
+    end = datetime(*add_months(last.year, last.month, 1), 1)
+    totals = load_monthly_totals(user_id, first, end)
+
     monthly_data = []
-    
-    for month in range(1, 13):
-        receitas = db.session.query(db.func.sum(Transaction.value)).filter(
-            Transaction.type == 'Receita',
-            db.func.extract('month', Transaction.date) == month,
-            db.func.extract('year', Transaction.date) == current_year,
-            Transaction.user_id == user_id
-        ).scalar() or 0
-        
-        despesas = db.session.query(db.func.sum(Transaction.value)).filter(
-            Transaction.type == 'Despesa',
-            db.func.extract('month', Transaction.date) == month,
-            db.func.extract('year', Transaction.date) == current_year,
-            Transaction.user_id == user_id
-        ).scalar() or 0
-        
+    for i in range(num_months):
+        year, month = add_months(first.year, first.month, i)
+        receitas = totals.get((year, month, 'Receita'), 0)
+        despesas = totals.get((year, month, 'Despesa'), 0)
         monthly_data.append({
-            'month': datetime(2024, month, 1).strftime('%b'),
+            'month': datetime(year, month, 1).strftime('%b'),
+            'year': year,
             'receitas': receitas,
             'despesas': despesas,
             'saldo': receitas - despesas
         })
-    
 
     return jsonify(monthly_data)
 
+def report_period_start(period: str, now: datetime) -> datetime:
+    """Início (primeiro dia do mês) do período de um relatório."""
+    if period == 'current_month':
+        return datetime(now.year, now.month, 1)
+    if period == 'last_3_months':
+        return datetime(*add_months(now.year, now.month, -3), 1)
+    if period == 'last_6_months':
+        return datetime(*add_months(now.year, now.month, -6), 1)
+    return datetime(2020, 1, 1)  # all_time
+
+
+def build_financial_report(user_id: int, period: str, report_type: str, now: datetime | None = None) -> dict:
+    """Monta o relatório financeiro completo com no máximo duas consultas.
+
+    Uma consulta agrupada por (ano, mês, tipo, categoria) cobre o período do relatório e
+    os últimos 12 meses; uma única passada por essas linhas produz o resumo, as duas
+    divisões por categoria e a série mensal. A segunda consulta busca as 100 transações
+    mais recentes do período para a tabela.
+    """
+    now = now or datetime.now()
+    start_date = report_period_start(period, now)
+    end_date = now
+
+    # Série mensal: os 12 meses do calendário até o mês atual, chaveados por (ano, mês)
+    series_months = [add_months(now.year, now.month, -i) for i in range(11, -1, -1)]
+    series_start = datetime(*series_months[0], 1)
+    next_month_start = datetime(*add_months(now.year, now.month, 1), 1)
+    query_start = min(start_date, series_start)
+
+    if app.config['USE_MONTHLY_ROLLUPS']:
+        # Rollups têm granularidade mensal: o mês atual entra inteiro no resumo
+        month_index = MonthlyRollup.year * 12 + MonthlyRollup.month
+        rows = db.session.query(
+            MonthlyRollup.year,
+            MonthlyRollup.month,
+            MonthlyRollup.type,
+            MonthlyRollup.category,
+            db.literal(True),
+            MonthlyRollup.total
+        ).filter(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.count > 0,
+            month_index >= query_start.year * 12 + query_start.month,
+            month_index < next_month_start.year * 12 + next_month_start.month
+        ).all()
+    else:
+        year_col = db.func.extract('year', Transaction.date)
+        month_col = db.func.extract('month', Transaction.date)
+        until_now = db.case((Transaction.date <= end_date, True), else_=False)
+        rows = db.session.query(
+            year_col,
+            month_col,
+            Transaction.type,
+            Transaction.category,
+            until_now,
+            db.func.sum(Transaction.value)
+        ).filter(
+            Transaction.user_id == user_id,
+            Transaction.date >= query_start,
+            Transaction.date < next_month_start
+        ).group_by(year_col, month_col, Transaction.type, Transaction.category, until_now).all()
+
+    start_key = (start_date.year, start_date.month)
+    totals = {'Receita': 0.0, 'Despesa': 0.0}
+    por_categoria = {'Receita': {}, 'Despesa': {}}
+    gastos_por_mes = {key: 0.0 for key in series_months}
+    for year, month, tipo, category, is_until_now, total in rows:
+        key = (int(year), int(month))
+        total = float(total or 0)
+        if key >= start_key and is_until_now and tipo in totals:
+            totals[tipo] += total
+            por_categoria[tipo][category] = por_categoria[tipo].get(category, 0) + total
+        if tipo == 'Despesa' and key in gastos_por_mes:
+            gastos_por_mes[key] += total
+
+    total_receitas = totals['Receita']
+    total_despesas = totals['Despesa']
+    saldo = total_receitas - total_despesas
+    despesas_por_categoria = por_categoria['Despesa']
+    receitas_por_categoria = por_categoria['Receita']
+    gastos_mensais = {
+        datetime(year, month, 1).strftime('%b/%Y'): gastos_por_mes[(year, month)]
+        for year, month in sorted(gastos_por_mes)
+    }
+
+    # Transações mais recentes do período para a tabela
+    transactions = Transaction.query.filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= start_date,
+        Transaction.date <= end_date
+    ).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(100).all()
+
+    # Estrutura de resposta compatível com o frontend
+    report_data = {
+        'summary': {
+            'total_receitas': float(total_receitas),
+            'total_despesas': float(total_despesas),
+            'saldo': float(saldo)
+        },
+        'by_category': {
+            'despesas': {k: float(v) for k, v in sorted(despesas_por_categoria.items(), key=lambda x: x[1], reverse=True)},
+            'receitas': {k: float(v) for k, v in receitas_por_categoria.items()}
+        },
+        'temporal': {
+            'gastos_mensais': gastos_mensais
+        },
+        'transactions': [{
+            'id': t.id,
+            'description': t.description,
+            'value': float(t.value),
+            'category': t.category,
+            'type': t.type,
+            'date': t.date.isoformat()
+        } for t in transactions]
+    }
+
+    # Insights
+    insights = []
+    if saldo > 0:
+        insights.append("✅ Excelente! Você está com saldo positivo.")
+    else:
+        insights.append("⚠️ Atenção: Saldo negativo. Revise seus gastos.")
+
+    if total_despesas > 0 and total_receitas > 0:
+        porcentagem = (total_despesas / total_receitas) * 100
+        if porcentagem > 90:
+            insights.append("📊 Suas despesas representam mais de 90% das receitas.")
+        elif porcentagem > 80:
+            insights.append("📊 Suas despesas representam mais de 80% das receitas.")
+
+    if despesas_por_categoria:
+        maior_categoria = max(despesas_por_categoria.items(), key=lambda x: x[1])
+        insights.append(f"💰 Maior categoria de despesa: {maior_categoria[0]} (R$ {maior_categoria[1]:,.2f})")
+
+    return {
+        'report_type': report_type,
+        'period': period,
+        'data': report_data,
+        'insights': insights,
+        'recommendations': [
+            "💡 Considere revisar suas despesas mensais regularmente",
+            "📊 Mantenha o registro regular de todas as transações"
+        ],
+        'generated_at': now.isoformat()
+    }
+
+def get_or_build_report(user_id: int, period: str, report_type: str, data_version: int | None = None) -> dict:
+    """Relatório do snapshot da versão atual dos dados ou, se não houver, calculado e gravado."""
+    if data_version is None:
+        data_version = get_data_version(user_id)
+    report = report_snapshots.get(user_id, period, report_type, data_version)
+    if report is None:
+        report = build_financial_report(user_id, period, report_type)
+        report_snapshots.put(user_id, period, report_type, data_version, report)
+    return report
+
+
+report_executor = ThreadPoolExecutor(max_workers=app.config['REPORT_WORKERS'], thread_name_prefix='report-job')
+_report_jobs_in_flight = set()
+_report_jobs_lock = threading.Lock()
+_report_jobs_sweep = {'last': 0.0, 'removed': 0}
+REPORT_JOB_SWEEP_INTERVAL = 300  # segundos entre varreduras automáticas, por processo
+
+
+def sweep_report_jobs() -> int:
+    """Remove jobs criados há mais de REPORT_JOB_RETENTION_HOURS: concluídos, com erro ou abandonados.
+
+    Refazer um job renova created_at; pedidos seguintes geram um job novo a partir dos snapshots.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=app.config['REPORT_JOB_RETENTION_HOURS'])
+    removed = ReportJob.query.filter(ReportJob.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    with _report_jobs_lock:
+        _report_jobs_sweep['removed'] += removed
+    return removed
+
+
+def maybe_sweep_report_jobs() -> None:
+    with _report_jobs_lock:
+        if time.monotonic() - _report_jobs_sweep['last'] < REPORT_JOB_SWEEP_INTERVAL:
+            return
+        _report_jobs_sweep['last'] = time.monotonic()
+    try:
+        sweep_report_jobs()
+    except Exception as e:
+        db.session.rollback()
+        log.warning("Erro ao remover jobs de relatório antigos", extra={'error': str(e)})
+
+
+def run_report_job(job_id: str) -> None:
+    """Executa um ReportJob no pool de relatórios e grava o resultado."""
+    try:
+        with app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            if job is None or job.status == 'done':
+                return
+            job.status = 'running'
+            db.session.commit()
+            try:
+                # Versão relida na mesma transação do cálculo: se houve escrita desde o pedido, o
+                # snapshot fica sob a versão dos dados realmente lidos, e não sob job.data_version
+                data_version = current_data_version(job.user_id)
+                report = get_or_build_report(job.user_id, job.period, job.report_type, data_version)
+                job.result = json.dumps(report, ensure_ascii=False, default=str)
+                job.status = 'done'
+            except Exception as e:
+                db.session.rollback()
+                job = db.session.get(ReportJob, job_id)
+                job.status = 'error'
+                job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            maybe_sweep_report_jobs()
+    finally:
+        with _report_jobs_lock:
+            _report_jobs_in_flight.discard(job_id)
+
+
+def submit_report_job(job_id: str) -> None:
+    with _report_jobs_lock:
+        if job_id in _report_jobs_in_flight:
+            return
+        _report_jobs_in_flight.add(job_id)
+    report_executor.submit(run_report_job, job_id)
+
+
+def enqueue_report_job(user_id: int, period: str, report_type: str) -> ReportJob:
+    """Devolve o job do relatório para a versão atual dos dados, criando-o se preciso.
+
+    Pedidos idênticos (mesmo usuário, período, tipo, versão e dia) recebem o mesmo
+    job: o concluído é reaproveitado e o pendente não é recalculado. Jobs com erro,
+    ou parados há mais de REPORT_JOB_TIMEOUT segundos, são executados de novo.
+    """
+    key = {
+        'user_id': user_id,
+        'period': period,
+        'report_type': report_type,
+        'data_version': get_data_version(user_id),
+        'report_date': datetime.now().date(),
+    }
+    job = ReportJob.query.filter_by(**key).first()
+    if job is None:
+        job = ReportJob(id=uuid.uuid4().hex, status='pending', **key)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Outro pedido (ou processo) criou o mesmo job ao mesmo tempo
+            db.session.rollback()
+            return ReportJob.query.filter_by(**key).one()
+        submit_report_job(job.id)
+        return job
+
+    stale = job.created_at < datetime.utcnow() - timedelta(seconds=app.config['REPORT_JOB_TIMEOUT'])
+    if job.status == 'error' or (job.status in ('pending', 'running') and stale):
+        job.status = 'pending'
+        job.error = None
+        job.created_at = datetime.utcnow()
+        db.session.commit()
+        submit_report_job(job.id)
+    return job
+
+
+def report_job_response(job: ReportJob):
+    """JSON de status do job; 200 com o relatório quando concluído, 202 enquanto calcula."""
+    payload = {
+        'job_id': job.id,
+        'status': job.status,
+        'poll_url': url_for('get_report_job', job_id=job.id),
+    }
+    if job.status == 'done':
+        payload['report'] = json.loads(job.result)
+        return jsonify(payload), 200
+    if job.status == 'error':
+        payload['error'] = job.error
+        return jsonify(payload), 500
+    return jsonify(payload), 202
+
+
 @app.route('/api/reports/generate', methods=['POST'])
+@cached_response('reports_generate', params=report_request_params)
 def generate_report():
-    """Gera relatório financeiro completo"""
+    """Gera relatório financeiro completo
+
+    Com "async": true no corpo, enfileira o relatório e responde 202 com o job
+    (consultar em GET /api/reports/<job_id>), sem ocupar o worker do Flask.
+    """
     try:
         data = request.get_json(force=True) or {}
         period = data.get('period', 'current_month')
@@ -641,271 +2024,37 @@ def generate_report():
         if not user_id:
             return jsonify({'error': 'Usuário não autenticado'}), 401
         
-        now = datetime.now()
-        current_year = now.year
-        current_month = now.month
-        
-        # Determinar período de análise
-        if period == 'current_month':
-            start_date = datetime(current_year, current_month, 1)
-            end_date = now
-        elif period == 'last_3_months':
-            months_ago = now.replace(day=1)
-            for _ in range(3):
-                if months_ago.month == 1:
-                    months_ago = months_ago.replace(year=months_ago.year - 1, month=12)
-                else:
-                    months_ago = months_ago.replace(month=months_ago.month - 1)
-            start_date = months_ago
-            end_date = now
-        elif period == 'last_6_months':
-            months_ago = now.replace(day=1)
-            for _ in range(6):
-                if months_ago.month == 1:
-                    months_ago = months_ago.replace(year=months_ago.year - 1, month=12)
-                else:
-                    months_ago = months_ago.replace(month=months_ago.month - 1)
-            start_date = months_ago
-            end_date = now
-        else:  # all_time
-            start_date = datetime(2020, 1, 1)
-            end_date = now
-        
-        # Buscar transações do período
-        transactions = Transaction.query.filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
-        ).all()
-        
-        # Calcular resumo
-        total_receitas = sum(t.value for t in transactions if t.type == 'Receita')
-        total_despesas = sum(t.value for t in transactions if t.type == 'Despesa')
-        saldo = total_receitas - total_despesas
-        
-        # Gastos por categoria
-        despesas_por_categoria = {}
-        for t in transactions:
-            if t.type == 'Despesa':
-                despesas_por_categoria[t.category] = despesas_por_categoria.get(t.category, 0) + t.value
-        
-        # Receitas por categoria
-        receitas_por_categoria = {}
-        for t in transactions:
-            if t.type == 'Receita':
-                receitas_por_categoria[t.category] = receitas_por_categoria.get(t.category, 0) + t.value
-        
-        # Gastos mensais (últimos 12 meses)
-        gastos_mensais = {}
-        for i in range(12):
-            target_year = now.year
-            target_month = now.month - i
-            while target_month <= 0:
-                target_month += 12
-                target_year -= 1
-            
-            month_start = datetime(target_year, target_month, 1)
-            if target_month == 12:
-                month_end = datetime(target_year + 1, 1, 1) - timedelta(days=1)
-            else:
-                month_end = datetime(target_year, target_month + 1, 1) - timedelta(days=1)
-            
-            gastos_mes = db.session.query(db.func.sum(Transaction.value)).filter(
-                Transaction.user_id == user_id,
-                Transaction.type == 'Despesa',
-                Transaction.date >= month_start,
-                Transaction.date <= month_end
-            ).scalar() or 0
-            
-            # Usar formato simples para melhor compatibilidade
-            month_name = month_start.strftime('%b/%Y')
-            gastos_mensais[month_name] = float(gastos_mes)
-        
-        # Ordenar meses cronologicamente
-        def parse_month_key(key):
-            try:
-                return datetime.strptime(key, '%b/%Y')
-            except:
-                # Fallback para formato sem ano
-                try:
-                    return datetime.strptime(key, '%b')
-                except:
-                    return datetime.min
-        
-        sorted_months = sorted(gastos_mensais.items(), key=lambda x: parse_month_key(x[0]))
-        gastos_mensais = dict(sorted_months)
+        if data.get('async'):
+            return report_job_response(enqueue_report_job(user_id, period, report_type))
         
-        # Estrutura de resposta compatível com o frontend
-        report_data = {
-            'summary': {
-                'total_receitas': float(total_receitas),
-                'total_despesas': float(total_despesas),
-                'saldo': float(saldo)
-            },
-            'by_category': {
-                'despesas': {k: float(v) for k, v in sorted(despesas_por_categoria.items(), key=lambda x: x[1], reverse=True)},
-                'receitas': {k: float(v) for k, v in receitas_por_categoria.items()}
-            },
-            'temporal': {
-                'gastos_mensais': gastos_mensais
-            },
-            'transactions': [{
-                'id': t.id,
-                'description': t.description,
-                'value': float(t.value),
-                'category': t.category,
-                'type': t.type,
-                'date': t.date.isoformat()
-            } for t in transactions[:100]]
-        }
-        
-        # Insights
-        insights = []
-        if saldo > 0:
-            insights.append("✅ Excelente! Você está com saldo positivo.")
-        else:
-            insights.append("⚠️ Atenção: Saldo negativo. Revise seus gastos.")
-        
-        if total_despesas > 0 and total_receitas > 0:
-            porcentagem = (total_despesas / total_receitas) * 100
-            if porcentagem > 90:
-                insights.append("📊 Suas despesas representam mais de 90% das receitas.")
-            elif porcentagem > 80:
-                insights.append("📊 Suas despesas representam mais de 80% das receitas.")
-        
-        if despesas_por_categoria:
-            maior_categoria = max(despesas_por_categoria.items(), key=lambda x: x[1])
-            insights.append(f"💰 Maior categoria de despesa: {maior_categoria[0]} (R$ {maior_categoria[1]:,.2f})")
-        
-        return jsonify({
-            'report_type': report_type,
-            'period': period,
-            'data': report_data,
-            'insights': insights,
-            'recommendations': [
-                "💡 Considere revisar suas despesas mensais regularmente",
-                "📊 Mantenha o registro regular de todas as transações"
-            ],
-            'generated_at': now.isoformat()
-        })
+        return jsonify(get_or_build_report(user_id, period, report_type))
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("Erro ao gerar relatório", extra={'user_id': get_current_user_id()})
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/ai/analyze', methods=['POST'])
-def ai_analyze():
-    """Endpoint de análise IA como fallback quando MCP não estiver disponível"""
-    query = ''
-    user_id = None
-    try:
-        data = request.get_json(force=True) or {}
-        query = data.get('query', '').lower().strip()
-        user_id = get_current_user_id()
-        
-        if not user_id:
-            return jsonify({'error': 'Usuário não autenticado'}), 401
-        
-        if not query:
-            return jsonify({
-                'response': 'Por favor, digite uma pergunta ou comando. Digite "ajuda" para ver os comandos disponíveis.',
-                'actions': []
-            })
-        
-        now = datetime.now()
-        current_month = now.month
-        current_year = now.year
-        
-        # Filtrar transações do mês atual (mesmo período usado nos insights)
-        month_start = datetime(current_year, current_month, 1)
-        if current_month == 12:
-            month_end = datetime(current_year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = datetime(current_year, current_month + 1, 1) - timedelta(days=1)
-        
-        # Buscar dados do usuário (mês atual, igual aos insights)
-        transactions = Transaction.query.filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= month_start,
-            Transaction.date <= month_end
-        ).all()
-        
-        # Também buscar todas as transações para algumas análises que precisam de histórico
-        all_transactions = Transaction.query.filter_by(user_id=user_id).all()
-        
-        goals = Goal.query.filter_by(user_id=user_id).all()
-        budgets = Budget.query.filter(
-            Budget.user_id == user_id,
-            Budget.month == current_month,
-            Budget.year == current_year
-        ).all()
-        
-        # Calcular totais do mês atual (para consistência com insights)
-        total_receitas = sum(t.value for t in transactions if t.type == 'Receita')
-        total_despesas = sum(t.value for t in transactions if t.type == 'Despesa')
-        saldo = total_receitas - total_despesas
-        
-        # Calcular totais gerais (todas as transações) para análises específicas
-        total_receitas_geral = sum(t.value for t in all_transactions if t.type == 'Receita')
-        total_despesas_geral = sum(t.value for t in all_transactions if t.type == 'Despesa')
-        
-        # Funções auxiliares para formatação de moeda
-        def format_currency(value: float) -> str:
-            """Formata valor monetário no padrão brasileiro (R$ X.XXX,XX)"""
-            try:
-                # Garantir que value seja um número
-                if value is None:
-                    value = 0.0
-                value = float(value)
-                # Formatar: R$ 1.234,56
-                formatted = f"{value:,.2f}"
-                # Trocar ponto por X temporariamente, vírgula por ponto, e X por vírgula
-                formatted = formatted.replace(',', 'X').replace('.', ',').replace('X', '.')
-                return f"R$ {formatted}"
-            except (ValueError, TypeError):
-                return "R$ 0,00"
-        
-        def get_period_sum(transactions_list: list, transaction_type: str, period_type: str) -> float:
-            """
-            Calcula a soma dos valores de transações de um tipo (Receita ou Despesa)
-            para um período específico (daily, weekly, monthly, semester, yearly, total).
-            """
-            from datetime import timedelta
-            
-            if period_type == 'total':
-                return sum(t.value for t in transactions_list if t.type == transaction_type)
-            elif period_type == 'daily':
-                today = now.date()
-                return sum(t.value for t in transactions_list 
-                          if t.type == transaction_type and t.date.date() == today)
-            elif period_type == 'weekly':
-                week_ago = now - timedelta(days=7)
-                return sum(t.value for t in transactions_list 
-                          if t.type == transaction_type and t.date >= week_ago)
-            elif period_type == 'monthly':
-                return sum(t.value for t in transactions_list 
-                          if t.type == transaction_type 
-                          and t.date.month == current_month 
-                          and t.date.year == current_year)
-            elif period_type == 'semester' or period_type == 'semiannual':
-                # Últimos 6 meses
-                six_months_ago = now.replace(day=1) - timedelta(days=180)
-                return sum(t.value for t in transactions_list 
-                          if t.type == transaction_type and t.date >= six_months_ago)
-            elif period_type == 'yearly':
-                return sum(t.value for t in transactions_list 
-                          if t.type == transaction_type 
-                          and t.date.year == current_year)
-            return 0
-        
-        # Análise de palavras-chave e geração de resposta
-        response_text = ""
-        actions = []
-        
-        # Comando de ajuda - verificar PRIMEIRO (antes de tudo)
-        if any(word in query for word in ['ajuda', 'help', 'comandos', 'comando', 'o que posso fazer', 'o que você faz', 'quais comandos', 'menu', 'opções']):
-            response_text = """🤖 **Comandos disponíveis no FinanMaster:**
+@app.route('/api/reports/snapshots/stats')
+@login_required
+def report_snapshot_stats():
+    """Reaproveitamento dos snapshots de relatórios (acertos deste processo e totais da tabela)."""
+    return jsonify(report_snapshots.stats())
+
+@app.route('/api/reports/<job_id>')
+def get_report_job(job_id):
+    """Status (e resultado, quando pronto) de um relatório gerado em segundo plano."""
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Usuário não autenticado'}), 401
+    
+    job = ReportJob.query.filter_by(id=job_id, user_id=user_id).first()
+    if job is None:
+        return jsonify({'error': 'Relatório não encontrado'}), 404
+    return report_job_response(job)
+
+# Assistente financeiro (fallback do MCP em /api/ai/analyze)
+assistant = IntentRouter()
+
+ASSISTANT_HELP_TEXT = """🤖 **Comandos disponíveis no FinanMaster:**
 
 **📊 Consultas Financeiras:**
 • "Saldo" ou "Meu saldo"
@@ -934,440 +2083,634 @@ def ai_analyze():
 • "Ajuda" ou "Comandos" - Lista todas as opções
 
 Pergunte de forma natural e eu responderei! 💬"""
-            actions = []
-        
-        # Navegação
-        elif any(word in query for word in ['abrir transação', 'nova transação', 'adicionar transação', 'cadastrar transação']):
-            response_text = "Posso abrir o formulário de nova transação para você agora."
-            actions.append({
-                'type': 'navigate_to_section',
-                'data': {'section': 'transactions'}
-            })
-            # Pequeno delay para garantir navegação antes de abrir modal
-            actions.append({
-                'type': 'open_modal',
-                'data': {'modal': 'add-transaction-modal'}
-            })
-        
-        elif any(word in query for word in ['abrir orçamento', 'ver orçamento', 'meu orçamento']):
-            response_text = "Abrindo a seção de orçamento para você."
-            actions.append({
-                'type': 'navigate_to_section',
-                'data': {'section': 'budget'}
-            })
-        
-        elif any(word in query for word in ['abrir metas', 'ver metas', 'minhas metas', 'objetivos']):
-            response_text = "Abrindo a seção de metas financeiras."
-            actions.append({
-                'type': 'navigate_to_section',
-                'data': {'section': 'goals'}
-            })
+
+# Intenção esperada para cada frase de exemplo do texto de ajuda (verificado por `flask check-intents`)
+ASSISTANT_HELP_EXAMPLES = {
+    'saldo': 'saldo',
+    'meu saldo': 'saldo',
+    'gastos mensais': 'despesas',
+    'gastos semestrais': 'despesas',
+    'gastos anuais': 'despesas',
+    'receitas diárias': 'receitas',
+    'receitas semanais': 'receitas',
+    'receitas mensais': 'receitas',
+    'maiores gastos por categoria': 'despesas',
+    'buscar receitas cadastradas': 'receitas',
+    'comparar mês passado': 'comparar',
+    'comparar períodos': 'comparar',
+    'tendências de gastos': 'tendencias',
+    'economia mensal': 'economia',
+    'categorias mais usadas': 'categorias_frequentes',
+    'orçamento próximo do limite': 'alertas_orcamento',
+    'status das metas': 'status_metas',
+    'transações recentes': 'transacoes_recentes',
+    'abrir transações': 'abrir_transacoes',
+    'nova transação': 'nova_transacao',
+    'ver orçamento': 'abrir_orcamento',
+    'ver metas': 'abrir_metas',
+    'ir para relatórios': 'abrir_relatorios',
+    'ajuda': 'ajuda',
+    'comandos': 'ajuda',
+}
+
+NO_DATA_RESPONSE = "🎯 📝 Você ainda não possui dados cadastrados neste período.\n\nPara começar a gerar insights:\n\n• Adicione sua primeira transação (Receita ou Despesa)\n• Defina um orçamento e metas financeiras\n\nPosso abrir o formulário de nova transação para você agora."
+
+
+def format_currency(value: float) -> str:
+    """Formata valor monetário no padrão brasileiro (R$ X.XXX,XX)"""
+    try:
+        # Garantir que value seja um número
+        if value is None:
+            value = 0.0
+        value = float(value)
+        # Formatar: R$ 1.234,56
+        formatted = f"{value:,.2f}"
+        # Trocar ponto por X temporariamente, vírgula por ponto, e X por vírgula
+        formatted = formatted.replace(',', 'X').replace('.', ',').replace('X', '.')
+        return f"R$ {formatted}"
+    except (ValueError, TypeError):
+        return "R$ 0,00"
+
+
+# Período pedido na pergunta ("gastos semestrais", "receitas diárias"...); padrão: mês atual
+ASSISTANT_PERIOD_PATTERN = re.compile(
+    r'(?P<daily>diári|hoje)|(?P<weekly>seman)|(?P<semester>semestr)|(?P<yearly>anua|este ano|neste ano)'
+)
+ASSISTANT_PERIOD_LABELS = {
+    'daily': 'de hoje',
+    'weekly': 'dos últimos 7 dias',
+    'monthly': '',
+    'semester': 'dos últimos 6 meses',
+    'yearly': 'deste ano',
+}
+
+
+class AssistantContext:
+    """Dados do usuário disponíveis para os handlers de intenção do assistente.
+
+    Nada é consultado na criação: cada handler usa só os atributos de que precisa
+    e cada um é buscado como agregado (sum_by_type, sum_by_category,
+    load_monthly_totals) no primeiro acesso. Navegação e ajuda respondem sem
+    nenhuma consulta, e nenhuma análise carrega o histórico em memória.
+    """
+
+    def __init__(self, user_id: int, query: str, now: datetime | None = None):
+        self.user_id = user_id
+        self.query = query
+        self.now = now or datetime.now()
+        self.current_month = self.now.month
+        self.current_year = self.now.year
+        self._period_categories = {}
+
+    @property
+    def requested_period(self) -> str:
+        found = ASSISTANT_PERIOD_PATTERN.search(self.query)
+        return found.lastgroup if found else 'monthly'
+
+    @cached_property
+    def month_totals(self) -> dict:
+        """{tipo: (soma, quantidade)} do mês atual, em um único SUM agrupado."""
+        return sum_by_type(self.user_id, *period_range('monthly', self.now))
+
+    @property
+    def month_categories(self) -> list:
+        """[(tipo, categoria, soma, quantidade)] do mês atual."""
+        return self.period_categories('monthly')
+
+    def period_categories(self, period: str) -> list:
+        """[(tipo, categoria, soma, quantidade)] do período (um de PERIOD_TYPES)."""
+        if period not in self._period_categories:
+            self._period_categories[period] = sum_by_category(self.user_id, *period_range(period, self.now))
+        return self._period_categories[period]
+
+    def monthly_totals(self, first_offset: int, months: int) -> dict:
+        """{(ano, mês, tipo): soma} de `months` meses a partir de mês atual + `first_offset`."""
+        start = datetime(*add_months(self.current_year, self.current_month, first_offset), 1)
+        end = datetime(*add_months(self.current_year, self.current_month, first_offset + months), 1)
+        return load_monthly_totals(self.user_id, start, end)
+
+    @property
+    def has_month_data(self) -> bool:
+        return bool(self.month_totals)
+
+    @property
+    def total_receitas(self) -> float:
+        return self.month_totals.get('Receita', (0.0, 0))[0]
+
+    @property
+    def total_despesas(self) -> float:
+        return self.month_totals.get('Despesa', (0.0, 0))[0]
+
+    @property
+    def saldo(self) -> float:
+        return self.total_receitas - self.total_despesas
+
+    def recent_transactions(self, limit: int = 10) -> list:
+        start, end = period_range('monthly', self.now)
+        return Transaction.query.filter(
+            Transaction.user_id == self.user_id,
+            Transaction.date >= start,
+            Transaction.date < end
+        ).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit).all()
+
+    @cached_property
+    def goals(self) -> list:
+        return Goal.query.filter_by(user_id=self.user_id).all()
+
+    @cached_property
+    def budgets(self) -> list:
+        return Budget.query.filter(
+            Budget.user_id == self.user_id,
+            Budget.month == self.current_month,
+            Budget.year == self.current_year
+        ).all()
+
+
+# Handlers de intenção: recebem o AssistantContext e devolvem (texto, ações).
+# A ordem de registro só desempata frases de mesmo tamanho.
+
+@assistant.intent('ajuda', ['ajuda', 'help', 'comandos', 'comando', 'o que posso fazer', 'o que você faz',
+                            'quais comandos', 'menu', 'opções'])
+def intent_ajuda(ctx):
+    return ASSISTANT_HELP_TEXT, []
+
+
+# Navegação
+@assistant.intent('nova_transacao', ['abrir transação', 'nova transação', 'adicionar transação', 'cadastrar transação'])
+def intent_nova_transacao(ctx):
+    return "Posso abrir o formulário de nova transação para você agora.", [
+        {'type': 'navigate_to_section', 'data': {'section': 'transactions'}},
+        # Pequeno delay para garantir navegação antes de abrir modal
+        {'type': 'open_modal', 'data': {'modal': 'add-transaction-modal'}},
+    ]
+
+
+@assistant.intent('abrir_transacoes', ['abrir transações', 'ver transações', 'minhas transações'])
+def intent_abrir_transacoes(ctx):
+    return "Abrindo a seção de transações.", [
+        {'type': 'navigate_to_section', 'data': {'section': 'transactions'}}
+    ]
+
+
+@assistant.intent('abrir_orcamento', ['abrir orçamento', 'ver orçamento', 'meu orçamento'])
+def intent_abrir_orcamento(ctx):
+    return "Abrindo a seção de orçamento para você.", [
+        {'type': 'navigate_to_section', 'data': {'section': 'budget'}}
+    ]
+
+
+@assistant.intent('abrir_metas', ['abrir metas', 'ver metas', 'minhas metas', 'objetivos'])
+def intent_abrir_metas(ctx):
+    return "Abrindo a seção de metas financeiras.", [
+        {'type': 'navigate_to_section', 'data': {'section': 'goals'}}
+    ]
+
+
+@assistant.intent('abrir_relatorios', ['relatórios', 'relatório', 'ir para relatórios'])
+def intent_abrir_relatorios(ctx):
+    return "Abrindo a seção de relatórios.", [
+        {'type': 'navigate_to_section', 'data': {'section': 'reports'}}
+    ]
+
+
+@assistant.intent('abrir_dashboard', ['dashboard', 'painel', 'início'])
+def intent_abrir_dashboard(ctx):
+    return "Voltando para o dashboard principal.", [
+        {'type': 'navigate_to_section', 'data': {'section': 'dashboard'}}
+    ]
+
+
+# Consultas de dados
+@assistant.intent('saldo', ['saldo', 'quanto tenho', 'meu saldo', 'saldo atual', 'dinheiro'])
+def intent_saldo(ctx):
+    if not ctx.has_month_data:
+        return NO_DATA_RESPONSE, [{'type': 'prompt_add_data'}]
+
+    response_text = f"💰 Seu saldo atual é R$ {ctx.saldo:,.2f}.\n\n"
+    response_text += f"📊 Receitas: R$ {ctx.total_receitas:,.2f}\n"
+    response_text += f"💸 Despesas: R$ {ctx.total_despesas:,.2f}\n\n"
+    if ctx.saldo > 0:
+        response_text += "✅ Excelente! Você está com saldo positivo. Continue mantendo suas finanças organizadas!"
+    else:
+        response_text += "⚠️ Atenção: Saldo negativo. Recomendo revisar seus gastos para equilibrar as finanças."
+    return response_text, [{
+        'type': 'show_balance',
+        'data': {
+            'saldo': float(ctx.saldo),
+            'receitas': float(ctx.total_receitas),
+            'despesas': float(ctx.total_despesas)
+        }
+    }]
+
+
+@assistant.intent('despesas', ['gastos', 'despesas', 'quanto gastei', 'maiores gastos', 'categoria'])
+def intent_despesas(ctx):
+    period = ctx.requested_period
+    categories = ctx.period_categories(period)
+    if not categories:
+        return NO_DATA_RESPONSE, [{'type': 'prompt_add_data'}]
+
+    # Análise por categoria
+    despesas_por_cat = {category: total for tipo, category, total, count in categories if tipo == 'Despesa'}
+
+    if not despesas_por_cat:
+        return "Você ainda não possui despesas cadastradas.", []
+
+    sorted_cats = sorted(despesas_por_cat.items(), key=lambda x: x[1], reverse=True)
+    label = ASSISTANT_PERIOD_LABELS[period]
+    response_text = f"💸 Suas despesas {label + ' ' if label else ''}totalizam R$ {sum(despesas_por_cat.values()):,.2f}.\n\n"
+    response_text += "📊 Principais categorias:\n\n"
+    for i, (cat, valor) in enumerate(sorted_cats[:5], 1):
+        response_text += f"{i}. {cat}: R$ {valor:,.2f}\n"
+    return response_text, [{
+        'type': 'show_category_analysis',
+        'data': {'categories': dict(sorted_cats[:5])}
+    }]
+
+
+@assistant.intent('receitas', ['receitas', 'quanto recebi', 'entradas'])
+def intent_receitas(ctx):
+    period = ctx.requested_period
+    categories = ctx.period_categories(period)
+    if not categories:
+        return NO_DATA_RESPONSE, [{'type': 'prompt_add_data'}]
+
+    receitas_por_cat = {category: total for tipo, category, total, count in categories if tipo == 'Receita'}
+
+    if not receitas_por_cat:
+        return "Você ainda não possui receitas cadastradas.", []
+
+    sorted_cats = sorted(receitas_por_cat.items(), key=lambda x: x[1], reverse=True)
+    label = ASSISTANT_PERIOD_LABELS[period]
+    response_text = f"💰 Suas receitas {label + ' ' if label else ''}totalizam R$ {sum(receitas_por_cat.values()):,.2f}.\n\n"
+    response_text += "📊 Principais categorias:\n\n"
+    for i, (cat, valor) in enumerate(sorted_cats[:5], 1):
+        response_text += f"{i}. {cat}: R$ {valor:,.2f}\n"
+    return response_text, []
+
+
+@assistant.intent('metas', ['metas', 'progresso'])
+def intent_metas(ctx):
+    if not ctx.goals:
+        return "Você ainda não possui metas cadastradas. Posso abrir a seção de metas para você criar uma?", [
+            {'type': 'navigate_to_section', 'data': {'section': 'goals'}}
+        ]
+
+    response_text = f"🎯 Você possui {len(ctx.goals)} meta(s) cadastrada(s):\n\n"
+    for goal in ctx.goals[:5]:
+        progresso = (goal.current / goal.target * 100) if goal.target > 0 else 0
+        response_text += f"• {goal.title}: R$ {goal.current:,.2f} / R$ {goal.target:,.2f} ({progresso:.1f}%)\n"
+    return response_text, [{'type': 'navigate_to_section', 'data': {'section': 'goals'}}]
+
+
+@assistant.intent('orcamento', ['orçamento', 'quanto posso gastar'])
+def intent_orcamento(ctx):
+    if not ctx.budgets:
+        return "Você ainda não possui orçamentos cadastrados para este mês. Posso abrir a seção de orçamento para você criar?", [
+            {'type': 'navigate_to_section', 'data': {'section': 'budget'}}
+        ]
+
+    response_text = "📊 Seu orçamento deste mês:\n\n"
+    for budget in ctx.budgets[:5]:
+        porcentagem = (budget.spent_amount / budget.budget_amount * 100) if budget.budget_amount > 0 else 0
+        emoji = "🟢" if porcentagem < 80 else "🟡" if porcentagem < 100 else "🔴"
+        response_text += f"{emoji} {budget.category}: R$ {budget.spent_amount:,.2f} / R$ {budget.budget_amount:,.2f} ({porcentagem:.1f}%)\n"
+    return response_text, [{'type': 'navigate_to_section', 'data': {'section': 'budget'}}]
+
+
+# Comparação de períodos (mês passado vs atual)
+@assistant.intent('comparar', ['comparar', 'comparação', 'mês passado', 'mês anterior', 'diferença'])
+def intent_comparar(ctx):
+    current_month, current_year = ctx.current_month, ctx.current_year
+    prev_year, prev_month = add_months(current_year, current_month, -1)
+    # Mês anterior e mês atual em uma consulta
+    totals = ctx.monthly_totals(-1, 2)
+    if not any((current_year, current_month, tipo) in totals for tipo in ('Receita', 'Despesa')):
+        return "⚠️ Você ainda não possui dados suficientes para comparação.", [{'type': 'prompt_add_data'}]
+
+    receitas_atual = totals.get((current_year, current_month, 'Receita'), 0)
+    despesas_atual = totals.get((current_year, current_month, 'Despesa'), 0)
+    saldo_atual = receitas_atual - despesas_atual
+
+    receitas_anterior = totals.get((prev_year, prev_month, 'Receita'), 0)
+    despesas_anterior = totals.get((prev_year, prev_month, 'Despesa'), 0)
+    saldo_anterior = receitas_anterior - despesas_anterior
+
+    # Calcular diferenças
+    diff_receitas = receitas_atual - receitas_anterior
+    diff_despesas = despesas_atual - despesas_anterior
+    diff_saldo = saldo_atual - saldo_anterior
+
+    response_text = f"📊 **Comparação: {prev_month}/{prev_year} vs {current_month}/{current_year}**\n\n"
+    response_text += f"💰 **Receitas:**\n"
+    response_text += f"   Mês atual: {format_currency(receitas_atual)}\n"
+    response_text += f"   Mês anterior: {format_currency(receitas_anterior)}\n"
+    if diff_receitas > 0:
+        response_text += f"   📈 Aumento de {format_currency(abs(diff_receitas))} (+{(diff_receitas/receitas_anterior*100):.1f}%)\n\n" if receitas_anterior > 0 else f"   📈 Primeiras receitas deste mês\n\n"
+    elif diff_receitas < 0:
+        response_text += f"   📉 Redução de {format_currency(abs(diff_receitas))} ({(diff_receitas/receitas_anterior*100):.1f}%)\n\n" if receitas_anterior > 0 else "\n"
+    else:
+        response_text += "   ➡️ Sem mudança\n\n"
+
+    response_text += f"💸 **Despesas:**\n"
+    response_text += f"   Mês atual: {format_currency(despesas_atual)}\n"
+    response_text += f"   Mês anterior: {format_currency(despesas_anterior)}\n"
+    if diff_despesas > 0:
+        response_text += f"   ⚠️ Aumento de {format_currency(abs(diff_despesas))} (+{(diff_despesas/despesas_anterior*100):.1f}%)\n\n" if despesas_anterior > 0 else f"   ⚠️ Primeiras despesas deste mês\n\n"
+    elif diff_despesas < 0:
+        response_text += f"   ✅ Redução de {format_currency(abs(diff_despesas))} ({(diff_despesas/despesas_anterior*100):.1f}%)\n\n" if despesas_anterior > 0 else "\n"
+    else:
+        response_text += "   ➡️ Sem mudança\n\n"
+
+    response_text += f"💵 **Saldo:**\n"
+    response_text += f"   Mês atual: {format_currency(saldo_atual)}\n"
+    response_text += f"   Mês anterior: {format_currency(saldo_anterior)}\n"
+    if diff_saldo > 0:
+        response_text += f"   ✅ Melhoria de {format_currency(abs(diff_saldo))}\n"
+    elif diff_saldo < 0:
+        response_text += f"   ⚠️ Redução de {format_currency(abs(diff_saldo))}\n"
+    else:
+        response_text += "   ➡️ Sem mudança\n"
+    return response_text, []
+
+
+# Tendências de gastos (últimos 3 meses)
+@assistant.intent('tendencias', ['tendência', 'tendências', 'evolução', 'crescimento'])
+def intent_tendencias(ctx):
+    # Mês atual e os dois anteriores em uma consulta
+    totals = ctx.monthly_totals(-2, 3)
+    if not totals:
+        return "⚠️ Você ainda não possui dados suficientes para análise de tendências.", [{'type': 'prompt_add_data'}]
+
+    response_text = "📈 **Tendências dos últimos 3 meses:**\n\n"
+    meses_tendencia = []
+    for i in range(3):
+        year, month = add_months(ctx.current_year, ctx.current_month, -i)
+        receitas_mes = totals.get((year, month, 'Receita'), 0)
+        despesas_mes = totals.get((year, month, 'Despesa'), 0)
+        saldo_mes = receitas_mes - despesas_mes
+        meses_tendencia.append({
+            'mes': f"{month:02d}/{year}",
+            'receitas': receitas_mes,
+            'despesas': despesas_mes,
+            'saldo': saldo_mes
+        })
+
+    for mes_data in meses_tendencia:
+        seta = "📈" if mes_data['saldo'] > 0 else "📉" if mes_data['saldo'] < 0 else "➡️"
+        response_text += f"{seta} **{mes_data['mes']}:**\n"
+        response_text += f"   Receitas: {format_currency(mes_data['receitas'])}\n"
+        response_text += f"   Despesas: {format_currency(mes_data['despesas'])}\n"
+        response_text += f"   Saldo: {format_currency(mes_data['saldo'])}\n\n"
+    return response_text, []
+
+
+# Economia mensal e taxa de economia
+@assistant.intent('economia', ['economia', 'economizar', 'poupança', 'taxa de economia'])
+def intent_economia(ctx):
+    # Todos os meses do ano atual em uma consulta; o mês atual sai do mesmo resultado
+    totals = ctx.monthly_totals(1 - ctx.current_month, 12)
+    if not any((ctx.current_year, ctx.current_month, tipo) in totals for tipo in ('Receita', 'Despesa')):
+        return "⚠️ Você ainda não possui dados para calcular economia.", [{'type': 'prompt_add_data'}]
+
+    receitas_mensal = totals.get((ctx.current_year, ctx.current_month, 'Receita'), 0)
+    despesas_mensal = totals.get((ctx.current_year, ctx.current_month, 'Despesa'), 0)
+    economia_mensal = receitas_mensal - despesas_mensal
+    taxa_economia = (economia_mensal / receitas_mensal * 100) if receitas_mensal > 0 else 0
+
+    receitas_anual = sum(total for (year, month, tipo), total in totals.items() if tipo == 'Receita')
+    despesas_anual = sum(total for (year, month, tipo), total in totals.items() if tipo == 'Despesa')
+    economia_anual = receitas_anual - despesas_anual
+
+    response_text = "💰 **Análise de Economia:**\n\n"
+    response_text += f"📅 **Este Mês:**\n"
+    response_text += f"   Receitas: {format_currency(receitas_mensal)}\n"
+    response_text += f"   Despesas: {format_currency(despesas_mensal)}\n"
+    response_text += f"   Economia: {format_currency(economia_mensal)}\n"
+    response_text += f"   Taxa de economia: {taxa_economia:.1f}%\n\n"
+
+    response_text += f"📅 **Este Ano:**\n"
+    response_text += f"   Receitas: {format_currency(receitas_anual)}\n"
+    response_text += f"   Despesas: {format_currency(despesas_anual)}\n"
+    response_text += f"   Economia acumulada: {format_currency(economia_anual)}\n\n"
+
+    # Sugestões
+    if taxa_economia < 10:
+        response_text += "💡 **Sugestão:** Sua taxa de economia está baixa (<10%). Considere revisar gastos desnecessários."
+    elif taxa_economia >= 20:
+        response_text += "✅ **Excelente!** Você está economizando mais de 20% da sua receita. Continue assim!"
+    else:
+        response_text += "👍 **Bom trabalho!** Você está mantendo uma taxa de economia saudável."
+    return response_text, []
+
+
+# Alertas de orçamento (categorias próximas do limite)
+@assistant.intent('alertas_orcamento', ['limite', 'próximo do limite', 'orçamento estourado', 'gastando muito',
+                                        'alertas orçamento'])
+def intent_alertas_orcamento(ctx):
+    if not ctx.budgets:
+        return "⚠️ Você ainda não possui orçamentos cadastrados.", [
+            {'type': 'navigate_to_section', 'data': {'section': 'budget'}}
+        ]
+
+    alertas = []
+    for budget in ctx.budgets:
+        porcentagem = (budget.spent_amount / budget.budget_amount * 100) if budget.budget_amount > 0 else 0
+        if porcentagem >= 100:
+            alertas.append(('🔴', budget, porcentagem, 'ESTOURADO'))
+        elif porcentagem >= 80:
+            alertas.append(('🟡', budget, porcentagem, 'PRÓXIMO DO LIMITE'))
+
+    if alertas:
+        response_text = "⚠️ **Alertas de Orçamento:**\n\n"
+        for status, budget, porcentagem, tipo in alertas:
+            response_text += f"{status} **{budget.category}:** {tipo}\n"
+            response_text += f"   Gasto: {format_currency(budget.spent_amount)} de {format_currency(budget.budget_amount)} ({porcentagem:.1f}%)\n\n"
+    else:
+        response_text = "✅ **Ótimas notícias!** Nenhum orçamento próximo do limite no momento."
+        response_text += "\n\n📊 **Status dos seus orçamentos:**\n\n"
+        for budget in ctx.budgets[:5]:
+            porcentagem = (budget.spent_amount / budget.budget_amount * 100) if budget.budget_amount > 0 else 0
+            status = "✅" if porcentagem < 80 else "⚠️"
+            response_text += f"{status} {budget.category}: {format_currency(budget.spent_amount)} / {format_currency(budget.budget_amount)} ({porcentagem:.1f}%)\n"
+    return response_text, []
+
+
+# Transações recentes
+@assistant.intent('transacoes_recentes', ['transações recentes', 'últimas transações', 'movimentações recentes',
+                                          'histórico recente'])
+def intent_transacoes_recentes(ctx):
+    recentes = ctx.recent_transactions(10)
+    if not recentes:
+        return "⚠️ Nenhuma transação cadastrada ainda.", [{'type': 'prompt_add_data'}]
+
+    response_text = f"📋 **Últimas {len(recentes)} transações:**\n\n"
+    for i, t in enumerate(recentes, 1):
+        tipo_emoji = "💰" if t.type == "Receita" else "💸"
+        sinal = "+" if t.type == "Receita" else "-"
+        data_str = t.date.strftime('%d/%m/%Y')
+        response_text += f"{i}. {tipo_emoji} {t.description}\n"
+        response_text += f"   {sinal}{format_currency(t.value)} | {t.category} | {data_str}\n\n"
+    return response_text, []
+
+
+# Categorias mais usadas
+@assistant.intent('categorias_frequentes', ['categorias mais usadas', 'categorias frequentes', 'onde mais gasto',
+                                            'categorias principais'])
+def intent_categorias_frequentes(ctx):
+    if not ctx.month_categories:
+        return "⚠️ Nenhuma transação cadastrada ainda.", [{'type': 'prompt_add_data'}]
+
+    # Contar frequência de uso de categorias
+    freq_categorias = {}
+    for tipo, category, total, count in ctx.month_categories:
+        freq_categorias[category] = freq_categorias.get(category, 0) + count
+
+    sorted_freq = sorted(freq_categorias.items(), key=lambda x: x[1], reverse=True)
+
+    response_text = "📊 **Categorias mais utilizadas:**\n\n"
+    for i, (cat, count) in enumerate(sorted_freq[:10], 1):
+        response_text += f"{i}. {cat}: {count} transação(ões)\n"
+    return response_text, []
+
+
+# Status detalhado de metas
+@assistant.intent('status_metas', ['status metas', 'status das metas', 'progresso metas', 'progresso das metas',
+                                   'como estão minhas metas', 'meta próxima'])
+def intent_status_metas(ctx):
+    if not ctx.goals:
+        return "⚠️ Você ainda não possui metas cadastradas.", [
+            {'type': 'navigate_to_section', 'data': {'section': 'goals'}}
+        ]
+
+    response_text = "🎯 **Status das Metas:**\n\n"
+    # Ordenar por progresso
+    goals_sorted = sorted(ctx.goals, key=lambda g: (g.current / g.target) if g.target > 0 else 0, reverse=True)
+
+    for goal in goals_sorted:
+        progresso = (goal.current / goal.target * 100) if goal.target > 0 else 0
+        dias_restantes = (goal.deadline.date() - ctx.now.date()).days
+
+        if progresso >= 100:
+            status = "✅ CONCLUÍDA"
+        elif dias_restantes < 0:
+            status = "⏰ VENCIDA"
+        elif dias_restantes <= 30:
+            status = "🔥 URGENTE"
+        elif progresso >= 75:
+            status = "👍 QUASE LÁ"
+        else:
+            status = "📌 EM ANDAMENTO"
+
+        response_text += f"{status} **{goal.title}**\n"
+        response_text += f"   Progresso: {format_currency(goal.current)} / {format_currency(goal.target)} ({progresso:.1f}%)\n"
+        response_text += f"   Faltam: {format_currency(goal.target - goal.current)} | {dias_restantes} dias restantes\n\n"
+    return response_text, []
+
+
+# Previsão de gastos mensais (média dos últimos meses)
+@assistant.intent('previsao', ['previsão', 'média de gastos', 'quanto devo gastar', 'projeção'])
+def intent_previsao(ctx):
+    # Três meses anteriores e o atual em uma consulta
+    totals = ctx.monthly_totals(-3, 4)
+    if not any((ctx.current_year, ctx.current_month, tipo) in totals for tipo in ('Receita', 'Despesa')):
+        return "⚠️ Você ainda não possui dados suficientes para previsões.", [{'type': 'prompt_add_data'}]
+
+    # Calcular média dos últimos 3 meses
+    valores_meses = []
+    for i in range(1, 4):
+        year, month = add_months(ctx.current_year, ctx.current_month, -i)
+        gasto_mes = totals.get((year, month, 'Despesa'), 0)
+        if gasto_mes > 0:
+            valores_meses.append(gasto_mes)
+
+    if not valores_meses:
+        return "⚠️ Dados insuficientes para calcular previsão (precisa de pelo menos 1 mês de histórico).", []
+
+    media_gastos = sum(valores_meses) / len(valores_meses)
+    gasto_atual = totals.get((ctx.current_year, ctx.current_month, 'Despesa'), 0)
+
+    response_text = "🔮 **Previsão de Gastos:**\n\n"
+    response_text += f"📊 Média dos últimos {len(valores_meses)} meses: {format_currency(media_gastos)}\n"
+    response_text += f"📅 Gasto atual (este mês): {format_currency(gasto_atual)}\n\n"
+
+    if gasto_atual > media_gastos * 1.2:
+        response_text += "⚠️ Você está gastando 20% acima da média. Considere revisar seus gastos."
+    elif gasto_atual < media_gastos * 0.8:
+        response_text += "✅ Você está gastando abaixo da média. Bom trabalho!"
+    else:
+        response_text += "👍 Seus gastos estão alinhados com a média histórica."
+    return response_text, []
+
+
+def intent_fallback(ctx):
+    """Resposta padrão se não entender - dar resposta contextual"""
+    response_text = "Desculpe, não entendi completamente sua pergunta. Mas posso te ajudar com:\n\n"
+    response_text += "💰 **Consultas:** saldo, despesas, receitas\n"
+    response_text += "📊 **Navegação:** abrir transação, orçamento, metas, relatórios\n"
+    response_text += "🎯 **Análises:** maiores gastos, progresso de metas\n\n"
+    response_text += "Tente reformular sua pergunta ou digite 'ajuda' para ver todos os comandos disponíveis."
+
+    # Sugerir ajuda se não houver dados
+    if not ctx.has_month_data:
+        return response_text, [{'type': 'prompt_add_data'}]
+    return response_text, []
+
+
+# Compila o roteador uma vez, na importação, com todas as intenções registradas
+assistant.compile()
+
+
+@app.cli.command('check-intents')
+@click.option('--iterations', type=int, default=20000, help='Repetições do benchmark de roteamento.')
+def check_intents_command(iterations):
+    """Confere a intenção de cada exemplo do texto de ajuda e mede o roteamento."""
+    help_phrases = {p.lower() for p in re.findall(r'"([^"]+)"', ASSISTANT_HELP_TEXT)}
+    missing = help_phrases - set(ASSISTANT_HELP_EXAMPLES)
+    failures = [(phrase, expected, assistant.match(phrase))
+                for phrase, expected in ASSISTANT_HELP_EXAMPLES.items()
+                if assistant.match(phrase) != expected]
+
+    for phrase in sorted(missing):
+        click.echo(f"❌ Exemplo da ajuda sem intenção esperada: '{phrase}'")
+    for phrase, expected, got in failures:
+        click.echo(f"❌ '{phrase}': esperado {expected}, obtido {got}")
+
+    phrases = list(ASSISTANT_HELP_EXAMPLES)
+    start = time.perf_counter()
+    for i in range(iterations):
+        assistant.match(phrases[i % len(phrases)])
+    elapsed = time.perf_counter() - start
+    click.echo(f"⏱️  {iterations} roteamentos em {elapsed * 1000:.1f} ms ({elapsed / iterations * 1e6:.2f} µs cada)")
+
+    if missing or failures:
+        raise SystemExit(1)
+    click.echo(f"✅ {len(ASSISTANT_HELP_EXAMPLES)} exemplos da ajuda roteados corretamente")
+
+
+@app.route('/api/ai/analyze', methods=['POST'])
+def ai_analyze():
+    """Endpoint de análise IA como fallback quando MCP não estiver disponível"""
+    query = ''
+    user_id = None
+    try:
+        data = request.get_json(force=True) or {}
+        query = data.get('query', '').lower().strip()
+        user_id = get_current_user_id()
         
-        elif any(word in query for word in ['relatórios', 'relatório', 'ir para relatórios']):
-            response_text = "Abrindo a seção de relatórios."
-            actions.append({
-                'type': 'navigate_to_section',
-                'data': {'section': 'reports'}
-            })
+        if not user_id:
+            return jsonify({'error': 'Usuário não autenticado'}), 401
         
-        elif any(word in query for word in ['dashboard', 'painel', 'início']):
-            response_text = "Voltando para o dashboard principal."
-            actions.append({
-                'type': 'navigate_to_section',
-                'data': {'section': 'dashboard'}
+        if not query:
+            return jsonify({
+                'response': 'Por favor, digite uma pergunta ou comando. Digite "ajuda" para ver os comandos disponíveis.',
+                'actions': []
             })
         
-        # Consultas de dados
-        elif any(word in query for word in ['saldo', 'quanto tenho', 'meu saldo', 'saldo atual', 'dinheiro']):
-            if not transactions:
-                response_text = "🎯 📝 Você ainda não possui dados cadastrados neste período.\n\nPara começar a gerar insights:\n\n• Adicione sua primeira transação (Receita ou Despesa)\n• Defina um orçamento e metas financeiras\n\nPosso abrir o formulário de nova transação para você agora."
-                actions.append({
-                    'type': 'prompt_add_data'
-                })
-            else:
-                response_text = f"💰 Seu saldo atual é R$ {saldo:,.2f}.\n\n"
-                response_text += f"📊 Receitas: R$ {total_receitas:,.2f}\n"
-                response_text += f"💸 Despesas: R$ {total_despesas:,.2f}\n\n"
-                if saldo > 0:
-                    response_text += "✅ Excelente! Você está com saldo positivo. Continue mantendo suas finanças organizadas!"
-                else:
-                    response_text += "⚠️ Atenção: Saldo negativo. Recomendo revisar seus gastos para equilibrar as finanças."
-                actions.append({
-                    'type': 'show_balance',
-                    'data': {
-                        'saldo': float(saldo),
-                        'receitas': float(total_receitas),
-                        'despesas': float(total_despesas)
-                    }
-                })
-        
-        elif any(word in query for word in ['gastos', 'despesas', 'quanto gastei', 'maiores gastos', 'categoria']):
-            if not transactions:
-                response_text = "🎯 📝 Você ainda não possui dados cadastrados neste período.\n\nPara começar a gerar insights:\n\n• Adicione sua primeira transação (Receita ou Despesa)\n• Defina um orçamento e metas financeiras\n\nPosso abrir o formulário de nova transação para você agora."
-                actions.append({
-                    'type': 'prompt_add_data'
-                })
-            else:
-                # Análise por categoria
-                despesas_por_cat = {}
-                for t in transactions:
-                    if t.type == 'Despesa':
-                        despesas_por_cat[t.category] = despesas_por_cat.get(t.category, 0) + t.value
-                
-                if despesas_por_cat:
-                    sorted_cats = sorted(despesas_por_cat.items(), key=lambda x: x[1], reverse=True)
-                    response_text = f"💸 Suas despesas totalizam R$ {total_despesas:,.2f}.\n\n"
-                    response_text += "📊 Principais categorias:\n\n"
-                    for i, (cat, valor) in enumerate(sorted_cats[:5], 1):
-                        response_text += f"{i}. {cat}: R$ {valor:,.2f}\n"
-                    actions.append({
-                        'type': 'show_category_analysis',
-                        'data': {'categories': dict(sorted_cats[:5])}
-                    })
-                else:
-                    response_text = "Você ainda não possui despesas cadastradas."
-        
-        elif any(word in query for word in ['receitas', 'quanto recebi', 'entradas']):
-            if not transactions:
-                response_text = "🎯 📝 Você ainda não possui dados cadastrados neste período.\n\nPara começar a gerar insights:\n\n• Adicione sua primeira transação (Receita ou Despesa)\n• Defina um orçamento e metas financeiras\n\nPosso abrir o formulário de nova transação para você agora."
-                actions.append({
-                    'type': 'prompt_add_data'
-                })
-            else:
-                receitas_por_cat = {}
-                for t in transactions:
-                    if t.type == 'Receita':
-                        receitas_por_cat[t.category] = receitas_por_cat.get(t.category, 0) + t.value
-                
-                if receitas_por_cat:
-                    sorted_cats = sorted(receitas_por_cat.items(), key=lambda x: x[1], reverse=True)
-                    response_text = f"💰 Suas receitas totalizam R$ {total_receitas:,.2f}.\n\n"
-                    response_text += "📊 Principais categorias:\n\n"
-                    for i, (cat, valor) in enumerate(sorted_cats[:5], 1):
-                        response_text += f"{i}. {cat}: R$ {valor:,.2f}\n"
-                else:
-                    response_text = "Você ainda não possui receitas cadastradas."
-        
-        elif any(word in query for word in ['metas', 'objetivos', 'progresso', 'minhas metas']):
-            if not goals:
-                response_text = "Você ainda não possui metas cadastradas. Posso abrir a seção de metas para você criar uma?"
-                actions.append({
-                    'type': 'navigate_to_section',
-                    'data': {'section': 'goals'}
-                })
-            else:
-                response_text = f"🎯 Você possui {len(goals)} meta(s) cadastrada(s):\n\n"
-                for goal in goals[:5]:
-                    progresso = (goal.current / goal.target * 100) if goal.target > 0 else 0
-                    response_text += f"• {goal.title}: R$ {goal.current:,.2f} / R$ {goal.target:,.2f} ({progresso:.1f}%)\n"
-                actions.append({
-                    'type': 'navigate_to_section',
-                    'data': {'section': 'goals'}
-                })
-        
-        elif any(word in query for word in ['orçamento', 'quanto posso gastar']):
-            if not budgets:
-                response_text = "Você ainda não possui orçamentos cadastrados para este mês. Posso abrir a seção de orçamento para você criar?"
-                actions.append({
-                    'type': 'navigate_to_section',
-                    'data': {'section': 'budget'}
-                })
-            else:
-                response_text = "📊 Seu orçamento deste mês:\n\n"
-                total_orcado = sum(b.budget_amount for b in budgets)
-                total_gasto = sum(b.spent_amount for b in budgets)
-                for budget in budgets[:5]:
-                    porcentagem = (budget.spent_amount / budget.budget_amount * 100) if budget.budget_amount > 0 else 0
-                    emoji = "🟢" if porcentagem < 80 else "🟡" if porcentagem < 100 else "🔴"
-                    response_text += f"{emoji} {budget.category}: R$ {budget.spent_amount:,.2f} / R$ {budget.budget_amount:,.2f} ({porcentagem:.1f}%)\n"
-                actions.append({
-                    'type': 'navigate_to_section',
-                    'data': {'section': 'budget'}
-                })
-        
-        # NOVAS FUNCIONALIDADES
-        
-        # Comparação de períodos (mês passado vs atual)
-        elif any(word in query for word in ['comparar', 'comparação', 'mês passado', 'mês anterior', 'diferença']):
-            if not transactions:
-                response_text = "⚠️ Você ainda não possui dados suficientes para comparação."
-                actions.append({'type': 'prompt_add_data'})
-            else:
-                # Calcular mês atual
-                receitas_atual = get_period_sum(transactions, 'Receita', 'monthly')
-                despesas_atual = get_period_sum(transactions, 'Despesa', 'monthly')
-                saldo_atual = receitas_atual - despesas_atual
-                
-                # Calcular mês anterior
-                prev_month = current_month - 1 if current_month > 1 else 12
-                prev_year = current_year if current_month > 1 else current_year - 1
-                receitas_anterior = sum(t.value for t in transactions 
-                                       if t.type == 'Receita' 
-                                       and t.date.month == prev_month 
-                                       and t.date.year == prev_year)
-                despesas_anterior = sum(t.value for t in transactions 
-                                       if t.type == 'Despesa' 
-                                       and t.date.month == prev_month 
-                                       and t.date.year == prev_year)
-                saldo_anterior = receitas_anterior - despesas_anterior
-                
-                # Calcular diferenças
-                diff_receitas = receitas_atual - receitas_anterior
-                diff_despesas = despesas_atual - despesas_anterior
-                diff_saldo = saldo_atual - saldo_anterior
-                
-                response_text = f"📊 **Comparação: {prev_month}/{prev_year} vs {current_month}/{current_year}**\n\n"
-                response_text += f"💰 **Receitas:**\n"
-                response_text += f"   Mês atual: {format_currency(receitas_atual)}\n"
-                response_text += f"   Mês anterior: {format_currency(receitas_anterior)}\n"
-                if diff_receitas > 0:
-                    response_text += f"   📈 Aumento de {format_currency(abs(diff_receitas))} (+{(diff_receitas/receitas_anterior*100):.1f}%)\n\n" if receitas_anterior > 0 else f"   📈 Primeiras receitas deste mês\n\n"
-                elif diff_receitas < 0:
-                    response_text += f"   📉 Redução de {format_currency(abs(diff_receitas))} ({(diff_receitas/receitas_anterior*100):.1f}%)\n\n" if receitas_anterior > 0 else "\n"
-                else:
-                    response_text += "   ➡️ Sem mudança\n\n"
-                
-                response_text += f"💸 **Despesas:**\n"
-                response_text += f"   Mês atual: {format_currency(despesas_atual)}\n"
-                response_text += f"   Mês anterior: {format_currency(despesas_anterior)}\n"
-                if diff_despesas > 0:
-                    response_text += f"   ⚠️ Aumento de {format_currency(abs(diff_despesas))} (+{(diff_despesas/despesas_anterior*100):.1f}%)\n\n" if despesas_anterior > 0 else f"   ⚠️ Primeiras despesas deste mês\n\n"
-                elif diff_despesas < 0:
-                    response_text += f"   ✅ Redução de {format_currency(abs(diff_despesas))} ({(diff_despesas/despesas_anterior*100):.1f}%)\n\n" if despesas_anterior > 0 else "\n"
-                else:
-                    response_text += "   ➡️ Sem mudança\n\n"
-                
-                response_text += f"💵 **Saldo:**\n"
-                response_text += f"   Mês atual: {format_currency(saldo_atual)}\n"
-                response_text += f"   Mês anterior: {format_currency(saldo_anterior)}\n"
-                if diff_saldo > 0:
-                    response_text += f"   ✅ Melhoria de {format_currency(abs(diff_saldo))}\n"
-                elif diff_saldo < 0:
-                    response_text += f"   ⚠️ Redução de {format_currency(abs(diff_saldo))}\n"
-                else:
-                    response_text += "   ➡️ Sem mudança\n"
-        
-        # Tendências de gastos (últimos 3 meses)
-        elif any(word in query for word in ['tendência', 'tendências', 'evolução', 'crescimento']):
-            if not transactions:
-                response_text = "⚠️ Você ainda não possui dados suficientes para análise de tendências."
-                actions.append({'type': 'prompt_add_data'})
-            else:
-                response_text = "📈 **Tendências dos últimos 3 meses:**\n\n"
-                meses_tendencia = []
-                for i in range(3):
-                    month = current_month - i
-                    year = current_year
-                    if month <= 0:
-                        month += 12
-                        year -= 1
-                    
-                    receitas_mes = sum(t.value for t in transactions 
-                                      if t.type == 'Receita' 
-                                      and t.date.month == month 
-                                      and t.date.year == year)
-                    despesas_mes = sum(t.value for t in transactions 
-                                      if t.type == 'Despesa' 
-                                      and t.date.month == month 
-                                      and t.date.year == year)
-                    saldo_mes = receitas_mes - despesas_mes
-                    meses_tendencia.append({
-                        'mes': f"{month:02d}/{year}",
-                        'receitas': receitas_mes,
-                        'despesas': despesas_mes,
-                        'saldo': saldo_mes
-                    })
-                
-                for i, mes_data in enumerate(meses_tendencia):
-                    seta = "📈" if mes_data['saldo'] > 0 else "📉" if mes_data['saldo'] < 0 else "➡️"
-                    response_text += f"{seta} **{mes_data['mes']}:**\n"
-                    response_text += f"   Receitas: {format_currency(mes_data['receitas'])}\n"
-                    response_text += f"   Despesas: {format_currency(mes_data['despesas'])}\n"
-                    response_text += f"   Saldo: {format_currency(mes_data['saldo'])}\n\n"
-        
-        # Economia mensal e taxa de economia
-        elif any(word in query for word in ['economia', 'economizar', 'poupança', 'taxa de economia']):
-            if not transactions:
-                response_text = "⚠️ Você ainda não possui dados para calcular economia."
-                actions.append({'type': 'prompt_add_data'})
-            else:
-                receitas_mensal = get_period_sum(transactions, 'Receita', 'monthly')
-                despesas_mensal = get_period_sum(transactions, 'Despesa', 'monthly')
-                economia_mensal = receitas_mensal - despesas_mensal
-                taxa_economia = (economia_mensal / receitas_mensal * 100) if receitas_mensal > 0 else 0
-                
-                receitas_anual = get_period_sum(transactions, 'Receita', 'yearly')
-                despesas_anual = get_period_sum(transactions, 'Despesa', 'yearly')
-                economia_anual = receitas_anual - despesas_anual
-                
-                response_text = "💰 **Análise de Economia:**\n\n"
-                response_text += f"📅 **Este Mês:**\n"
-                response_text += f"   Receitas: {format_currency(receitas_mensal)}\n"
-                response_text += f"   Despesas: {format_currency(despesas_mensal)}\n"
-                response_text += f"   Economia: {format_currency(economia_mensal)}\n"
-                response_text += f"   Taxa de economia: {taxa_economia:.1f}%\n\n"
-                
-                response_text += f"📅 **Este Ano:**\n"
-                response_text += f"   Receitas: {format_currency(receitas_anual)}\n"
-                response_text += f"   Despesas: {format_currency(despesas_anual)}\n"
-                response_text += f"   Economia acumulada: {format_currency(economia_anual)}\n\n"
-                
-                # Sugestões
-                if taxa_economia < 10:
-                    response_text += "💡 **Sugestão:** Sua taxa de economia está baixa (<10%). Considere revisar gastos desnecessários."
-                elif taxa_economia >= 20:
-                    response_text += "✅ **Excelente!** Você está economizando mais de 20% da sua receita. Continue assim!"
-                else:
-                    response_text += "👍 **Bom trabalho!** Você está mantendo uma taxa de economia saudável."
-        
-        # Alertas de orçamento (categorias próximas do limite)
-        elif any(word in query for word in ['limite', 'orçamento estourado', 'gastando muito', 'alertas orçamento']):
-            if not budgets:
-                response_text = "⚠️ Você ainda não possui orçamentos cadastrados."
-                actions.append({
-                    'type': 'navigate_to_section',
-                    'data': {'section': 'budget'}
-                })
-            else:
-                alertas = []
-                for budget in budgets:
-                    porcentagem = (budget.spent_amount / budget.budget_amount * 100) if budget.budget_amount > 0 else 0
-                    if porcentagem >= 100:
-                        alertas.append(('🔴', budget.category, porcentagem, 'ESTOURADO'))
-                    elif porcentagem >= 80:
-                        alertas.append(('🟡', budget.category, porcentagem, 'PRÓXIMO DO LIMITE'))
-                
-                if alertas:
-                    response_text = "⚠️ **Alertas de Orçamento:**\n\n"
-                    for status, categoria, porcentagem, tipo in alertas:
-                        budget_obj = next((b for b in budgets if b.category == categoria), None)
-                        if budget_obj:
-                            response_text += f"{status} **{categoria}:** {tipo}\n"
-                            response_text += f"   Gasto: {format_currency(budget_obj.spent_amount)} de {format_currency(budget_obj.budget_amount)} ({porcentagem:.1f}%)\n\n"
-                else:
-                    response_text = "✅ **Ótimas notícias!** Nenhum orçamento próximo do limite no momento."
-                    response_text += "\n\n📊 **Status dos seus orçamentos:**\n\n"
-                    for budget in budgets[:5]:
-                        porcentagem = (budget.spent_amount / budget.budget_amount * 100) if budget.budget_amount > 0 else 0
-                        status = "✅" if porcentagem < 80 else "⚠️"
-                        response_text += f"{status} {budget.category}: {format_currency(budget.spent_amount)} / {format_currency(budget.budget_amount)} ({porcentagem:.1f}%)\n"
-        
-        # Transações recentes
-        elif any(word in query for word in ['transações recentes', 'últimas transações', 'movimentações recentes', 'histórico recente']):
-            if not transactions:
-                response_text = "⚠️ Nenhuma transação cadastrada ainda."
-                actions.append({'type': 'prompt_add_data'})
-            else:
-                recentes = sorted(transactions, key=lambda x: x.date, reverse=True)[:10]
-                response_text = f"📋 **Últimas {len(recentes)} transações:**\n\n"
-                for i, t in enumerate(recentes, 1):
-                    tipo_emoji = "💰" if t.type == "Receita" else "💸"
-                    sinal = "+" if t.type == "Receita" else "-"
-                    data_str = t.date.strftime('%d/%m/%Y')
-                    response_text += f"{i}. {tipo_emoji} {t.description}\n"
-                    response_text += f"   {sinal}{format_currency(t.value)} | {t.category} | {data_str}\n\n"
-        
-        # Categorias mais usadas
-        elif any(word in query for word in ['categorias mais usadas', 'categorias frequentes', 'onde mais gasto', 'categorias principais']):
-            if not transactions:
-                response_text = "⚠️ Nenhuma transação cadastrada ainda."
-                actions.append({'type': 'prompt_add_data'})
-            else:
-                # Contar frequência de uso de categorias
-                freq_categorias = {}
-                for t in transactions:
-                    freq_categorias[t.category] = freq_categorias.get(t.category, 0) + 1
-                
-                sorted_freq = sorted(freq_categorias.items(), key=lambda x: x[1], reverse=True)
-                
-                response_text = "📊 **Categorias mais utilizadas:**\n\n"
-                for i, (cat, count) in enumerate(sorted_freq[:10], 1):
-                    response_text += f"{i}. {cat}: {count} transação(ões)\n"
-        
-        # Status detalhado de metas
-        elif any(word in query for word in ['status metas', 'progresso metas', 'como estão minhas metas', 'meta próxima']):
-            if not goals:
-                response_text = "⚠️ Você ainda não possui metas cadastradas."
-                actions.append({
-                    'type': 'navigate_to_section',
-                    'data': {'section': 'goals'}
-                })
-            else:
-                response_text = "🎯 **Status das Metas:**\n\n"
-                # Ordenar por progresso
-                goals_sorted = sorted(goals, key=lambda g: (g.current / g.target) if g.target > 0 else 0, reverse=True)
-                
-                for goal in goals_sorted:
-                    progresso = (goal.current / goal.target * 100) if goal.target > 0 else 0
-                    dias_restantes = (goal.deadline.date() - now.date()).days
-                    
-                    if progresso >= 100:
-                        status = "✅ CONCLUÍDA"
-                    elif dias_restantes < 0:
-                        status = "⏰ VENCIDA"
-                    elif dias_restantes <= 30:
-                        status = "🔥 URGENTE"
-                    elif progresso >= 75:
-                        status = "👍 QUASE LÁ"
-                    else:
-                        status = "📌 EM ANDAMENTO"
-                    
-                    response_text += f"{status} **{goal.title}**\n"
-                    response_text += f"   Progresso: {format_currency(goal.current)} / {format_currency(goal.target)} ({progresso:.1f}%)\n"
-                    response_text += f"   Faltam: {format_currency(goal.target - goal.current)} | {dias_restantes} dias restantes\n\n"
-        
-        # Previsão de gastos mensais (média dos últimos meses)
-        elif any(word in query for word in ['previsão', 'média de gastos', 'quanto devo gastar', 'projeção']):
-            if not transactions:
-                response_text = "⚠️ Você ainda não possui dados suficientes para previsões."
-                actions.append({'type': 'prompt_add_data'})
-            else:
-                # Calcular média dos últimos 3 meses
-                valores_meses = []
-                for i in range(1, 4):
-                    month = current_month - i
-                    year = current_year
-                    if month <= 0:
-                        month += 12
-                        year -= 1
-                    
-                    gasto_mes = sum(t.value for t in transactions 
-                                   if t.type == 'Despesa' 
-                                   and t.date.month == month 
-                                   and t.date.year == year)
-                    if gasto_mes > 0:
-                        valores_meses.append(gasto_mes)
-                
-                if valores_meses:
-                    media_gastos = sum(valores_meses) / len(valores_meses)
-                    gasto_atual = get_period_sum(transactions, 'Despesa', 'monthly')
-                    
-                    response_text = "🔮 **Previsão de Gastos:**\n\n"
-                    response_text += f"📊 Média dos últimos {len(valores_meses)} meses: {format_currency(media_gastos)}\n"
-                    response_text += f"📅 Gasto atual (este mês): {format_currency(gasto_atual)}\n\n"
-                    
-                    if gasto_atual > media_gastos * 1.2:
-                        response_text += "⚠️ Você está gastando 20% acima da média. Considere revisar seus gastos."
-                    elif gasto_atual < media_gastos * 0.8:
-                        response_text += "✅ Você está gastando abaixo da média. Bom trabalho!"
-                    else:
-                        response_text += "👍 Seus gastos estão alinhados com a média histórica."
-                else:
-                    response_text = "⚠️ Dados insuficientes para calcular previsão (precisa de pelo menos 1 mês de histórico)."
-
-        else:
-            # Resposta padrão se não entender - dar resposta contextual
-            response_text = "Desculpe, não entendi completamente sua pergunta. Mas posso te ajudar com:\n\n"
-            response_text += "💰 **Consultas:** saldo, despesas, receitas\n"
-            response_text += "📊 **Navegação:** abrir transação, orçamento, metas, relatórios\n"
-            response_text += "🎯 **Análises:** maiores gastos, progresso de metas\n\n"
-            response_text += "Tente reformular sua pergunta ou digite 'ajuda' para ver todos os comandos disponíveis."
-            
-            # Sugerir ajuda se não houver dados
-            if not transactions:
-                actions.append({
-                    'type': 'prompt_add_data'
-                })
+        ctx = AssistantContext(user_id, query)
+        intent = assistant.match(query)
+        handler = assistant.handler(intent) if intent else intent_fallback
+        response_text, actions = handler(ctx)
         
         return jsonify({
             'response': response_text,
@@ -1376,12 +2719,9 @@ Pergunte de forma natural e eu responderei! 💬"""
         })
         
     except Exception as e:
-        import traceback
         error_trace = traceback.format_exc()
-        print(f"❌ ERRO em /api/ai/analyze: {str(e)}")
-        print(f"📋 Traceback completo:\n{error_trace}")
-        print(f"🔍 Query recebida: {query}")
-        print(f"👤 User ID: {user_id}")
+        # Sem o texto da pergunta: pode conter dados do usuário
+        log.exception("Erro em /api/ai/analyze", extra={'user_id': get_current_user_id()})
         return jsonify({
             'response': f'Desculpe, ocorreu um erro ao processar sua pergunta: {str(e)}. Tente novamente ou digite "ajuda" para ver os comandos disponíveis.',
             'actions': [],
@@ -1450,16 +2790,25 @@ def init_demo_user():
                 demo_user.set_password('demo123')
                 db.session.add(demo_user)
                 db.session.commit()
-                print(f"✅ Usuário de demonstração criado: {demo_email} / demo123")
+                log.info("Usuário de demonstração criado", extra={'email': demo_email})
         except Exception as e:
-            print(f"⚠️  Aviso ao verificar usuário demo: {e}")
+            log.warning("Aviso ao verificar usuário demo", extra={'error': str(e)})
 
-if __name__ == '__main__':
+def init_database():
+    """Cria tabelas e índices que faltam e o usuário de demonstração (uma vez, antes dos workers)."""
     with app.app_context():
         try:
             db.create_all()
+            ensure_indexes()
             init_demo_user()
         except Exception as e:
-            print(f"⚠️  Erro ao inicializar banco: {e}")
-            print("💡 Execute 'python init_mysql.py' para configurar o banco manualmente.")
+            log.error("Erro ao inicializar banco; execute 'python init_mysql.py' para configurá-lo manualmente",
+                      extra={'error': str(e)})
+
+
+if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use `python -m finanmaster serve`
+    # Calibra o hash de senhas antes de atender o primeiro login
+    log.info("Hash de senhas", extra={'hasher': password_service.name, 'params': password_service.hasher.params})
+    init_database()
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,120 @@
+"""
+Backends de cache do FinanMaster.
+
+- LRUCache: em memória do processo, com TTL e limite de entradas.
+- RedisCache: qualquer servidor compatível com Redis (Redis, Valkey, KeyDB...),
+  compartilhado entre workers. Requer o pacote opcional `redis`.
+
+Os dois expõem a mesma interface (get/set/delete/clear/stats) e contam
+acertos e falhas por processo.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache LRU em memória com expiração por entrada."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = 2048, default_ttl: int = 300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value, ttl: int | None = None) -> None:
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+            'size': len(self._data),
+            'max_entries': self.max_entries,
+        }
+
+
+class RedisCache:
+    """Cache em servidor compatível com Redis; valores gravados como bytes com expiração."""
+
+    name = 'redis'
+
+    def __init__(self, url: str, default_ttl: int = 300, prefix: str = 'finanmaster:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Backend Redis requer o pacote 'redis' (pip install redis).") from e
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value, ttl: int | None = None) -> None:
+        self.client.set(self.prefix + key, value, ex=ttl or self.default_ttl)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+        }
+
+
+def create_cache(url: str, max_entries: int = 2048, default_ttl: int = 300):
+    """Cria o backend a partir de uma URL: `memory://` (padrão) ou `redis://host:porta/db`."""
+    if not url or url.startswith('memory://'):
+        return LRUCache(max_entries=max_entries, default_ttl=default_ttl)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache(url, default_ttl=default_ttl)
+    raise ValueError(f"Backend de cache não suportado: {url}")
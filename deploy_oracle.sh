@@ -31,6 +31,9 @@ sudo rm /etc/nginx/sites-enabled/default
 sudo systemctl restart nginx
 sudo systemctl enable nginx
 
+# Atrás do nginx: o app lê o IP real do cliente de X-Forwarded-For
+grep -q '^PROXY_FIX_X_FOR=' .env 2>/dev/null || echo 'PROXY_FIX_X_FOR=1' >> .env
+
 # Configurar Systemd
 sudo cp finanmaster.service /etc/systemd/system/
 sudo systemctl daemon-reload
@@ -0,0 +1,218 @@
+"""
+Pub/sub de eventos de alteração de dados por usuário (alimenta /api/events).
+
+- EventBroker: em memória, entrega apenas aos assinantes deste processo.
+- RedisEventBroker: publica num servidor compatível com Redis (Redis, Valkey,
+  KeyDB...) e uma thread por processo repassa as mensagens aos assinantes
+  locais, para funcionar com vários workers. Requer o pacote opcional `redis`.
+- AsyncEventHub: assinantes asyncio do servidor ASGI (uvicorn), que atende os
+  streams /api/events sem ocupar uma thread por conexão.
+"""
+
+import asyncio
+import json
+import queue
+import threading
+
+# Tipos de dados publicados nos eventos (chave `kinds`)
+DATA_KINDS = ('transactions', 'goals', 'budgets')
+
+
+class EventBroker:
+    """Distribui mensagens para as filas dos assinantes de cada usuário."""
+
+    name = 'memory'
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers = {}  # user_id -> set de filas
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int, subscriber=None) -> queue.Queue:
+        """Registra `subscriber` (qualquer objeto com put_nowait; padrão: uma fila nova) para o usuário."""
+        if subscriber is None:
+            subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id: int, subscriber: queue.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: int, message: dict) -> None:
+        self._deliver(user_id, message)
+
+    def _deliver(self, user_id: int, message: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Cliente lento: o próximo evento já o fará recarregar os dados
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'backend': self.name,
+                'users': len(self._subscribers),
+                'connections': sum(len(s) for s in self._subscribers.values()),
+            }
+
+
+class RedisEventBroker(EventBroker):
+    """Broker via Redis pub/sub, compartilhado entre processos."""
+
+    name = 'redis'
+
+    def __init__(self, url: str, queue_size: int = 100, channel_prefix: str = 'finanmaster:events:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Broker Redis requer o pacote 'redis' (pip install redis).") from e
+        super().__init__(queue_size=queue_size)
+        self.client = redis.Redis.from_url(url)
+        self.channel_prefix = channel_prefix
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, user_id: int, subscriber=None) -> queue.Queue:
+        self._ensure_listener()
+        return super().subscribe(user_id, subscriber)
+
+    def publish(self, user_id: int, message: dict) -> None:
+        self.client.publish(f"{self.channel_prefix}{user_id}", json.dumps(message))
+
+    def _ensure_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name='event-broker-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{self.channel_prefix}*")
+        for item in pubsub.listen():
+            channel = item['channel'].decode() if isinstance(item['channel'], bytes) else item['channel']
+            try:
+                user_id = int(channel[len(self.channel_prefix):])
+                message = json.loads(item['data'])
+            except (ValueError, TypeError):
+                continue
+            self._deliver(user_id, message)
+
+
+class _LoopQueue:
+    """Entrega mensagens de outra thread (listener do Redis) a uma asyncio.Queue."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, target: asyncio.Queue):
+        self.loop = loop
+        self.target = target
+
+    def put_nowait(self, message: dict) -> None:
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message: dict) -> None:
+        try:
+            self.target.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+class AsyncEventHub:
+    """Assinaturas asyncio por usuário para streams SSE num servidor ASGI.
+
+    Com um broker compartilhado (RedisEventBroker) as mensagens dele, com os
+    tipos alterados, são repassadas ao event loop. Sem ele (o app Flask publica
+    só no próprio processo), uma única tarefa lê as versões dos usuários
+    conectados com `load_versions(user_ids) -> {user_id: versão}` a cada
+    `poll_interval` segundos e avisa quem mudou com todos os `kinds`: o custo é
+    uma consulta por intervalo, qualquer que seja o número de conexões.
+    """
+
+    def __init__(self, load_versions, kinds, broker: EventBroker | None = None,
+                 poll_interval: float = 2.0, queue_size: int = 100):
+        self.load_versions = load_versions
+        self.kinds = sorted(kinds)
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._subscribers = {}  # user_id -> {asyncio.Queue: adaptador do broker ou None}
+        self._versions = {}  # user_id -> última versão vista
+        self._poller = None
+        self.polls = 0
+        self.opened = 0
+
+    async def subscribe(self, user_id: int) -> tuple[asyncio.Queue, int]:
+        """Fila de mensagens do usuário e a versão atual dos seus dados."""
+        versions = await asyncio.to_thread(self.load_versions, [user_id])
+        subscriber = asyncio.Queue(maxsize=self.queue_size)
+        adapter = None
+        if self.broker is not None:
+            adapter = self.broker.subscribe(user_id, _LoopQueue(asyncio.get_running_loop(), subscriber))
+        self._subscribers.setdefault(user_id, {})[subscriber] = adapter
+        self._versions.setdefault(user_id, versions.get(user_id, 0))
+        self.opened += 1
+        if self.broker is None and (self._poller is None or self._poller.done()):
+            self._poller = asyncio.create_task(self._poll())
+        return subscriber, versions.get(user_id, 0)
+
+    def unsubscribe(self, user_id: int, subscriber: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is None:
+            return
+        adapter = subscribers.pop(subscriber, None)
+        if adapter is not None:
+            self.broker.unsubscribe(user_id, adapter)
+        if not subscribers:
+            del self._subscribers[user_id]
+            self._versions.pop(user_id, None)
+
+    async def _poll(self) -> None:
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            user_ids = list(self._subscribers)
+            if not user_ids:
+                break
+            try:
+                versions = await asyncio.to_thread(self.load_versions, user_ids)
+            except Exception:
+                continue
+            self.polls += 1
+            for user_id in user_ids:
+                version = versions.get(user_id, 0)
+                if user_id not in self._versions or version == self._versions[user_id]:
+                    continue
+                self._versions[user_id] = version
+                for subscriber in list(self._subscribers.get(user_id, ())):
+                    try:
+                        subscriber.put_nowait({'kinds': self.kinds, 'version': version})
+                    except asyncio.QueueFull:
+                        pass
+
+    def stats(self) -> dict:
+        return {
+            'backend': self.broker.name if self.broker is not None else 'poll',
+            'poll_interval': self.poll_interval if self.broker is None else None,
+            'users': len(self._subscribers),
+            'connections': sum(len(s) for s in self._subscribers.values()),
+            'opened': self.opened,
+            'polls': self.polls,
+        }
+
+
+def create_broker(url: str, queue_size: int = 100):
+    """Cria o broker a partir de uma URL: `memory://` (padrão) ou `redis://host:porta/db`."""
+    if not url or url.startswith('memory://'):
+        return EventBroker(queue_size=queue_size)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisEventBroker(url, queue_size=queue_size)
+    raise ValueError(f"Broker de eventos não suportado: {url}")
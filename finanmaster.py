@@ -0,0 +1,225 @@
+"""
+Inicialização do FinanMaster em produção.
+
+    python -m finanmaster serve              # app Flask + servidor MCP
+    python -m finanmaster serve --only flask # só o app Flask (gunicorn)
+    python -m finanmaster serve --only mcp   # só o servidor MCP (uvicorn)
+
+O app Flask roda no gunicorn com workers `gthread` e o servidor MCP no uvicorn
+com vários workers. O nginx manda /api/events (SSE) ao uvicorn, onde cada
+conexão ociosa é uma tarefa asyncio (teste de carga: instance/bench_events.py).
+No /api/events do próprio Flask cada conexão ocupa uma thread: no máximo metade
+das threads de cada worker (EVENTS_MAX_STREAMS) atende streams, e as excedentes
+recebem 503 e o navegador passa a fazer polling.
+Tabelas, índices, usuário de demonstração e calibração do hash de senhas são
+feitos uma única vez no processo mestre, antes dos workers (hook on_starting).
+
+Workers, threads, keep-alive, timeout e preload vêm das opções de linha de
+comando ou das variáveis FLASK_* / MCP_* do .env.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from logs import setup_logging, stop_logging
+
+ROOT_DIR = Path(__file__).resolve().parent
+load_dotenv(dotenv_path=str(ROOT_DIR / '.env'))
+
+log = logging.getLogger('finanmaster.launcher')
+
+
+# Variáveis vazias no .env (ex.: FLASK_WORKERS=) usam o padrão
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name) or default)
+
+
+def env_bool(name: str, default: bool) -> bool:
+    return (os.getenv(name) or str(default)).lower() in ('1', 'true', 'yes')
+
+
+def calibrate_password_hash() -> None:
+    """Calibra o hash de senhas no mestre e repassa os parâmetros aos workers (sem preload) pelo ambiente."""
+    if os.getenv('PASSWORD_HASH_PARAMS'):
+        return
+    from passwords import calibrate
+    params, _ = calibrate(os.getenv('PASSWORD_HASHER', 'scrypt'), float(os.getenv('PASSWORD_HASH_TARGET_MS', '150')))
+    os.environ['PASSWORD_HASH_PARAMS'] = ','.join(f"{k}={v}" for k, v in params.items())
+    log.info("Hash de senhas calibrado", extra={'params': os.environ['PASSWORD_HASH_PARAMS']})
+
+
+def memory_login_limits(workers: int) -> None:
+    """Limite de login em memória com vários workers: cada worker conta as próprias tentativas.
+
+    Os máximos configurados valem por worker (dividi-los bloquearia um e-mail no
+    primeiro erro). O cache de e-mails inexistentes é desativado: o cadastro só o
+    limparia no worker que o atendeu, e os demais recusariam a conta nova.
+    """
+    log.warning("LOGIN_LIMIT_URL=memory:// com vários workers: limites de login contados por worker e cache de "
+                "e-mails inexistentes desativado. Use redis://... para um limite compartilhado.",
+                extra={'workers': workers})
+    os.environ['LOGIN_UNKNOWN_EMAIL_TTL'] = '0'
+
+
+def on_starting(server) -> None:
+    """Mestre do gunicorn, antes dos workers: inicialização que não deve se repetir por worker."""
+    if server.cfg.preload_app:
+        # App já importado no mestre: os workers herdam o hasher calibrado
+        import app as flask_app
+        service = flask_app.password_service
+        log.info("Hash de senhas", extra={'hasher': service.name, 'params': service.hasher.params})
+        flask_app.init_database()
+        return
+    calibrate_password_hash()
+    # Sem preload o mestre não importa o app: inicializa num processo filho descartável
+    pid = os.fork()
+    if pid == 0:
+        try:
+            import app as flask_app
+            flask_app.init_database()
+        finally:
+            # os._exit não roda o atexit: esvazia a fila de logs antes de sair
+            stop_logging()
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+
+def post_fork(server, worker) -> None:
+    """Worker recém-criado: com preload, descarta conexões herdadas do mestre."""
+    flask_app = sys.modules.get('app')
+    if flask_app is None:
+        return
+    with flask_app.app.app_context():
+        flask_app.db.engine.dispose(close=False)
+    flask_app.session_store.after_fork()
+
+
+def serve_flask(args) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class FlaskApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    # Cada /api/events aberto ocupa uma thread do gthread: reserva ao menos metade das threads para a API
+    max_streams = min(env_int('EVENTS_MAX_STREAMS', args.threads // 2), args.threads // 2)
+    os.environ['EVENTS_MAX_STREAMS'] = str(max_streams)
+    if args.workers > 1 and (os.getenv('LOGIN_LIMIT_URL') or 'memory://').startswith('memory://'):
+        memory_login_limits(args.workers)
+    if args.workers > 1 and os.getenv('EVENTS_BROKER_URL', 'memory://').startswith('memory://'):
+        log.warning("EVENTS_BROKER_URL=memory:// com vários workers: /api/events só recebe alterações do próprio "
+                    "worker. Use redis://... em produção.", extra={'workers': args.workers})
+    log.info("Flask (gunicorn)", extra={
+        'url': f"http://{args.host}:{args.flask_port}", 'workers': args.workers, 'threads': args.threads,
+        'events_max_streams': max_streams,
+    })
+    FlaskApplication({
+        'bind': f"{args.host}:{args.flask_port}",
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'keepalive': args.keepalive,
+        'timeout': args.timeout,
+        'graceful_timeout': args.timeout,
+        'preload_app': args.preload,
+        'on_starting': on_starting,
+        'post_fork': post_fork,
+        'accesslog': '-' if args.access_log else None,
+        'errorlog': '-',
+    }).run()
+
+
+def serve_mcp(args) -> None:
+    import uvicorn
+
+    log.info("MCP (uvicorn)", extra={'url': f"http://{args.host}:{args.mcp_port}", 'workers': args.mcp_workers})
+    uvicorn.run(
+        'mcp_server:app',
+        app_dir=str(ROOT_DIR / 'instance'),
+        host=args.host,
+        port=args.mcp_port,
+        workers=args.mcp_workers,
+        timeout_keep_alive=args.keepalive,
+        access_log=args.access_log,
+    )
+
+
+def serve_all(argv) -> None:
+    """Sobe Flask e MCP como processos filhos e repassa Ctrl+C/SIGTERM a ambos."""
+    base = [sys.executable, '-m', 'finanmaster', *argv]
+    children = [subprocess.Popen(base + ['--only', only], cwd=str(ROOT_DIR)) for only in ('flask', 'mcp')]
+
+    def stop(signum, frame):
+        for child in children:
+            if child.poll() is None:
+                child.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    # Se um dos servidores cair, encerra o outro
+    while all(child.poll() is None for child in children):
+        try:
+            children[0].wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+    stop(None, None)
+    codes = [child.wait() for child in children]
+    sys.exit(max(codes))
+
+
+def main(argv=None) -> None:
+    cpus = multiprocessing.cpu_count()
+    parser = argparse.ArgumentParser(prog='python -m finanmaster', description='FinanMaster')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='Sobe o app Flask (gunicorn) e o servidor MCP (uvicorn).')
+    serve.add_argument('--only', choices=('flask', 'mcp'), default=None, help='Sobe apenas um dos servidores.')
+    serve.add_argument('--host', default=os.getenv('BIND_HOST', '0.0.0.0'))
+    serve.add_argument('--flask-port', type=int, default=env_int('FLASK_PORT', 5001))
+    serve.add_argument('--mcp-port', type=int, default=env_int('MCP_PORT', 8000))
+    serve.add_argument('--workers', type=int, default=env_int('FLASK_WORKERS', 2 * cpus + 1),
+                       help='Workers do gunicorn (padrão: 2 x CPUs + 1).')
+    serve.add_argument('--threads', type=int, default=env_int('FLASK_THREADS', 8),
+                       help='Threads por worker do gunicorn.')
+    serve.add_argument('--mcp-workers', type=int, default=env_int('MCP_WORKERS', cpus),
+                       help='Workers do uvicorn (padrão: CPUs).')
+    serve.add_argument('--keepalive', type=int, default=env_int('SERVER_KEEPALIVE', 5),
+                       help='Segundos de keep-alive das conexões HTTP.')
+    serve.add_argument('--timeout', type=int, default=env_int('FLASK_TIMEOUT', 60),
+                       help='Segundos até o gunicorn reiniciar um worker travado.')
+    serve.add_argument('--preload', action=argparse.BooleanOptionalAction, default=env_bool('FLASK_PRELOAD', True),
+                       help='Importa o app no mestre antes do fork (memória compartilhada, início mais rápido).')
+    serve.add_argument('--access-log', action=argparse.BooleanOptionalAction,
+                       default=env_bool('SERVER_ACCESS_LOG', False))
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        # Mesmo serviço do processo servido: com preload o app reaproveita esta configuração
+        setup_logging(args.only or 'launcher')
+        if args.only == 'flask':
+            serve_flask(args)
+        elif args.only == 'mcp':
+            serve_mcp(args)
+        else:
+            serve_all(argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -44,11 +44,11 @@ case $opcao in
             echo "📦 Instalando dependências..."
             pip install -r requirements.txt
             
-            echo "🚀 Iniciando aplicação Flask..."
+            echo "🚀 Iniciando aplicação Flask (gunicorn) e servidor MCP (uvicorn)..."
             echo "🌐 Acesse: http://localhost:5001"
             echo "💡 Pressione Ctrl+C para parar"
             echo ""
-            python app.py
+            python -m finanmaster serve
         fi
         ;;
     3)
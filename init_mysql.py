@@ -53,11 +53,12 @@ def create_database():
 
 def create_tables():
     """Cria as tabelas usando Flask-SQLAlchemy"""
-    from app import app, db, User, Transaction, Goal, Budget
+    from app import app, db, User, Transaction, Goal, Budget, ensure_indexes
     
     with app.app_context():
         try:
             db.create_all()
+            ensure_indexes()
             print("✅ Tabelas criadas/verificadas com sucesso!")
             return True
         except Exception as e:
@@ -117,7 +118,7 @@ def create_demo_user(force_recreate=False):
 
 def create_demo_data(user_id: int, force_recreate=False):
     """Cria dados de exemplo para o usuário demo - 1 ano completo"""
-    from app import app, db, Transaction, Goal, Budget
+    from app import app, db, Transaction, Goal, Budget, rebuild_monthly_rollups, bump_data_version
     import random
     
     with app.app_context():
@@ -374,9 +375,14 @@ def create_demo_data(user_id: int, force_recreate=False):
             for budget in sample_budgets:
                 db.session.add(budget)
             
+            # Invalida respostas em cache dos dados antigos do usuário
+            bump_data_version(user_id)
             print(f"✅ Criados {len(sample_budgets)} orçamentos para todos os 12 meses (com gastos reais calculados)")
             
             db.session.commit()
+            
+            # As transações foram inseridas direto pelo ORM; recalcular os agregados mensais
+            rebuild_monthly_rollups(user_id)
             print("✅ Dados de demonstração criados com sucesso!")
             print(f"   📈 Total: {len(sample_transactions)} transações, {len(sample_goals)} metas, {len(sample_budgets)} orçamentos")
             print(f"   📅 Período: {months_to_populate[0][1]}/{months_to_populate[0][0]} até {months_to_populate[-1][1]}/{months_to_populate[-1][0]}")
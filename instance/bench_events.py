@@ -0,0 +1,146 @@
+"""
+Teste de carga do feed de alterações /api/events (SSE).
+
+Faz login no app Flask, abre N streams ociosos (como N abas do dashboard) e
+confere que todos recebem `ready` e continuam abertos; enquanto isso mede a
+latência de uma requisição comum da API. No fim cria uma transação e mede em
+quanto tempo cada stream recebe o evento `change`.
+
+    python instance/bench_events.py --connections 1000
+    python instance/bench_events.py --events-url http://127.0.0.1:5001   # streams no gunicorn
+
+Sai com 1 se algum stream for recusado (ex.: 503 -> o navegador cairia no polling)
+ou não receber o `change`.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+
+def login(flask_url: str, email: str, password: str) -> str:
+    """Cookie de sessão do usuário."""
+    request = urllib.request.Request(
+        f"{flask_url}/api/login",
+        data=json.dumps({'email': email, 'password': password}).encode(),
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request) as response:
+        return response.headers['Set-Cookie'].split(';', 1)[0]
+
+
+def api_request(flask_url: str, cookie: str, path: str, payload: dict | None = None) -> float:
+    """Segundos de uma requisição à API do Flask."""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(f"{flask_url}{path}", data=data,
+                                     headers={'Content-Type': 'application/json', 'Cookie': cookie})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+class Stream:
+    """Um cliente SSE mínimo sobre asyncio (sem dependências)."""
+
+    def __init__(self, url: str, cookie: str):
+        self.url = urlsplit(url)
+        self.cookie = cookie
+        self.status = None
+        self.ready = asyncio.Event()
+        self.changed_at = None
+        self.writer = None
+
+    async def run(self) -> None:
+        try:
+            reader, self.writer = await asyncio.open_connection(self.url.hostname, self.url.port or 80)
+            self.writer.write((f"GET /api/events HTTP/1.1\r\nHost: {self.url.netloc}\r\n"
+                               f"Accept: text/event-stream\r\nCookie: {self.cookie}\r\n\r\n").encode())
+            await self.writer.drain()
+            self.status = int((await reader.readline()).split()[1])
+            if self.status != 200:
+                return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if line.startswith(b'event: ready'):
+                    self.ready.set()
+                elif line.startswith(b'event: change') and self.changed_at is None:
+                    self.changed_at = time.perf_counter()
+        except (OSError, ValueError, IndexError):
+            self.status = self.status or 0
+        finally:
+            self.ready.set()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def bench(args) -> bool:
+    cookie = await asyncio.to_thread(login, args.flask_url, args.email, args.password)
+    streams = [Stream(args.events_url, cookie) for _ in range(args.connections)]
+    tasks = []
+    start = time.perf_counter()
+    for stream in streams:
+        tasks.append(asyncio.create_task(stream.run()))
+        await asyncio.sleep(0)
+    await asyncio.wait_for(asyncio.gather(*(s.ready.wait() for s in streams)), timeout=args.timeout)
+    opened = sum(1 for s in streams if s.status == 200)
+    statuses = {}
+    for s in streams:
+        statuses[s.status] = statuses.get(s.status, 0) + 1
+    print(f"{'✅' if opened == len(streams) else '❌'} {opened}/{len(streams)} streams abertos "
+          f"em {time.perf_counter() - start:.2f}s (status: {statuses})")
+
+    # Streams ociosos não podem atrasar o resto da API
+    await asyncio.sleep(args.idle)
+    alive = sum(1 for s, t in zip(streams, tasks) if s.status == 200 and not t.done())
+    latencies = sorted([await asyncio.to_thread(api_request, args.flask_url, cookie, '/api/dashboard-data')
+                        for _ in range(20)])
+    print(f"{'✅' if alive == opened else '❌'} {alive} streams abertos após {args.idle:.0f}s ociosos; "
+          f"/api/dashboard-data p50 {latencies[10] * 1000:.0f} ms, máx {latencies[-1] * 1000:.0f} ms")
+
+    changed_from = time.perf_counter()
+    await asyncio.to_thread(api_request, args.flask_url, cookie, '/api/transactions', {
+        'description': 'bench_events', 'value': 1, 'category': 'Teste', 'type': 'Receita',
+        'date': time.strftime('%Y-%m-%d'),
+    })
+    deadline = time.perf_counter() + args.timeout
+    while time.perf_counter() < deadline and any(s.changed_at is None for s in streams if s.status == 200):
+        await asyncio.sleep(0.05)
+    delays = sorted(s.changed_at - changed_from for s in streams if s.changed_at is not None)
+    if delays:
+        print(f"{'✅' if len(delays) == opened else '❌'} {len(delays)}/{opened} streams receberam `change`: "
+              f"p50 {delays[len(delays) // 2] * 1000:.0f} ms, máx {delays[-1] * 1000:.0f} ms")
+    else:
+        print(f"❌ nenhum stream recebeu `change` em {args.timeout:.0f}s")
+
+    for stream in streams:
+        stream.close()
+    for task in tasks:
+        task.cancel()
+    return opened == len(streams) and alive == opened and len(delays) == opened
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--flask-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--events-url', default='http://127.0.0.1:8000',
+                        help='Servidor de /api/events (padrão: o MCP/uvicorn, como no nginx.conf).')
+    parser.add_argument('--email', default='demo@finanmaster.com')
+    parser.add_argument('--password', default='demo123')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--idle', type=float, default=30, help='Segundos com os streams ociosos.')
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args(argv)
+    return 0 if asyncio.run(bench(args)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
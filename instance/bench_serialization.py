@@ -0,0 +1,78 @@
+"""
+Microbenchmark da serialização de transações do relatório do MCP.
+
+Compara o caminho antigo (df.iterrows() com um dicionário por linha) com
+`serialize_transactions` (conversões vetorizadas por coluna) em DataFrames
+sintéticos, e confere que as duas saídas são iguais.
+
+    python instance/bench_serialization.py                  # 10k e 100k linhas
+    python instance/bench_serialization.py --rows 50000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from mcp_server import TRANSACTION_COLUMNS, serialize_transactions
+
+
+def serialize_transactions_iterrows(df: pd.DataFrame) -> list:
+    """Implementação anterior, mantida só como referência do benchmark."""
+    transactions_list = []
+    for _, row in df.iterrows():
+        transactions_list.append({
+            "description": str(row['description']),
+            "value": float(row['value']),
+            "category": str(row['category']),
+            "type": str(row['type']),
+            "date": row['date'].isoformat() if pd.notna(row['date']) else None,
+        })
+    return transactions_list
+
+
+def synthetic_transactions(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Transações aleatórias com datas variadas: meia-noite, microssegundos e NaT."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 400 * 86400, rows), unit='s'))
+    dates[::3] = dates[::3].dt.normalize()
+    dates[::7] = dates[::7] + pd.to_timedelta(123456, unit='us')
+    dates[::101] = pd.NaT
+    return pd.DataFrame({
+        'description': [f'Transação {i}' for i in range(rows)],
+        'value': rng.uniform(1, 1000, rows),
+        'category': rng.choice(['Alimentação', 'Transporte', 'Lazer', 'Salário'], rows),
+        'type': rng.choice(['Receita', 'Despesa'], rows),
+        'date': dates,
+        'created_at': None,
+    }, columns=TRANSACTION_COLUMNS)
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    ok = True
+    for rows in args.rows:
+        df = synthetic_transactions(rows)
+        old, old_seconds = timed(serialize_transactions_iterrows, df)
+        new, new_seconds = timed(serialize_transactions, df)
+        same = old == new
+        ok = ok and same
+        print(f"{'✅' if same else '❌'} {rows} linhas: iterrows {old_seconds:.3f}s, "
+              f"vetorizado {new_seconds:.3f}s ({old_seconds / new_seconds:.1f}x)"
+              f"{'' if same else ' — saídas diferentes'}")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,46 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Cookie, Depends, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
+import logging
 import pymysql
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
+from sqlalchemy import MetaData, create_engine
 
 # Garantir carregamento do .env na raiz do projeto, mesmo executando a partir de instance/
-ROOT_ENV = Path(__file__).resolve().parents[1] / '.env'
+ROOT_DIR = Path(__file__).resolve().parents[1]
+ROOT_ENV = ROOT_DIR / '.env'
 load_dotenv(dotenv_path=str(ROOT_ENV))
+
+# Módulos compartilhados com o app Flask (snapshots.py...) ficam na raiz do projeto
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+from events import DATA_KINDS, AsyncEventHub, create_broker
+from logs import setup_logging
+from sessions import create_session_store
+from snapshots import ReportSnapshotStore, define_snapshot_table, params_variant
+setup_logging("mcp")
+log = logging.getLogger("finanmaster.mcp")
+# Eventos por relatório (alta frequência): DEBUG, amostráveis via LOG_SAMPLE
+reports_log = logging.getLogger("finanmaster.mcp.reports")
 app = FastAPI(title="FinanMaster MCP", version="1.0.0")
 
-# Configurar CORS
+# Configurar CORS: com cookies de sessão, só as origens do app Flask (nunca "*")
+CORS_ORIGINS = [origin.strip() for origin in
+                os.getenv("CORS_ORIGINS", "http://localhost:5001,http://127.0.0.1:5001").split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -32,6 +53,9 @@ class ReportRequest(BaseModel):
     categories: Optional[List[str]] = None
     insights: bool = True
     user_id: Optional[int] = None
+    # Paginação da lista de transações do relatório (None = sem limite)
+    transactions_limit: Optional[int] = 100
+    transactions_offset: int = 0
 
 class ReportResponse(BaseModel):
     report_type: str
@@ -70,16 +94,59 @@ def get_db_connection():
         cursorclass=pymysql.cursors.Cursor,
     )
 
+# Pool de conexões (mesmos parâmetros do SQLALCHEMY_ENGINE_OPTIONS do app Flask)
+DB_POOL_SIZE = int(os.getenv("MCP_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("MCP_DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("MCP_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("MCP_DB_POOL_RECYCLE", "280"))
+
+engine = create_engine(
+    "mysql+pymysql://",
+    creator=get_db_connection,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+
 def execute_query(query: str, params: tuple = ()) -> List[tuple]:
-    """Executa query no banco de dados"""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            return results
-    finally:
-        conn.close()
+    """Executa query no banco de dados usando uma conexão do pool"""
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(query, tuple(params))
+        return [tuple(row) for row in result.fetchall()]
+
+# Snapshots de relatórios por versão dos dados (tabela report_snapshots criada pelo app Flask)
+report_snapshots = ReportSnapshotStore(
+    lambda: engine,
+    define_snapshot_table(MetaData()),
+    source="mcp",
+    max_age_seconds=int(os.getenv("REPORT_SNAPSHOT_MAX_AGE", str(7 * 24 * 3600))),
+    max_bytes=int(os.getenv("REPORT_SNAPSHOT_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+
+# Sessões do app Flask (mesmo armazenamento): identificam o usuário pelo cookie de sessão
+SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "session")
+session_store = create_session_store(
+    os.getenv("SESSION_STORE_URL", ""),
+    lifetime_seconds=int(os.getenv("SESSION_LIFETIME_SECONDS", str(7 * 24 * 3600))),
+    lookup_ttl=int(os.getenv("SESSION_LOOKUP_TTL", "30")),
+)
+
+async def session_user_id(sid: Optional[str] = Cookie(default=None, alias=SESSION_COOKIE_NAME)) -> int:
+    """user_id da sessão do app Flask enviada no cookie; 401 sem sessão válida"""
+    user_id = await run_in_threadpool(session_store.user_id, sid) if sid else None
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Usuário não autenticado")
+    return user_id
+
+async def execute_query_async(query: str, params: tuple = ()) -> List[tuple]:
+    """Versão aguardável de execute_query: roda no threadpool para não bloquear o event loop"""
+    return await run_in_threadpool(execute_query, query, params)
+
+async def get_transactions_data_async(period: str = "current_month", user_id: Optional[int] = None) -> pd.DataFrame:
+    """Versão aguardável de get_transactions_data (consulta + montagem do DataFrame no threadpool)"""
+    return await run_in_threadpool(get_transactions_data, period, user_id)
 
 # Mensagem padrão quando não há dados
 def no_data_message() -> str:
@@ -91,53 +158,122 @@ def no_data_message() -> str:
         "Posso abrir o formulário de nova transação para você agora."
     )
 
+TRANSACTION_COLUMNS = ['description', 'value', 'category', 'type', 'date', 'created_at']
+
+def period_bounds(period: str, now: Optional[datetime] = None) -> tuple:
+    """Retorna (início, fim) do período como datetimes; None quando o lado é aberto."""
+    now = now or datetime.now()
+    if period == 'current_month':
+        start = datetime(now.year, now.month, 1)
+        end = datetime(now.year + 1, 1, 1) if now.month == 12 else datetime(now.year, now.month + 1, 1)
+        return start, end
+    if period == 'last_3_months':
+        return (pd.Timestamp(now) - pd.DateOffset(months=3)).to_pydatetime(), None
+    if period == 'last_6_months':
+        return (pd.Timestamp(now) - pd.DateOffset(months=6)).to_pydatetime(), None
+    return None, None
+
 def get_transactions_data(period: str = "current_month", user_id: Optional[int] = None) -> pd.DataFrame:
-    """Obtém dados de transações como DataFrame (filtragem de período feita em pandas para evitar diferenças de timezone)."""
+    """Obtém dados de transações como DataFrame, com o filtro de período aplicado no próprio SQL."""
+    conditions = ["`date` IS NOT NULL"]
     params: List[Any] = []
-    query = (
-        "SELECT description, value, category, `type`, `date`, created_at, user_id "
-        "FROM transactions"
-    )
     if user_id is not None:
-        query += " WHERE user_id = %s"
+        conditions.append("user_id = %s")
         params.append(user_id)
-    query += " ORDER BY `date` DESC"
+    start, end = period_bounds(period)
+    if start is not None:
+        conditions.append("`date` >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("`date` < %s")
+        params.append(end)
+    query = (
+        "SELECT description, value, category, `type`, `date`, created_at "
+        "FROM transactions WHERE " + " AND ".join(conditions) +
+        " ORDER BY `date` DESC"
+    )
 
     try:
         results = execute_query(query, tuple(params))
         if not results:
-            return pd.DataFrame(columns=['description', 'value', 'category', 'type', 'date', 'created_at'])
-
-        df = pd.DataFrame(results, columns=['description', 'value', 'category', 'type', 'date', 'created_at', 'user_id'])
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['value'] = pd.to_numeric(df['value'], errors='coerce')
-        df = df.dropna(subset=['date'])
-
-        now = pd.Timestamp.now()
-        if period == 'current_month':
-            df = df[(df['date'].dt.year == now.year) & (df['date'].dt.month == now.month)]
-        elif period == 'last_3_months':
-            df = df[df['date'] >= now - pd.DateOffset(months=3)]
-        elif period == 'last_6_months':
-            df = df[df['date'] >= now - pd.DateOffset(months=6)]
-
-        return df[['description', 'value', 'category', 'type', 'date', 'created_at']]
-    except Exception as e:
-        print(f"Erro ao obter dados: {e}")
-        return pd.DataFrame(columns=['description', 'value', 'category', 'type', 'date', 'created_at'])
+            return pd.DataFrame(columns=TRANSACTION_COLUMNS)
+
+        # O driver já devolve float/datetime; o DataFrame herda os tipos sem passes de coerção
+        return pd.DataFrame.from_records(results, columns=TRANSACTION_COLUMNS)
+    except Exception:
+        log.exception("Erro ao obter dados", extra={"user_id": user_id, "period": period})
+        return pd.DataFrame(columns=TRANSACTION_COLUMNS)
+
+def serialize_transactions(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Converte as transações para dicionários com conversões vetorizadas por coluna.
+
+    Comparação com o caminho antigo (iterrows): python instance/bench_serialization.py
+    """
+    if df.empty:
+        return []
+    # Mesmo formato de Timestamp.isoformat(): microssegundos só quando diferentes de zero
+    dates = pd.Series(np.datetime_as_string(df['date'].values, unit='us'), index=df.index).str.removesuffix('.000000')
+    out = pd.DataFrame({
+        "description": df['description'].astype(str),
+        "value": df['value'].astype(float),
+        "category": df['category'].astype(str),
+        "type": df['type'].astype(str),
+        "date": dates.astype(object).where(df['date'].notna(), None),
+    })
+    return out.to_dict('records')
+
+class FinancialSummary:
+    """Agregados do período calculados uma única vez por requisição.
+
+    Um único groupby por (tipo, categoria, mês) alimenta os totais por tipo, os
+    totais por categoria e a série mensal de despesas usados pelo relatório,
+    pelos insights e pelas recomendações.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.num_transactions = len(df)
+        self.empty = df.empty
+        if df.empty:
+            grouped = pd.Series(dtype=float)
+        else:
+            months = df['date'].dt.to_period('M')
+            grouped = df.groupby([df['type'], df['category'], months])['value'].sum()
+
+        by_type = grouped.groupby(level=0).sum() if not grouped.empty else pd.Series(dtype=float)
+        self.receitas = float(by_type.get('Receita', 0.0))
+        self.despesas = float(by_type.get('Despesa', 0.0))
+        self.saldo = self.receitas - self.despesas
 
-def generate_insights(df: pd.DataFrame) -> List[str]:
+        self.despesas_categoria = self._by_category(grouped, 'Despesa')
+        self.receitas_categoria = self._by_category(grouped, 'Receita')
+
+        if not grouped.empty and 'Despesa' in grouped.index.get_level_values(0):
+            gastos = grouped.xs('Despesa', level=0).groupby(level=1).sum()
+            gastos.index = gastos.index.astype(str)
+            self.gastos_mensais = gastos
+        else:
+            self.gastos_mensais = pd.Series(dtype=float)
+
+    @staticmethod
+    def _by_category(grouped: pd.Series, tipo: str) -> pd.Series:
+        if grouped.empty or tipo not in grouped.index.get_level_values(0):
+            return pd.Series(dtype=float)
+        return grouped.xs(tipo, level=0).groupby(level=0).sum()
+
+def generate_insights(summary: FinancialSummary) -> List[str]:
     """Gera insights baseados nos dados"""
+    if isinstance(summary, pd.DataFrame):
+        summary = FinancialSummary(summary)
     insights = []
     
-    if df.empty:
+    if summary.empty:
         insights.append("Nenhuma transação encontrada no período selecionado.")
         return insights
     
     # Análise de receitas vs despesas
-    receitas = df[df['type'] == 'Receita']['value'].sum()
-    despesas = df[df['type'] == 'Despesa']['value'].sum()
-    saldo = receitas - despesas
+    receitas = summary.receitas
+    despesas = summary.despesas
+    saldo = summary.saldo
     
     insights.append(f"Receitas totais: R$ {receitas:,.2f}")
     insights.append(f"Despesas totais: R$ {despesas:,.2f}")
@@ -149,8 +285,8 @@ def generate_insights(df: pd.DataFrame) -> List[str]:
         insights.append("⚠️ Saldo negativo - considere reduzir despesas ou aumentar receitas.")
     
     # Análise de categorias
-    if not df[df['type'] == 'Despesa'].empty:
-        despesas_categoria = df[df['type'] == 'Despesa'].groupby('category')['value'].sum()
+    despesas_categoria = summary.despesas_categoria
+    if not despesas_categoria.empty:
         maior_categoria = despesas_categoria.idxmax()
         maior_valor = despesas_categoria.max()
         
@@ -163,35 +299,28 @@ def generate_insights(df: pd.DataFrame) -> List[str]:
             insights.append(f"⚠️ Categorias com gastos acima da média: {', '.join(categorias_altas.index)}")
     
     # Análise temporal
-    if len(df) > 1 and 'date' in df.columns and df['date'].dtype.name.startswith('datetime'):
-        try:
-            df_copy = df.copy()
-            df_copy["month"] = df_copy["date"].dt.to_period("M").astype(str)
-            gastos_mensais = df_copy[df_copy['type'] == 'Despesa'].groupby('month')['value'].sum()
-            
-            if len(gastos_mensais) > 1:
-                tendencia = gastos_mensais.iloc[-1] - gastos_mensais.iloc[-2]
-                if tendencia > 0:
-                    insights.append("📈 Tendência de aumento nos gastos mensais")
-                else:
-                    insights.append("📉 Tendência de redução nos gastos mensais")
-        except Exception as e:
-            print(f"Erro na análise temporal: {e}")
-            pass
+    gastos_mensais = summary.gastos_mensais
+    if summary.num_transactions > 1 and len(gastos_mensais) > 1:
+        tendencia = gastos_mensais.iloc[-1] - gastos_mensais.iloc[-2]
+        if tendencia > 0:
+            insights.append("📈 Tendência de aumento nos gastos mensais")
+        else:
+            insights.append("📉 Tendência de redução nos gastos mensais")
     
     return insights
 
-def generate_recommendations(df: pd.DataFrame) -> List[str]:
+def generate_recommendations(summary: FinancialSummary) -> List[str]:
     """Gera recomendações baseadas nos dados"""
+    if isinstance(summary, pd.DataFrame):
+        summary = FinancialSummary(summary)
     recommendations = []
     
-    if df.empty:
+    if summary.empty:
         recommendations.append("Comece registrando suas primeiras transações para obter insights personalizados.")
         return recommendations
     
-    receitas = df[df['type'] == 'Receita']['value'].sum()
-    despesas = df[df['type'] == 'Despesa']['value'].sum()
-    saldo = receitas - despesas
+    receitas = summary.receitas
+    saldo = summary.saldo
     
     # Recomendações baseadas no saldo
     if saldo < 0:
@@ -200,8 +329,8 @@ def generate_recommendations(df: pd.DataFrame) -> List[str]:
         recommendations.append("💡 Procure formas de aumentar suas receitas (freelance, investimentos)")
     
     # Recomendações baseadas em categorias
-    if not df[df['type'] == 'Despesa'].empty:
-        despesas_categoria = df[df['type'] == 'Despesa'].groupby('category')['value'].sum()
+    despesas_categoria = summary.despesas_categoria
+    if not despesas_categoria.empty:
         maior_categoria = despesas_categoria.idxmax()
         
         if maior_categoria in ['Lazer', 'Alimentação']:
@@ -217,6 +346,58 @@ def generate_recommendations(df: pd.DataFrame) -> List[str]:
     
     return recommendations
 
+# Feed de alterações /api/events (SSE). Servido aqui, no event loop do uvicorn, e não pelos workers
+# gthread do Flask: cada conexão ociosa custa uma tarefa asyncio, não uma thread. Com EVENTS_BROKER_URL
+# redis://... recebe as mensagens do app Flask; senão lê data_versions a cada EVENTS_POLL_SECONDS.
+EVENTS_HEARTBEAT_SECONDS = int(os.getenv("EVENTS_HEARTBEAT_SECONDS", "25"))
+
+def load_data_versions(user_ids: List[int]) -> Dict[int, int]:
+    """Versão dos dados de cada usuário (tabela data_versions mantida pelo app Flask)"""
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    rows = execute_query(f"SELECT user_id, version FROM data_versions WHERE user_id IN ({placeholders})",
+                         tuple(user_ids))
+    return {int(user_id): int(version) for user_id, version in rows}
+
+_events_broker_url = os.getenv("EVENTS_BROKER_URL", "memory://")
+event_hub = AsyncEventHub(
+    load_data_versions,
+    DATA_KINDS,
+    broker=None if _events_broker_url.startswith("memory://") else create_broker(_events_broker_url),
+    poll_interval=float(os.getenv("EVENTS_POLL_SECONDS", "2")),
+)
+
+@app.get("/api/events")
+async def data_events(user_id: int = Depends(session_user_id)):
+    """Stream SSE com as alterações de transações, metas e orçamentos do usuário (mesmo formato do app Flask)"""
+    subscriber, version = await event_hub.subscribe(user_id)
+
+    async def generate():
+        try:
+            yield f"retry: 5000\nevent: ready\ndata: {json.dumps({'version': version})}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), timeout=EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                # Junta as alterações acumuladas em um único evento
+                kinds = set(message["kinds"])
+                while not subscriber.empty():
+                    kinds.update(subscriber.get_nowait()["kinds"])
+                yield f"event: change\ndata: {json.dumps({'kinds': sorted(kinds)})}\n\n"
+        finally:
+            event_hub.unsubscribe(user_id, subscriber)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: não bufferizar o stream
+    })
+
+@app.get("/api/events/stats")
+async def event_stats(user_id: int = Depends(session_user_id)):
+    """Conexões do feed de alterações deste processo"""
+    return event_hub.stats()
+
 @app.get("/")
 async def root():
     """Endpoint raiz do MCP"""
@@ -226,109 +407,112 @@ async def root():
         "endpoints": {
             "/reports/generate": "Gerar relatórios financeiros",
             "/ai/analyze": "Análise inteligente com IA",
-            "/ai/chat": "Chat com agente IA"
+            "/ai/chat": "Chat com agente IA",
+            "/api/events": "Feed de alterações dos dados (SSE)"
         }
     }
 
 @app.post("/reports/generate", response_model=ReportResponse)
-async def generate_report(request: ReportRequest):
+async def generate_report(request: ReportRequest, user_id: int = Depends(session_user_id)):
     """Gera relatório financeiro com insights"""
+    # O usuário vem sempre da sessão, nunca do corpo da requisição
+    request.user_id = user_id
     try:
-        # Obter dados
-        df = get_transactions_data(request.period, request.user_id)
-        # Logs de diagnóstico
-        print("[MCP] /reports/generate",
-              "user_id=", request.user_id,
-              "period=", request.period,
-              "rows=", 0 if df is None else len(df))
-        if df is not None and not df.empty:
+        # Mesmo pedido com a mesma versão dos dados: servir o snapshot gravado
+        snapshot_key = None
+        if request.user_id is not None:
             try:
-                print("[MCP] first_rows:", df[['description','value','category','type','date']].head(3).to_dict('records'))
-            except Exception:
-                pass
+                data_version = await run_in_threadpool(report_snapshots.data_version, request.user_id)
+                snapshot_key = (request.user_id, request.period, request.report_type, data_version)
+                variant = params_variant({
+                    "categories": sorted(request.categories) if request.categories else None,
+                    "insights": request.insights,
+                    "transactions_limit": request.transactions_limit,
+                    "transactions_offset": request.transactions_offset,
+                })
+                snapshot = await run_in_threadpool(report_snapshots.get, *snapshot_key, variant)
+                if snapshot is not None:
+                    return ReportResponse(**snapshot)
+            except Exception as e:
+                log.warning("Snapshot indisponível", extra={"user_id": request.user_id, "error": str(e)})
+                snapshot_key = None
+        
+        # Obter dados
+        df = await get_transactions_data_async(request.period, request.user_id)
+        # Só contagens: linhas de transações são dados do usuário
+        reports_log.debug("/reports/generate", extra={
+            "user_id": request.user_id,
+            "period": request.period,
+            "rows": 0 if df is None else len(df),
+        })
         
         # Filtrar por categorias se especificado
         if request.categories:
             df = df[df['category'].isin(request.categories)]
         
-        # Calcular métricas básicas
-        receitas = df[df['type'] == 'Receita']['value'].sum()
-        despesas = df[df['type'] == 'Despesa']['value'].sum()
-        saldo = receitas - despesas
+        # Agregados do período, compartilhados por relatório, insights e recomendações
+        summary = FinancialSummary(df)
         
-        # Dados por categoria
-        if not df.empty:
-            despesas_categoria = df[df['type'] == 'Despesa'].groupby('category')['value'].sum().to_dict()
-            receitas_categoria = df[df['type'] == 'Receita'].groupby('category')['value'].sum().to_dict()
-        else:
-            despesas_categoria = {}
-            receitas_categoria = {}
-        
-        # Dados temporais
-        if not df.empty and 'date' in df.columns:
-            try:
-                df_copy = df.copy()
-                df_copy['date'] = pd.to_datetime(df_copy['date'], errors='coerce')
-                df_copy["month"] = df_copy["date"].dt.to_period("M").astype(str)
-                gastos_mensais = df_copy[df_copy['type'] == 'Despesa'].groupby('month')['value'].sum().to_dict()
-            except Exception as e:
-                print(f"Erro ao processar dados temporais: {e}")
-                gastos_mensais = {}
+        # Converter só a página pedida do DataFrame para a tabela
+        offset = max(request.transactions_offset, 0)
+        if request.transactions_limit is None:
+            page_df = df.iloc[offset:]
         else:
-            gastos_mensais = {}
-        
-        # Converter DataFrame para lista de dicionários para a tabela
-        transactions_list = []
-        if not df.empty:
-            for _, row in df.iterrows():
-                transactions_list.append({
-                    "description": str(row['description']),
-                    "value": float(row['value']),
-                    "category": str(row['category']),
-                    "type": str(row['type']),
-                    "date": row['date'].isoformat() if pd.notna(row['date']) else None
-                })
+            page_df = df.iloc[offset:offset + max(request.transactions_limit, 0)]
+        transactions_list = serialize_transactions(page_df)
         
         # Estruturar dados do relatório
         report_data = {
             "period": request.period,
             "summary": {
-                "total_receitas": float(receitas),
-                "total_despesas": float(despesas),
-                "saldo": float(saldo),
-                "num_transactions": len(df)
+                "total_receitas": summary.receitas,
+                "total_despesas": summary.despesas,
+                "saldo": summary.saldo,
+                "num_transactions": summary.num_transactions
             },
             "by_category": {
-                "despesas": despesas_categoria,
-                "receitas": receitas_categoria
+                "despesas": summary.despesas_categoria.to_dict(),
+                "receitas": summary.receitas_categoria.to_dict()
             },
             "temporal": {
-                "gastos_mensais": gastos_mensais
+                "gastos_mensais": summary.gastos_mensais.to_dict()
             },
             "transactions": transactions_list
         }
         
         # Gerar insights e recomendações
-        insights = generate_insights(df) if request.insights else []
-        recommendations = generate_recommendations(df)
+        insights = generate_insights(summary) if request.insights else []
+        recommendations = generate_recommendations(summary)
         
-        return ReportResponse(
+        report = ReportResponse(
             report_type=request.report_type,
             data=report_data,
             insights=insights,
             recommendations=recommendations,
             generated_at=datetime.now().isoformat()
         )
+        if snapshot_key is not None:
+            try:
+                await run_in_threadpool(report_snapshots.put, *snapshot_key, report.model_dump(mode="json"), variant)
+            except Exception as e:
+                log.warning("Falha ao gravar snapshot", extra={"user_id": request.user_id, "error": str(e)})
+        return report
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar relatório: {str(e)}")
 
+@app.get("/reports/snapshots/stats")
+async def report_snapshot_stats(user_id: int = Depends(session_user_id)):
+    """Reaproveitamento dos snapshots de relatórios do MCP"""
+    return await run_in_threadpool(report_snapshots.stats)
+
 @app.post("/ai/analyze", response_model=AIAgentResponse)
-async def analyze_with_ai(request: AIAgentRequest):
+async def analyze_with_ai(request: AIAgentRequest, user_id: int = Depends(session_user_id)):
     """Análise inteligente com IA"""
+    request.user_id = user_id
     try:
         # Obter dados recentes para contexto
-        df = get_transactions_data("current_month", request.user_id)
+        df = await get_transactions_data_async("current_month", request.user_id)
 
         # Sem dados -> orientar cadastro
         if df.empty:
@@ -426,8 +610,8 @@ async def analyze_with_ai(request: AIAgentRequest):
         
         elif "meta" in query_lower or "objetivo" in query_lower:
             # Verificar metas no banco
-            goals_query = "SELECT title, target, current FROM goals"
-            goals = execute_query(goals_query)
+            goals_query = "SELECT title, target, current FROM goals WHERE user_id = %s"
+            goals = await execute_query_async(goals_query, (request.user_id,))
             
             if goals:
                 response = "🎯 **Suas Metas Financeiras:**\n\n"
@@ -508,11 +692,12 @@ async def analyze_with_ai(request: AIAgentRequest):
         raise HTTPException(status_code=500, detail=f"Erro na análise: {str(e)}")
 
 @app.post("/ai/chat", response_model=AIAgentResponse)
-async def chat_with_ai(request: AIAgentRequest):
+async def chat_with_ai(request: AIAgentRequest, user_id: int = Depends(session_user_id)):
     """Chat interativo com agente IA"""
+    request.user_id = user_id
     try:
         # Obter dados recentes para contexto
-        df = get_transactions_data("current_month", request.user_id)
+        df = await get_transactions_data_async("current_month", request.user_id)
 
         # Sem dados -> resposta conversacional amigável
         if df.empty:
@@ -576,7 +761,7 @@ async def chat_with_ai(request: AIAgentRequest):
             # Gerar relatório completo
             try:
                 # Obter dados diretamente
-                df = get_transactions_data("all")
+                df = await get_transactions_data_async("all", request.user_id)
                 
                 # Calcular métricas
                 receitas = df[df['type'] == 'Receita']['value'].sum()
@@ -605,9 +790,9 @@ async def chat_with_ai(request: AIAgentRequest):
                 
                 confidence = 0.95
                 
-            except Exception as e:
+            except Exception:
                 response = "Desculpe, ocorreu um erro ao gerar o relatório. Tente novamente."
-                print(f"Erro ao gerar relatório: {e}")
+                log.exception("Erro ao gerar relatório no chat", extra={"user_id": request.user_id})
                 
         elif any(word in query_lower for word in ["ajuda", "help", "o que", "posso"]):
             response = """🤖 **Olá! Sou seu Assistente Financeiro IA**
@@ -0,0 +1,86 @@
+"""
+Roteador de intenções do assistente (/api/ai/analyze).
+
+Cada intenção registra um handler e as frases que a disparam. As frases de
+todas as intenções são compiladas em uma única expressão regular; `match`
+percorre a pergunta uma vez e escolhe a intenção da frase mais longa
+encontrada (a mais específica), desempatando pela ordem de registro.
+"""
+
+import re
+
+
+def _trie_regex(phrases) -> str:
+    """Expressão equivalente a `frase1|frase2|...`, fatorada por prefixos comuns.
+
+    Em cada posição o motor de regex testa só o ramo do próximo caractere, em
+    vez de todas as frases; o opcional guloso prefere a frase mais longa.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class IntentRouter:
+    """Registro de intenções com casamento por expressão regular compilada."""
+
+    def __init__(self):
+        self._handlers = {}  # nome -> handler
+        self._order = {}  # nome -> ordem de registro (desempate)
+        self._phrases = {}  # frase -> nome da intenção
+        self._pattern = None
+
+    def intent(self, name: str, phrases):
+        """Decorador: registra `handler` para a intenção `name` disparada por `phrases`."""
+        def decorator(handler):
+            if name in self._handlers:
+                raise ValueError(f"Intenção já registrada: {name}")
+            self._handlers[name] = handler
+            self._order[name] = len(self._order)
+            for phrase in phrases:
+                phrase = phrase.lower()
+                if phrase in self._phrases:
+                    raise ValueError(f"Frase '{phrase}' já pertence à intenção {self._phrases[phrase]}")
+                self._phrases[phrase] = name
+            self._pattern = None
+            return handler
+        return decorator
+
+    def compile(self) -> None:
+        """Monta a expressão única com todas as frases registradas."""
+        # Lookahead: testa todas as posições, inclusive frases sobrepostas
+        self._pattern = re.compile('(?=(' + _trie_regex(self._phrases) + '))')
+
+    def match(self, query: str) -> str | None:
+        """Nome da intenção com melhor pontuação para a pergunta (já em minúsculas) ou None."""
+        if self._pattern is None:
+            self.compile()
+        best = None
+        best_score = None
+        for found in self._pattern.finditer(query):
+            name = self._phrases[found.group(1)]
+            score = (len(found.group(1)), -self._order[name])
+            if best_score is None or score > best_score:
+                best, best_score = name, score
+        return best
+
+    def handler(self, name: str):
+        return self._handlers[name]
+
+    @property
+    def intents(self) -> list:
+        return list(self._handlers)
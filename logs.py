@@ -0,0 +1,150 @@
+"""
+Logs estruturados do FinanMaster (app Flask e servidor MCP).
+
+`setup_logging` instala no logger raiz um QueueHandler: a requisição só
+enfileira o registro, e uma thread (QueueListener) formata e escreve em
+stderr. Configuração por variáveis de ambiente:
+
+- LOG_LEVEL: nível padrão (INFO).
+- LOG_LEVELS: níveis por logger, ex.: `finanmaster.app.transactions=DEBUG,sqlalchemy.engine=WARNING`.
+- LOG_FORMAT: `json` (padrão, uma linha por registro) ou `text`.
+- LOG_SAMPLE: fração mantida de eventos frequentes por logger, ex.:
+  `finanmaster.app.transactions=0.05`. WARNING ou acima nunca é descartado.
+
+Campos extras vão no `extra=` da chamada: `log.info('...', extra={'user_id': 1})`.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# Atributos padrão de LogRecord: o que não estiver aqui é campo extra
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_state = {}
+
+
+def parse_mapping(raw: str | None) -> dict:
+    """'a=1,b=2' -> {'a': '1', 'b': '2'}."""
+    mapping = {}
+    for item in (raw or '').split(','):
+        key, _, value = item.partition('=')
+        if key.strip() and value.strip():
+            mapping[key.strip()] = value.strip()
+    return mapping
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, service, logger, msg, campos extras e exc."""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'service': self.service,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, service: str):
+        super().__init__(f'%(asctime)s %(levelname)s [{service}] %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        extras = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith('_')}
+        return f"{text} {extras}" if extras else text
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém só uma fração dos registros abaixo de WARNING dos loggers configurados."""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        # Prefixos mais longos primeiro: `a.b` vale antes de `a`
+        self.rates = sorted(((name, float(rate)) for name, rate in rates.items()), key=lambda r: -len(r[0]))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(name + '.'):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enfileira o registro com a mensagem pronta, mas sem formatar: o formatador roda na thread de saída."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_listener() -> None:
+    log_queue = queue.SimpleQueue()
+    _state['handler'].queue = log_queue
+    _state['listener'] = logging.handlers.QueueListener(log_queue, _state['output'], respect_handler_level=True)
+    _state['listener'].start()
+
+
+def _stop_listener() -> None:
+    listener = _state.get('listener')
+    if listener is not None:
+        listener.stop()
+        _state['listener'] = None
+
+
+def stop_logging() -> None:
+    """Escreve os registros ainda na fila e para a thread de saída (ex.: antes de os._exit)."""
+    _stop_listener()
+    if _state:
+        _state['output'].flush()
+
+
+def setup_logging(service: str) -> None:
+    """Configura o logger raiz do processo (uma vez; chamadas seguintes não fazem nada)."""
+    if _state:
+        return
+    formatter_class = TextFormatter if os.getenv('LOG_FORMAT', 'json').lower() == 'text' else JsonFormatter
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(formatter_class(service))
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    sample = parse_mapping(os.getenv('LOG_SAMPLE'))
+    if sample:
+        # Amostragem antes de enfileirar: descartados não custam nada além do filtro
+        handler.addFilter(SamplingFilter(sample))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in parse_mapping(os.getenv('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _state.update(handler=handler, output=output)
+    _start_listener()
+    atexit.register(_stop_listener)
+    # A thread de saída não sobrevive a fork (workers do gunicorn com preload): recria no filho
+    os.register_at_fork(after_in_child=_start_listener)
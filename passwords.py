@@ -0,0 +1,244 @@
+"""
+Hash de senhas do FinanMaster.
+
+- ScryptHasher (padrão): scrypt no formato do werkzeug (`scrypt:n:r:p$salt$hash`).
+- Argon2Hasher: argon2id. Requer o pacote opcional `argon2-cffi`.
+- Pbkdf2Hasher: o padrão antigo do werkzeug (`pbkdf2:sha256:iterações$...`).
+
+Qualquer hasher verifica hashes dos outros formatos, então trocar de algoritmo
+ou de parâmetros não invalida senhas: `needs_rehash` indica quando o hash
+gravado é mais fraco que o configurado e o login grava um novo.
+
+Os parâmetros podem ser fixados (PASSWORD_HASH_PARAMS) ou calibrados na
+inicialização: `calibrate` mede o custo de cada candidato e escolhe o mais
+forte dentro do tempo alvo. PasswordService pode executar hash e verificação
+num pool de processos limitado, para não ocupar as threads de requisição.
+"""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def _argon2():
+    try:
+        import argon2
+    except ImportError as e:
+        raise RuntimeError("Hasher argon2 requer o pacote 'argon2-cffi' (pip install argon2-cffi).") from e
+    return argon2
+
+
+def _verify_any(stored: str, password: str) -> bool:
+    """Verifica `password` contra um hash de qualquer formato suportado."""
+    if stored.startswith('$argon2'):
+        argon2 = _argon2()
+        try:
+            return argon2.PasswordHasher().verify(stored, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            return False
+    return check_password_hash(stored, password)
+
+
+def _werkzeug_cost(stored: str) -> tuple[str, int] | None:
+    """(algoritmo, custo) de um hash do werkzeug; None se não for desse formato."""
+    method = stored.split('$', 1)[0]
+    parts = method.split(':')
+    try:
+        if parts[0] == 'scrypt':
+            n, r, p = (int(x) for x in parts[1:4])
+            return 'scrypt', n * r * p
+        if parts[0] == 'pbkdf2':
+            return 'pbkdf2', int(parts[2])
+    except (ValueError, IndexError):
+        return None
+    return None
+
+
+class ScryptHasher:
+    name = 'scrypt'
+
+    def __init__(self, n: int = 32768, r: int = 8, p: int = 1):
+        self.n, self.r, self.p = n, r, p
+
+    @property
+    def params(self) -> dict:
+        return {'n': self.n, 'r': self.r, 'p': self.p}
+
+    def hash(self, password: str) -> str:
+        return generate_password_hash(password, method=f'scrypt:{self.n}:{self.r}:{self.p}', salt_length=16)
+
+    def verify(self, stored: str, password: str) -> bool:
+        return _verify_any(stored, password)
+
+    def needs_rehash(self, stored: str) -> bool:
+        cost = _werkzeug_cost(stored)
+        # Só refaz se o gravado for mais fraco: workers calibrados diferente não alternam hashes
+        return cost is None or cost[0] != 'scrypt' or cost[1] < self.n * self.r * self.p
+
+
+class Pbkdf2Hasher:
+    name = 'pbkdf2'
+
+    def __init__(self, iterations: int = 600000):
+        self.iterations = iterations
+
+    @property
+    def params(self) -> dict:
+        return {'iterations': self.iterations}
+
+    def hash(self, password: str) -> str:
+        return generate_password_hash(password, method=f'pbkdf2:sha256:{self.iterations}', salt_length=16)
+
+    def verify(self, stored: str, password: str) -> bool:
+        return _verify_any(stored, password)
+
+    def needs_rehash(self, stored: str) -> bool:
+        cost = _werkzeug_cost(stored)
+        return cost is None or cost[0] != 'pbkdf2' or cost[1] < self.iterations
+
+
+class Argon2Hasher:
+    name = 'argon2'
+
+    def __init__(self, t: int = 3, m: int = 65536, p: int = 4):
+        _argon2()
+        self.t, self.m, self.p = t, m, p
+
+    @property
+    def params(self) -> dict:
+        return {'t': self.t, 'm': self.m, 'p': self.p}
+
+    def hash(self, password: str) -> str:
+        argon2 = _argon2()
+        hasher = argon2.PasswordHasher(time_cost=self.t, memory_cost=self.m, parallelism=self.p,
+                                       type=argon2.Type.ID)
+        return hasher.hash(password)
+
+    def verify(self, stored: str, password: str) -> bool:
+        return _verify_any(stored, password)
+
+    def needs_rehash(self, stored: str) -> bool:
+        if not stored.startswith('$argon2id$'):
+            return True
+        try:
+            params = dict(item.split('=') for item in stored.split('$')[3].split(','))
+            return int(params['m']) * int(params['t']) < self.m * self.t
+        except (ValueError, KeyError, IndexError):
+            return True
+
+
+HASHERS = {
+    'scrypt': ScryptHasher,
+    'argon2': Argon2Hasher,
+    'pbkdf2': Pbkdf2Hasher,
+}
+
+# Candidatos da calibração, do mais barato ao mais caro. O primeiro (piso) é o padrão de cada
+# hasher: num servidor lento a calibração não escolhe custo menor que o dos hashes já gravados
+CALIBRATION_CANDIDATES = {
+    'scrypt': [{'n': 2 ** k, 'r': 8, 'p': 1} for k in range(15, 18)],
+    'argon2': [{'t': t, 'm': 65536, 'p': 4} for t in range(3, 9)],
+    'pbkdf2': [{'iterations': 600000 * k} for k in (1, 2, 3, 4)],
+}
+
+
+def parse_params(raw: str | None) -> dict:
+    """'n=32768,r=8,p=1' -> {'n': 32768, 'r': 8, 'p': 1}."""
+    if not raw:
+        return {}
+    params = {}
+    for item in raw.split(','):
+        key, _, value = item.partition('=')
+        params[key.strip()] = int(value)
+    return params
+
+
+def calibrate(name: str, target_ms: float) -> tuple[dict, list]:
+    """Escolhe os parâmetros mais fortes de `name` cujo hash leva até `target_ms`.
+
+    Devolve (parâmetros escolhidos, [(parâmetros, ms medidos), ...]). O primeiro
+    candidato é o piso e é usado mesmo se passar do alvo.
+    """
+    chosen = CALIBRATION_CANDIDATES[name][0]
+    timings = []
+    for params in CALIBRATION_CANDIDATES[name]:
+        hasher = HASHERS[name](**params)
+        start = time.perf_counter()
+        hasher.hash('calibration-password')
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        timings.append((params, round(elapsed_ms, 1)))
+        if elapsed_ms > target_ms and params is not chosen:
+            break
+        chosen = params
+    return chosen, timings
+
+
+def create_hasher(name: str, params: dict | None = None, target_ms: float = 150):
+    """Cria o hasher `name` com `params` ou, sem eles, com os parâmetros calibrados."""
+    if name not in HASHERS:
+        raise ValueError(f"Hasher de senha não suportado: {name}")
+    if not params:
+        params, _ = calibrate(name, target_ms)
+    return HASHERS[name](**params)
+
+
+def _pool_hash(hasher, password: str) -> str:
+    return hasher.hash(password)
+
+
+def _pool_verify(hasher, stored: str, password: str) -> bool:
+    return hasher.verify(stored, password)
+
+
+class PasswordService:
+    """Hash/verificação com o hasher configurado, opcionalmente num pool de processos.
+
+    O hasher é criado (e calibrado, se preciso) no primeiro uso. Com workers > 0,
+    no máximo `max_pending` operações ficam em andamento; as demais esperam aqui,
+    limitando a CPU gasta com senhas sem bloquear o resto do servidor.
+    """
+
+    def __init__(self, name: str = 'scrypt', params: dict | None = None, target_ms: float = 150,
+                 workers: int = 0, max_pending: int | None = None):
+        self.name = name
+        self._params = params
+        self.target_ms = target_ms
+        self.workers = workers
+        self._hasher = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending or max(workers, 1) * 4)
+
+    @property
+    def hasher(self):
+        if self._hasher is None:
+            with self._lock:
+                if self._hasher is None:
+                    self._hasher = create_hasher(self.name, self._params, self.target_ms)
+        return self._hasher
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        with self._lock:
+            if self._pool is None:
+                # forkserver/spawn: não herdar threads e conexões do servidor
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        with self._slots:
+            return self._pool.submit(fn, *args).result()
+
+    def hash(self, password: str) -> str:
+        return self._run(_pool_hash, self.hasher, password)
+
+    def verify(self, stored: str | None, password: str) -> bool:
+        if not stored:
+            return False
+        return self._run(_pool_verify, self.hasher, stored, password)
+
+    def needs_rehash(self, stored: str) -> bool:
+        return self.hasher.needs_rehash(stored)
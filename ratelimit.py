@@ -0,0 +1,169 @@
+"""
+Limite de tentativas de login do FinanMaster (janela deslizante com bloqueio).
+
+Cada dimensão (ex.: `ip`, `email`) tem seu próprio máximo de tentativas
+dentro de `window_seconds`. Ao atingir o máximo a chave fica bloqueada por
+`lockout_seconds`; enquanto isso as tentativas são recusadas sem consultar o
+banco nem calcular hash.
+
+- SlidingWindowLimiter: em memória do processo, com limite de chaves (LRU).
+- RedisSlidingWindowLimiter: contadores num servidor compatível com Redis,
+  compartilhados entre workers. Requer o pacote opcional `redis`.
+"""
+
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+
+class SlidingWindowLimiter:
+    """Janela deslizante por chave, em memória."""
+
+    name = 'memory'
+
+    def __init__(self, limits: dict, window_seconds: int = 900, lockout_seconds: int = 900,
+                 max_keys: int = 100000):
+        self.limits = limits  # dimensão -> máximo de tentativas na janela
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.max_keys = max_keys
+        self._attempts = OrderedDict()  # "dimensão:valor" -> deque de instantes
+        self._locked_until = {}  # "dimensão:valor" -> instante de desbloqueio
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.lockouts = 0
+
+    def _keys(self, values: dict):
+        return [(dimension, f"{dimension}:{value}") for dimension, value in values.items()
+                if value and dimension in self.limits]
+
+    def retry_after(self, **values) -> int:
+        """Segundos até a próxima tentativa ser aceita (0 = liberada) para as chaves dadas."""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for _, key in self._keys(values):
+                until = self._locked_until.get(key)
+                if until is None:
+                    continue
+                if until <= now:
+                    del self._locked_until[key]
+                else:
+                    wait = max(wait, until - now)
+            if wait:
+                self.rejected += 1
+        return math.ceil(wait)
+
+    def hit(self, **values) -> None:
+        """Registra uma tentativa (falha) para as chaves; bloqueia as que atingirem o limite."""
+        now = time.monotonic()
+        with self._lock:
+            for dimension, key in self._keys(values):
+                attempts = self._attempts.get(key)
+                if attempts is None:
+                    attempts = self._attempts[key] = deque()
+                self._attempts.move_to_end(key)
+                while attempts and attempts[0] <= now - self.window_seconds:
+                    attempts.popleft()
+                attempts.append(now)
+                if len(attempts) >= self.limits[dimension]:
+                    self._locked_until[key] = now + self.lockout_seconds
+                    attempts.clear()
+                    self.lockouts += 1
+            while len(self._attempts) > self.max_keys:
+                self._attempts.popitem(last=False)
+            if len(self._locked_until) > self.max_keys:
+                self._locked_until = {k: until for k, until in self._locked_until.items() if until > now}
+
+    def reset(self, **values) -> None:
+        """Esquece as tentativas das chaves (ex.: e-mail após login bem-sucedido)."""
+        with self._lock:
+            for _, key in self._keys(values):
+                self._attempts.pop(key, None)
+                self._locked_until.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'backend': self.name,
+                'limits': self.limits,
+                'window_seconds': self.window_seconds,
+                'lockout_seconds': self.lockout_seconds,
+                'tracked_keys': len(self._attempts),
+                'locked_keys': len(self._locked_until),
+                'rejected': self.rejected,
+                'lockouts': self.lockouts,
+            }
+
+
+class RedisSlidingWindowLimiter(SlidingWindowLimiter):
+    """Janela deslizante em sorted sets do Redis; bloqueios como chaves com expiração."""
+
+    name = 'redis'
+
+    def __init__(self, url: str, limits: dict, window_seconds: int = 900, lockout_seconds: int = 900,
+                 prefix: str = 'finanmaster:login:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Limitador Redis requer o pacote 'redis' (pip install redis).") from e
+        super().__init__(limits, window_seconds=window_seconds, lockout_seconds=lockout_seconds)
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def retry_after(self, **values) -> int:
+        keys = self._keys(values)
+        if not keys:
+            return 0
+        pipe = self.client.pipeline(transaction=False)
+        for _, key in keys:
+            pipe.pttl(f"{self.prefix}lock:{key}")
+        wait_ms = max(max(ttl for ttl in pipe.execute()), 0)
+        if wait_ms:
+            with self._lock:
+                self.rejected += 1
+        return math.ceil(wait_ms / 1000)
+
+    def hit(self, **values) -> None:
+        now = time.time()
+        keys = self._keys(values)
+        pipe = self.client.pipeline()
+        for _, key in keys:
+            attempts_key = f"{self.prefix}attempts:{key}"
+            pipe.zremrangebyscore(attempts_key, 0, now - self.window_seconds)
+            pipe.zadd(attempts_key, {f"{now}:{uuid.uuid4().hex[:8]}": now})
+            pipe.zcard(attempts_key)
+            pipe.expire(attempts_key, self.window_seconds)
+        results = pipe.execute()
+        for index, (dimension, key) in enumerate(keys):
+            if results[index * 4 + 2] >= self.limits[dimension]:
+                self.client.set(f"{self.prefix}lock:{key}", 1, ex=self.lockout_seconds)
+                self.client.delete(f"{self.prefix}attempts:{key}")
+                with self._lock:
+                    self.lockouts += 1
+
+    def reset(self, **values) -> None:
+        keys = self._keys(values)
+        if keys:
+            self.client.delete(*[f"{self.prefix}{kind}:{key}" for _, key in keys for kind in ('attempts', 'lock')])
+
+    def stats(self) -> dict:
+        return {
+            'backend': self.name,
+            'limits': self.limits,
+            'window_seconds': self.window_seconds,
+            'lockout_seconds': self.lockout_seconds,
+            'rejected': self.rejected,
+            'lockouts': self.lockouts,
+        }
+
+
+def create_limiter(url: str, limits: dict, window_seconds: int = 900, lockout_seconds: int = 900):
+    """Cria o limitador a partir de uma URL: `memory://` (padrão) ou `redis://host:porta/db`."""
+    if not url or url.startswith('memory://'):
+        return SlidingWindowLimiter(limits, window_seconds=window_seconds, lockout_seconds=lockout_seconds)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSlidingWindowLimiter(url, limits, window_seconds=window_seconds, lockout_seconds=lockout_seconds)
+    raise ValueError(f"Limitador de login não suportado: {url}")
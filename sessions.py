@@ -0,0 +1,264 @@
+"""
+Sessões no servidor, compartilhadas pelo app Flask e pelo servidor MCP.
+
+O cookie guarda apenas um identificador aleatório; os dados da sessão
+(user_id, username...) ficam no armazenamento:
+
+- SQLiteSessionStore: arquivo SQLite local (padrão instance/sessions.db),
+  visível para todos os processos da máquina.
+- RedisSessionStore: servidor compatível com Redis, para várias máquinas.
+  Requer o pacote opcional `redis`.
+
+Leituras passam por um LRU em memória com TTL curto (`lookup_ttl`): um logout
+feito em outro processo vale aqui em até `lookup_ttl` segundos. Sessões
+expiradas são removidas por `sweep` (thread de `start_sweeper` ou CLI).
+"""
+
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from flask.sessions import SecureCookieSession, SessionInterface
+
+from cache import LRUCache
+
+log = logging.getLogger('finanmaster.sessions')
+
+DEFAULT_SESSION_DB = Path(__file__).resolve().parent / 'instance' / 'sessions.db'
+
+
+class SessionStore:
+    """Base: LRU de leituras, gravação com expiração e varredura periódica."""
+
+    name = 'base'
+
+    def __init__(self, lifetime_seconds: int = 7 * 24 * 3600, lookup_ttl: int = 30, max_entries: int = 4096):
+        self.lifetime_seconds = lifetime_seconds
+        self.lookup_ttl = lookup_ttl
+        self._lookups = LRUCache(max_entries=max_entries, default_ttl=lookup_ttl)
+        self._sweeper = None
+        self._sweep_interval = 0
+        self.swept = 0
+
+    # Implementadas pelos backends
+    def _load(self, sid: str) -> tuple[dict, float] | None:
+        raise NotImplementedError
+
+    def _store(self, sid: str, data: dict, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def _remove(self, sid: str) -> None:
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        return 0
+
+    def get(self, sid: str | None) -> tuple[dict, float] | None:
+        """(dados, expira_em) da sessão `sid`, ou None se não existe ou expirou."""
+        if not sid:
+            return None
+        entry = self._lookups.get(sid)
+        if entry is None:
+            entry = self._load(sid)
+            if entry is None:
+                return None
+            self._lookups.set(sid, entry)
+        if entry[1] <= time.time():
+            self._lookups.delete(sid)
+            return None
+        return entry
+
+    def user_id(self, sid: str | None) -> int | None:
+        entry = self.get(sid)
+        return entry[0].get('user_id') if entry else None
+
+    def save(self, sid: str, data: dict) -> float:
+        expires_at = time.time() + self.lifetime_seconds
+        self._store(sid, data, expires_at)
+        self._lookups.set(sid, (dict(data), expires_at))
+        return expires_at
+
+    def delete(self, sid: str) -> None:
+        self._remove(sid)
+        self._lookups.delete(sid)
+
+    def start_sweeper(self, interval: int = 300) -> None:
+        """Thread que remove sessões expiradas a cada `interval` segundos."""
+        self._sweep_interval = interval
+        if interval <= 0 or (self._sweeper is not None and self._sweeper.is_alive()):
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.swept += self.sweep()
+                except Exception as e:
+                    log.warning("Erro ao remover sessões expiradas", extra={'error': str(e)})
+
+        self._sweeper = threading.Thread(target=run, name='session-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def after_fork(self) -> None:
+        """No processo filho de um fork (workers do gunicorn com preload): a thread de varredura não sobrevive."""
+        self.start_sweeper(self._sweep_interval)
+
+    def stats(self) -> dict:
+        return {
+            'backend': self.name,
+            'lifetime_seconds': self.lifetime_seconds,
+            'lookup_cache': self._lookups.stats(),
+            'swept': self.swept,
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessões num arquivo SQLite (modo WAL), uma conexão por thread."""
+
+    name = 'sqlite'
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'sid TEXT PRIMARY KEY, data TEXT NOT NULL, user_id INTEGER, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self) -> None:
+        # Conexões SQLite não podem ser compartilhadas entre processos
+        self._local = threading.local()
+        super().after_fork()
+
+    def _load(self, sid: str):
+        row = self._conn().execute(
+            'SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _store(self, sid: str, data: dict, expires_at: float) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (sid, data, user_id, expires_at) VALUES (?, ?, ?, ?)',
+                (sid, json.dumps(data), data.get('user_id'), expires_at),
+            )
+
+    def _remove(self, sid: str) -> None:
+        with self._conn() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def sweep(self) -> int:
+        with self._conn() as conn:
+            return conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+
+class RedisSessionStore(SessionStore):
+    """Sessões em chaves do Redis com expiração; o próprio servidor descarta as vencidas."""
+
+    name = 'redis'
+
+    def __init__(self, url: str, prefix: str = 'finanmaster:session:', **kwargs):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Sessões no Redis requerem o pacote 'redis' (pip install redis).") from e
+        super().__init__(**kwargs)
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _load(self, sid: str):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self.prefix + sid)
+        pipe.pttl(self.prefix + sid)
+        value, ttl_ms = pipe.execute()
+        if value is None or ttl_ms <= 0:
+            return None
+        return json.loads(value), time.time() + ttl_ms / 1000
+
+    def _store(self, sid: str, data: dict, expires_at: float) -> None:
+        self.client.set(self.prefix + sid, json.dumps(data), ex=max(int(expires_at - time.time()), 1))
+
+    def _remove(self, sid: str) -> None:
+        self.client.delete(self.prefix + sid)
+
+
+def create_session_store(url: str | None, **kwargs) -> SessionStore:
+    """Cria o armazenamento a partir de uma URL: `sqlite:///caminho.db` (padrão) ou `redis://host:porta/db`."""
+    if not url:
+        return SQLiteSessionStore(DEFAULT_SESSION_DB, **kwargs)
+    if url.startswith('sqlite:///'):
+        return SQLiteSessionStore(url[len('sqlite:///'):], **kwargs)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSessionStore(url, **kwargs)
+    raise ValueError(f"Armazenamento de sessões não suportado: {url}")
+
+
+class ServerSideSession(SecureCookieSession):
+    def __init__(self, initial=None, sid: str | None = None, expires_at: float = 0.0):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.initial_user_id = (initial or {}).get('user_id')
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """`flask.session` guardada em um SessionStore; o cookie leva só o identificador."""
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        entry = self.store.get(sid)
+        if entry is None:
+            return ServerSideSession()
+        return ServerSideSession(entry[0], sid=sid, expires_at=entry[1])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        # Sessões renovadas só depois de meia vida, para não gravar a cada requisição
+        renew = session.expires_at - time.time() < self.store.lifetime_seconds / 2
+        if not session.modified and not renew:
+            return
+        if session.sid and session.get('user_id') != session.initial_user_id:
+            # Login/troca de usuário: novo identificador (evita fixação de sessão)
+            self.store.delete(session.sid)
+            session.sid = None
+        session.sid = session.sid or secrets.token_urlsafe(32)
+        session.expires_at = self.store.save(session.sid, dict(session))
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -0,0 +1,227 @@
+"""
+Snapshots de relatórios gerados, compartilhados pelo app Flask e pelo servidor MCP.
+
+Cada relatório calculado é gravado compactado (JSON + zlib) na tabela
+report_snapshots, chaveado por (origem, usuário, período, tipo, variante,
+versão dos dados, dia). Enquanto a versão dos dados do usuário não muda, o
+mesmo pedido é servido do snapshot sem recalcular. Snapshots de versões
+anteriores são apagados ao gravar um novo; os demais saem por idade e pelo
+orçamento total de bytes.
+
+Leituras não gravam no banco: os acertos (hits, last_used_at) são somados em
+memória e gravados em lote a cada `hits_flush_interval` segundos.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (BigInteger, Column, Date, DateTime, Integer, LargeBinary, MetaData, String, Table,
+                        UniqueConstraint, bindparam, delete, func, select, text, update)
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.exc import IntegrityError
+
+
+def define_snapshot_table(metadata: MetaData) -> Table:
+    """Declara report_snapshots em `metadata` (o do Flask-SQLAlchemy, para o create_all criá-la)."""
+    return Table(
+        'report_snapshots', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('source', String(10), nullable=False),  # flask ou mcp: formatos de relatório diferentes
+        Column('user_id', Integer, nullable=False),
+        Column('period', String(30), nullable=False),
+        Column('report_type', String(30), nullable=False),
+        Column('variant', String(16), nullable=False, default=''),  # hash dos demais parâmetros do pedido
+        Column('data_version', BigInteger, nullable=False),
+        Column('snapshot_date', Date, nullable=False),
+        Column('payload', LargeBinary().with_variant(LONGBLOB(), 'mysql'), nullable=False),
+        Column('size_bytes', Integer, nullable=False),
+        Column('hits', Integer, nullable=False, default=0),
+        Column('created_at', DateTime, nullable=False),
+        Column('last_used_at', DateTime, nullable=False),
+        UniqueConstraint('source', 'user_id', 'period', 'report_type', 'variant', 'data_version', 'snapshot_date',
+                         name='uq_report_snapshots_key'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8mb4',
+    )
+
+
+def params_variant(params: dict | None) -> str:
+    """Hash curto dos parâmetros extras que mudam o conteúdo do relatório ('' se nenhum)."""
+    if not params:
+        return ''
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class ReportSnapshotStore:
+    """Leitura, gravação e remoção de snapshots de relatórios de uma origem."""
+
+    def __init__(self, get_engine, table: Table, source: str, max_age_seconds: int = 7 * 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024, evict_interval: int = 60, hits_flush_interval: int = 30):
+        self._get_engine = get_engine  # função: o engine do Flask-SQLAlchemy só existe no contexto do app
+        self.table = table
+        self.source = source
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.evict_interval = evict_interval
+        self._last_eviction = 0.0
+        self.hits_flush_interval = hits_flush_interval
+        self._last_hits_flush = time.monotonic()
+        self._pending_hits = {}  # id -> [acertos ainda não gravados, último uso]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+
+    def _key(self, user_id: int, period: str, report_type: str, variant: str, data_version: int, day: date):
+        t = self.table
+        return (
+            t.c.source == self.source,
+            t.c.user_id == user_id,
+            t.c.period == period,
+            t.c.report_type == report_type,
+            t.c.variant == variant,
+            t.c.data_version == data_version,
+            t.c.snapshot_date == day,
+        )
+
+    def data_version(self, user_id: int) -> int:
+        """Versão dos dados do usuário (tabela data_versions mantida pelo app Flask)."""
+        with self._get_engine().connect() as conn:
+            version = conn.execute(
+                text('SELECT version FROM data_versions WHERE user_id = :user_id'), {'user_id': user_id}
+            ).scalar()
+        return version or 0
+
+    def get(self, user_id: int, period: str, report_type: str, data_version: int,
+            variant: str = '', day: date | None = None) -> dict | None:
+        day = day or date.today()
+        t = self.table
+        key = self._key(user_id, period, report_type, variant, data_version, day)
+        with self._get_engine().connect() as conn:
+            row = conn.execute(select(t.c.id, t.c.payload).where(*key)).first()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                pending = self._pending_hits.setdefault(row.id, [0, None])
+                pending[0] += 1
+                pending[1] = datetime.utcnow()
+        if row is None:
+            return None
+        self.maybe_flush_hits()
+        return json.loads(zlib.decompress(row.payload))
+
+    def maybe_flush_hits(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._last_hits_flush < self.hits_flush_interval:
+                return
+            self._last_hits_flush = time.monotonic()
+        self.flush_hits()
+
+    def flush_hits(self) -> int:
+        """Grava em lote os acertos acumulados (hits e last_used_at); devolve quantos snapshots."""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+        if not pending:
+            return 0
+        t = self.table
+        with self._get_engine().begin() as conn:
+            conn.execute(
+                update(t).where(t.c.id == bindparam('snapshot_id')).values(
+                    hits=t.c.hits + bindparam('new_hits'), last_used_at=bindparam('used_at')
+                ),
+                [{'snapshot_id': snapshot_id, 'new_hits': count, 'used_at': used_at}
+                 for snapshot_id, (count, used_at) in pending.items()],
+            )
+        return len(pending)
+
+    def put(self, user_id: int, period: str, report_type: str, data_version: int, report: dict,
+            variant: str = '', day: date | None = None) -> None:
+        day = day or date.today()
+        t = self.table
+        payload = zlib.compress(json.dumps(report, ensure_ascii=False, separators=(',', ':'), default=str).encode())
+        now = datetime.utcnow()
+        with self._get_engine().begin() as conn:
+            # Versões anteriores do mesmo relatório nunca mais serão servidas
+            conn.execute(delete(t).where(
+                t.c.source == self.source,
+                t.c.user_id == user_id,
+                t.c.period == period,
+                t.c.report_type == report_type,
+                t.c.variant == variant,
+                t.c.data_version < data_version,
+            ))
+            try:
+                with conn.begin_nested():
+                    conn.execute(t.insert().values(
+                        source=self.source, user_id=user_id, period=period, report_type=report_type,
+                        variant=variant, data_version=data_version, snapshot_date=day, payload=payload,
+                        size_bytes=len(payload), hits=0, created_at=now, last_used_at=now,
+                    ))
+            except IntegrityError:
+                # Pedido concorrente já gravou o mesmo snapshot
+                pass
+        with self._lock:
+            self.stores += 1
+        self.maybe_evict()
+
+    def maybe_evict(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._last_eviction < self.evict_interval:
+                return
+            self._last_eviction = time.monotonic()
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove snapshots mais velhos que max_age e, acima de max_bytes, os menos usados recentemente."""
+        self.flush_hits()  # last_used_at em dia para a ordem de uso
+        t = self.table
+        removed = 0
+        with self._get_engine().begin() as conn:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.max_age_seconds)
+            removed += conn.execute(delete(t).where(t.c.created_at < cutoff)).rowcount or 0
+
+            total = conn.execute(select(func.coalesce(func.sum(t.c.size_bytes), 0))).scalar()
+            if total > self.max_bytes:
+                # Libera até 90% do orçamento para não remover a cada gravação
+                target = total - int(self.max_bytes * 0.9)
+                ids = []
+                for row in conn.execute(select(t.c.id, t.c.size_bytes).order_by(t.c.last_used_at)):
+                    if target <= 0:
+                        break
+                    ids.append(row.id)
+                    target -= row.size_bytes
+                if ids:
+                    removed += conn.execute(delete(t).where(t.c.id.in_(ids))).rowcount or 0
+        with self._lock:
+            self.evicted += removed
+        return removed
+
+    def stats(self) -> dict:
+        self.flush_hits()
+        t = self.table
+        with self._get_engine().connect() as conn:
+            row = conn.execute(select(
+                func.count(),
+                func.coalesce(func.sum(t.c.size_bytes), 0),
+                func.coalesce(func.sum(t.c.hits), 0),
+            ).where(t.c.source == self.source)).one()
+        lookups = self.hits + self.misses
+        return {
+            'source': self.source,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evicted': self.evicted,
+            'reuse_rate': round(self.hits / lookups, 4) if lookups else None,
+            'snapshots': row[0],
+            'bytes': int(row[1]),
+            'max_bytes': self.max_bytes,
+            'total_hits': int(row[2]),
+        }
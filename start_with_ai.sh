@@ -112,27 +112,25 @@ cleanup() {
 # Capturar Ctrl+C
 trap cleanup SIGINT
 
-# Executar servidor Flask em background
+# Executar servidor Flask em background (gunicorn, vários workers)
 if is_port_in_use 5001; then
     echo "ℹ️  Porta 5001 já está em uso. Presumindo que o Flask já está rodando. Pulando start do Flask."
 else
     echo "🌐 Iniciando servidor Flask (porta 5001)..."
-    python app.py &
+    python -m finanmaster serve --only flask &
     FLASK_PID=$!
 fi
 
 # Aguardar um pouco para o Flask inicializar
 sleep 3
 
-# Executar servidor MCP em background
+# Executar servidor MCP em background (uvicorn, vários workers)
 if is_port_in_use 8000; then
     echo "ℹ️  Porta 8000 já está em uso. Presumindo que o MCP já está rodando. Pulando start do MCP."
 else
     echo "🤖 Iniciando servidor MCP (porta 8000)..."
-    cd instance
-    python mcp_server.py &
+    python -m finanmaster serve --only mcp &
     MCP_PID=$!
-    cd ..
 fi
 
 echo ""
@@ -648,13 +648,43 @@ function initializeTooltips() {
     });
 }
 
+// GET condicional: reenvia o último ETag e, em 304, reaproveita o corpo já recebido
+const etagCache = new Map(); // url -> { etag, body, contentType }
+
+async function fetchWithETag(url, options = {}) {
+    const cached = etagCache.get(url);
+    const headers = new Headers(options.headers || {});
+    if (cached) {
+        headers.set('If-None-Match', cached.etag);
+    }
+
+    // cache: 'no-store' para o 304 chegar até aqui em vez de ser resolvido pelo navegador
+    const response = await fetch(url, { ...options, headers, cache: 'no-store' });
+
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': cached.contentType, 'ETag': cached.etag }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        const body = await response.clone().text();
+        etagCache.set(url, { etag, body, contentType: response.headers.get('Content-Type') || 'application/json' });
+    } else if (!response.ok) {
+        etagCache.delete(url);
+    }
+    return response;
+}
+
 // Carregar dados do dashboard
 async function loadDashboardData() {
     try {
         // Show loading state
         showLoadingState();
         
-        const response = await fetch('/api/dashboard-data');
+        const response = await fetchWithETag('/api/dashboard-data');
         dashboardData = await response.json();
         
         // Animate number counting for summary cards
@@ -828,7 +858,7 @@ async function loadTransactions() {
         console.log(`🔄 Carregando transações da API para usuário ${currentUserId}...`);
         const startTime = performance.now();
         
-        const response = await fetch('/api/transactions', {
+        const response = await fetchWithETag('/api/transactions', {
             credentials: 'include' // Incluir cookies de sessão
         });
         
@@ -884,7 +914,7 @@ async function loadTransactions() {
 // Carregar metas
 async function loadGoals() {
     try {
-        const response = await fetch('/api/goals');
+        const response = await fetchWithETag('/api/goals');
         goals = await response.json();
         loadGoalsContainer();
     } catch (error) {
@@ -895,7 +925,7 @@ async function loadGoals() {
 // Carregar orçamento
 async function loadBudget() {
     try {
-        const response = await fetch('/api/budget');
+        const response = await fetchWithETag('/api/budget');
         budgetData = await response.json();
         loadBudgetCategories();
         // Atualizar gráfico de orçamento se já foi inicializado
@@ -1690,8 +1720,57 @@ function openEditTransaction(id) {
     }
 }
 
-// Atualizar dados a cada 30 segundos
-setInterval(loadDashboardData, 30000);
+// Atualizar dados quando o servidor avisar de alterações (SSE em /api/events).
+// Sem suporte a EventSource ou com o stream fechado, volta ao polling de 30 segundos.
+const DATA_CHANGE_HANDLERS = {
+    transactions: [loadDashboardData, loadTransactions, loadBudget],
+    goals: [loadGoals],
+    budgets: [loadBudget]
+};
+let dataEventsConnected = false;
+let dataPollingTimer = null;
+
+function startDataPolling() {
+    if (!dataPollingTimer) {
+        dataPollingTimer = setInterval(loadDashboardData, 30000);
+    }
+}
+
+function refreshChangedData(kinds) {
+    const loaders = new Set();
+    kinds.forEach(kind => (DATA_CHANGE_HANDLERS[kind] || []).forEach(loader => loaders.add(loader)));
+    loaders.forEach(loader => loader());
+}
+
+function subscribeToDataChanges() {
+    if (!window.EventSource) {
+        startDataPolling();
+        return;
+    }
+
+    const source = new EventSource('/api/events', { withCredentials: true });
+
+    source.addEventListener('ready', () => {
+        // Reconexão: alterações podem ter ocorrido enquanto o stream estava fora
+        if (dataEventsConnected) {
+            refreshChangedData(Object.keys(DATA_CHANGE_HANDLERS));
+        }
+        dataEventsConnected = true;
+    });
+
+    source.addEventListener('change', (event) => {
+        refreshChangedData(JSON.parse(event.data).kinds || []);
+    });
+
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            console.warn('⚠️  Feed de alterações indisponível. Usando atualização a cada 30 segundos.');
+            startDataPolling();
+        }
+    };
+}
+
+subscribeToDataChanges();
 
 // Funções do Assistente IA
 let chatHistory = [];
@@ -1750,6 +1829,7 @@ async function sendMessage() {
                 
                 response = await fetch(`${MCP_API_BASE}/ai/analyze`, {
                     method: 'POST',
+                    credentials: 'include', // Sessão do app Flask identifica o usuário no MCP
                     headers: {
                         'Content-Type': 'application/json',
                     },
@@ -2201,6 +2281,7 @@ async function updateQuickInsights() {
             // Fallback para MCP
             response = await fetch(`${MCP_API_BASE}/reports/generate`, {
                 method: 'POST',
+                credentials: 'include', // Sessão do app Flask identifica o usuário no MCP
                 headers: {
                     'Content-Type': 'application/json',
                 },
@@ -2379,6 +2460,34 @@ function quickChatQuestion(question) {
     sendMessage();
 }
 
+// Enfileira o relatório no Flask ("async": true) e consulta o job até ficar pronto
+async function generateReportJob(body, { intervalMs = 1000, timeoutMs = 120000 } = {}) {
+    let response = await fetch(`${FLASK_API_BASE}/api/reports/generate`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ ...body, async: true }),
+        credentials: 'include'
+    });
+    const deadline = Date.now() + timeoutMs;
+    
+    while (response.status === 202) {
+        if (Date.now() > deadline) {
+            throw new Error('Tempo esgotado ao gerar relatório');
+        }
+        const job = await response.json();
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        response = await fetch(`${FLASK_API_BASE}${job.poll_url}`, { credentials: 'include' });
+    }
+    
+    const job = await response.json().catch(() => ({}));
+    if (!response.ok) {
+        throw new Error(job.error || 'Erro ao gerar relatório');
+    }
+    return job.report;
+}
+
 // Função para gerar relatórios
 async function generateReport() {
     await ensureCurrentUser();
@@ -2403,6 +2512,7 @@ async function generateReport() {
             
             response = await fetch(`${MCP_API_BASE}/reports/generate`, {
                 method: 'POST',
+                credentials: 'include', // Sessão do app Flask identifica o usuário no MCP
                 headers: {
                     'Content-Type': 'application/json',
                 },
@@ -2425,26 +2535,13 @@ async function generateReport() {
             }
         } catch (error) {
             console.warn('MCP server não disponível, usando Flask:', error);
-            // Fallback para Flask
-            response = await fetch(`${FLASK_API_BASE}/api/reports/generate`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    period: period,
-                    report_type: type,
-                    insights: true,
-                    user_id: currentUserId || undefined
-                })
+            // Fallback para Flask (em segundo plano, sem prender o worker)
+            result = await generateReportJob({
+                period: period,
+                report_type: type,
+                insights: true,
+                user_id: currentUserId || undefined
             });
-            
-            if (!response.ok) {
-                const errorData = await response.json().catch(() => ({}));
-                throw new Error(errorData.error || 'Erro ao gerar relatório');
-            }
-            
-            result = await response.json();
             console.log('Relatório gerado via Flask:', result);
         }
         
@@ -0,0 +1,74 @@
+"""
+Fixtures dos testes: o app Flask sobre um SQLite temporário.
+
+As variáveis de ambiente são definidas antes de importar o app (ele lê a
+configuração na importação). Rodar a partir da raiz do projeto:
+
+    pip install pytest && python -m pytest
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+_tmp_dir = tempfile.mkdtemp(prefix='finanmaster-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{_tmp_dir}/finanmaster.db"
+os.environ['SESSION_STORE_URL'] = f"sqlite:///{_tmp_dir}/sessions.db"
+os.environ['PASSWORD_HASH_PARAMS'] = 'n=32768,r=8,p=1'  # sem calibração
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import app as finanmaster_app  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    app = finanmaster_app.app
+    with app.app_context():
+        finanmaster_app.db.create_all()
+        finanmaster_app.ensure_indexes()
+    return app
+
+
+@pytest.fixture(scope='session')
+def client(flask_app):
+    """Cliente logado com um usuário e 300 transações espalhadas por ~13 meses."""
+    client = flask_app.test_client()
+    response = client.post('/api/register', json={'username': 'teste', 'email': 'teste@finanmaster.com',
+                                                  'password': 'senha-de-teste'})
+    assert response.status_code == 200, response.get_json()
+    rnd = random.Random(1)
+    now = datetime.now()
+    rows = [{
+        'description': f'Transação {i}',
+        'value': round(rnd.uniform(1, 500), 2),
+        'category': rnd.choice(['Alimentação', 'Transporte', 'Lazer', 'Salário']),
+        'type': rnd.choice(['Receita', 'Despesa']),
+        'date': (now - timedelta(days=rnd.randint(0, 400))).strftime('%Y-%m-%d'),
+    } for i in range(300)]
+    response = client.post('/api/transactions/bulk', json=rows)
+    assert response.status_code in (200, 201), response.get_json()
+    return client
+
+
+@pytest.fixture
+def sql_statements(flask_app):
+    """Lista das instruções SQL executadas enquanto o teste roda."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with flask_app.app_context():
+        engine = finanmaster_app.db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,48 @@
+"""Agregação do dashboard numa única consulta (user-001)."""
+
+from collections import defaultdict
+from datetime import datetime
+
+import app as finanmaster_app
+
+
+def add_transaction(client, **fields):
+    payload = {'description': 'Nova', 'value': 10, 'category': 'Lazer', 'type': 'Despesa',
+               'date': datetime.now().strftime('%Y-%m-%d')}
+    payload.update(fields)
+    assert client.post('/api/transactions', json=payload).status_code in (200, 201)
+
+
+def test_dashboard_uses_one_transactions_query(client, sql_statements):
+    add_transaction(client)  # nova versão dos dados: a próxima leitura não vem do cache
+    sql_statements.clear()
+
+    response = client.get('/api/dashboard-data')
+
+    assert response.status_code == 200
+    on_transactions = [s for s in sql_statements if 'transactions' in s]
+    assert len(on_transactions) == 1, on_transactions
+    # Além da agregação, só a leitura da versão dos dados (ETag/cache)
+    assert len(sql_statements) <= 2, sql_statements
+
+
+def test_dashboard_matches_per_month_sums(client, flask_app):
+    add_transaction(client, type='Receita', category='Salário', value=1234.5)
+    data = client.get('/api/dashboard-data').get_json()
+
+    with flask_app.app_context():
+        user = finanmaster_app.User.query.filter_by(email='teste@finanmaster.com').one()
+        totals = defaultdict(float)
+        for t in finanmaster_app.Transaction.query.filter_by(user_id=user.id):
+            totals[(t.date.year, t.date.month, t.type)] += t.value
+
+    now = datetime.now()
+    expected = []
+    for i in range(5, -1, -1):
+        year, month = finanmaster_app.add_months(now.year, now.month, -i)
+        receitas, despesas = totals[(year, month, 'Receita')], totals[(year, month, 'Despesa')]
+        expected.append((round(receitas, 2), round(despesas, 2)))
+    got = [(round(m['receitas'], 2), round(m['despesas'], 2)) for m in data['months_data']]
+    assert got == expected
+    assert round(data['receitas'], 2) == expected[-1][0]
+    assert round(data['despesas'], 2) == expected[-1][1]
@@ -0,0 +1,32 @@
+"""Intervalos de mês usáveis pelo índice (user-002) e manutenção dos índices."""
+
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+import app as finanmaster_app
+
+
+def test_month_range_is_half_open():
+    assert finanmaster_app.month_range(2025, 3) == (datetime(2025, 3, 1), datetime(2025, 4, 1))
+    assert finanmaster_app.month_range(2025, 12) == (datetime(2025, 12, 1), datetime(2026, 1, 1))
+
+
+def test_monthly_sum_explain_uses_date_index(client, flask_app):
+    result = flask_app.test_cli_runner().invoke(args=['check-indexes'])
+
+    assert result.exit_code == 0, result.output
+    assert 'ix_transactions_user_date_id' in result.output
+
+
+def test_ensure_indexes_drops_replaced_index(flask_app):
+    with flask_app.app_context():
+        engine = finanmaster_app.db.engine
+        with engine.begin() as conn:
+            conn.execute(text('CREATE INDEX ix_transactions_user_date ON transactions (user_id, date)'))
+
+        finanmaster_app.ensure_indexes()
+
+        names = {ix['name'] for ix in inspect(engine).get_indexes('transactions')}
+    assert 'ix_transactions_user_date' not in names
+    assert 'ix_transactions_user_date_id' in names
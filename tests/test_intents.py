@@ -0,0 +1,31 @@
+"""Roteamento de intenções do assistente (user-016)."""
+
+import re
+
+import pytest
+
+import app as finanmaster_app
+
+
+@pytest.mark.parametrize('phrase,expected', sorted(finanmaster_app.ASSISTANT_HELP_EXAMPLES.items()))
+def test_help_examples_route_to_intent(phrase, expected):
+    assert finanmaster_app.assistant.match(phrase) == expected
+
+
+@pytest.mark.parametrize('phrase,expected', [
+    ('qual é o meu saldo atual?', 'saldo'),
+    ('quanto gastei este mês', 'despesas'),
+    ('minhas receitas do mês', 'receitas'),
+    ('como estão minhas metas', 'status_metas'),
+    ('tendencias de gastos', 'despesas'),
+    ('orcamento perto do limite', 'alertas_orcamento'),
+    ('me ajuda', 'ajuda'),
+])
+def test_free_text_routes_to_intent(phrase, expected):
+    assert finanmaster_app.assistant.match(phrase) == expected
+
+
+def test_help_text_examples_are_covered():
+    help_phrases = {p.lower() for p in re.findall(r'"([^"]+)"', finanmaster_app.ASSISTANT_HELP_TEXT)}
+
+    assert help_phrases <= set(finanmaster_app.ASSISTANT_HELP_EXAMPLES)